@@ -0,0 +1,395 @@
+"""
+API HTTP local para enviar planilhas e tarefas de etiquetas por scripts
+
+Servidor da biblioteca padrão (http.server), pensado para rodar ao lado do
+app em localhost, sem acesso à internet. As tarefas usam o mesmo código das
+páginas e da linha de comando (utils/tarefas.py) e rodam num WorkerPool
+limitado, configurado pelas mesmas variáveis de ambiente do app.
+
+    python api.py --porta 8600
+
+Rotas (JSON, arquivos em base64):
+
+    POST   /tarefas                          envia uma tarefa; responde {"id": ...}
+    GET    /tarefas                          lista as tarefas
+    GET    /tarefas/<id>                     situação, progresso e artefatos
+    GET    /tarefas/<id>/artefatos/<nome>    baixa um artefato
+    DELETE /tarefas/<id>                     cancela a tarefa
+    GET    /saude                            ocupação do pool
+
+Corpo do POST /tarefas:
+
+    {
+        "operacao": "unir-abas" | "adaptadas" | "nao-adaptadas",
+        "nome_arquivo": "planilha.xlsx",
+        "arquivo": "<base64>",
+        "logo": "<base64>",            (opcional: sem ela, só a planilha tratada)
+        "campeonato": "...",           (obrigatório com a logo)
+        "etapa": "...",                (obrigatório com a logo)
+        "compacto": false,
+        "todas_abas": false
+    }
+"""
+
+import argparse
+import base64
+import binascii
+import json
+import os
+import re
+import threading
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import quote, unquote, urlparse
+
+from utils.job_manager import Job, JobManager
+from utils.tarefas import EXTENSOES, gerar_arquivos_etiquetas, gerar_arquivos_unir_abas
+from utils.worker_pool import WorkerPool
+
+# Todas as tarefas da API ficam sob esta "sessão" do JobManager
+SESSAO_API = "api"
+
+TIPOS_ARTEFATOS = {
+    '.pdf': 'application/pdf',
+    '.csv': 'text/csv; charset=utf-8',
+    '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+}
+
+ROTA_TAREFA = re.compile(r"^/tarefas/([0-9a-f]{32})$")
+ROTA_ARTEFATO = re.compile(r"^/tarefas/([0-9a-f]{32})/artefatos/([^/]+)$")
+
+
+def executar_tarefa(
+    pool: WorkerPool,
+    operacao: str,
+    conteudo: bytes,
+    nome: str,
+    opcoes: Dict,
+    progresso: Optional[Callable] = None
+) -> Dict[str, bytes]:
+    """
+    Executa a operação no pool de processos e aguarda os artefatos
+
+    Roda numa thread do JobManager: o progresso do processo filho e a posição
+    na fila são repassados para o callback `progresso`. O total de etiquetas
+    só é conhecido depois da leitura da planilha, então o limite do pool
+    (HUB_MAX_ETIQUETAS) é conferido no processo filho.
+    """
+    def ao_aguardar(posicao: int):
+        if progresso is not None:
+            progresso(0, 0, posicao)
+
+    if operacao == 'unir-abas':
+        return pool.run_blocking(
+            gerar_arquivos_unir_abas,
+            conteudo,
+            ao_aguardar=ao_aguardar,
+            tamanho_bytes=len(conteudo)
+        )
+
+    artefatos, _ = pool.run_blocking(
+        gerar_arquivos_etiquetas,
+        operacao,
+        conteudo,
+        nome,
+        progresso=progresso,
+        ao_aguardar=ao_aguardar,
+        tamanho_bytes=len(conteudo),
+        max_etiquetas=pool.max_etiquetas,
+        **opcoes
+    )
+    return artefatos
+
+
+class ServicoTarefas:
+    """Pool de processos e fila de tarefas da API, com limite de tarefas em aberto"""
+
+    def __init__(
+        self,
+        pool: WorkerPool,
+        max_tarefas: int,
+        retencao_segundos: int,
+        max_retidos_bytes: int = 1024 * 1024 * 1024
+    ):
+        """
+        Args:
+            pool: Pool de processos que executa as operações
+            max_tarefas: Tarefas pendentes ou executando aceitas ao mesmo tempo
+            retencao_segundos: Tempo que os artefatos de uma tarefa finalizada ficam disponíveis
+            max_retidos_bytes: Tamanho máximo dos artefatos guardados; acima dele as
+                tarefas concluídas há mais tempo são descartadas antes do prazo
+        """
+        self.pool = pool
+        self.max_tarefas = max_tarefas
+        self.max_retidos_bytes = max_retidos_bytes
+        # As threads apenas aguardam o pool, então há uma para cada tarefa aceita
+        self.jobs = JobManager(max_workers=max_tarefas, ttl_seconds=retencao_segundos)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ServicoTarefas":
+        """
+        Cria o serviço com limites definidos por variáveis de ambiente
+
+        O pool usa as mesmas variáveis do app (HUB_POOL_WORKERS, HUB_POOL_MAX_FILA,
+        HUB_MAX_UPLOAD_MB, HUB_MAX_ETIQUETAS); HUB_API_MAX_TAREFAS,
+        HUB_API_RETENCAO_MIN e HUB_API_RETIDOS_MB limitam as tarefas em aberto,
+        o tempo e o tamanho dos artefatos guardados.
+        """
+        pool = WorkerPool.from_env()
+        return cls(
+            pool,
+            max_tarefas=int(os.environ.get('HUB_API_MAX_TAREFAS', pool.max_workers + pool.max_queue)),
+            retencao_segundos=int(float(os.environ.get('HUB_API_RETENCAO_MIN', 60)) * 60),
+            max_retidos_bytes=int(float(os.environ.get('HUB_API_RETIDOS_MB', 1024)) * 1024 * 1024)
+        )
+
+    def tarefas_em_aberto(self) -> int:
+        return sum(1 for job in self.jobs.list_session_jobs(SESSAO_API) if not job.finalizado)
+
+    def _executar(
+        self,
+        operacao: str,
+        conteudo: bytes,
+        nome: str,
+        opcoes: Dict,
+        progresso: Optional[Callable] = None
+    ) -> Dict[str, bytes]:
+        """executar_tarefa, abrindo espaço para os artefatos antes de guardá-los"""
+        artefatos = executar_tarefa(self.pool, operacao, conteudo, nome, opcoes, progresso=progresso)
+        self._liberar_espaco(sum(len(dados) for dados in artefatos.values()))
+        return artefatos
+
+    def _liberar_espaco(self, novos_bytes: int):
+        """Descarta as tarefas concluídas mais antigas até os artefatos novos caberem no limite"""
+        with self._lock:
+            concluidas = sorted(
+                (job for job in self.jobs.list_session_jobs(SESSAO_API) if job.status == Job.CONCLUIDO),
+                # Uma tarefa que acabou de concluir pode ainda não ter finalizado_em: é a mais nova
+                key=lambda job: (job.finalizado_em is None, job.finalizado_em or 0.0)
+            )
+            tamanhos = [sum(len(dados) for dados in (job.resultado or {}).values()) for job in concluidas]
+            retidos = novos_bytes + sum(tamanhos)
+            for job, tamanho in zip(concluidas, tamanhos):
+                if retidos <= self.max_retidos_bytes:
+                    break
+                self.jobs.remove(job.id)
+                retidos -= tamanho
+
+    def enviar(self, pedido: Dict) -> Tuple[Optional[str], Optional[str], HTTPStatus]:
+        """
+        Valida o pedido e enfileira a tarefa
+
+        Returns:
+            Tuple com (id da tarefa, mensagem de erro ou None, status HTTP da resposta)
+        """
+        operacao = pedido.get('operacao')
+        if operacao not in EXTENSOES:
+            return None, f"operacao deve ser uma de: {', '.join(EXTENSOES)}", HTTPStatus.BAD_REQUEST
+        nome = os.path.basename(str(pedido.get('nome_arquivo') or ''))
+        if not nome.lower().endswith(EXTENSOES[operacao]):
+            return None, f"nome_arquivo deve terminar com {' ou '.join(EXTENSOES[operacao])}", HTTPStatus.BAD_REQUEST
+
+        try:
+            conteudo = base64.b64decode(pedido.get('arquivo') or '', validate=True)
+            logo = base64.b64decode(pedido['logo'], validate=True) if pedido.get('logo') else None
+        except (binascii.Error, TypeError):
+            return None, "arquivo e logo devem estar em base64", HTTPStatus.BAD_REQUEST
+        if not conteudo:
+            return None, "arquivo vazio", HTTPStatus.BAD_REQUEST
+        if len(conteudo) > self.pool.max_upload_bytes:
+            limite_mb = self.pool.max_upload_bytes / (1024 * 1024)
+            return None, f"arquivo maior que o limite de {limite_mb:.0f} MB", HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+
+        campeonato = str(pedido.get('campeonato') or '').upper()
+        etapa = str(pedido.get('etapa') or '').upper()
+        if logo is not None and not (campeonato and etapa):
+            return None, "campeonato e etapa são obrigatórios com a logo", HTTPStatus.BAD_REQUEST
+
+        opcoes = {}
+        if operacao != 'unir-abas':
+            opcoes = {
+                'logo': logo,
+                'championship': campeonato,
+                'stage': etapa,
+                'compacto': bool(pedido.get('compacto')),
+                'todas_abas': bool(pedido.get('todas_abas'))
+            }
+
+        # O servidor atende cada pedido numa thread: contagem e envio juntos
+        with self._lock:
+            if self.tarefas_em_aberto() >= self.max_tarefas:
+                return None, "servidor ocupado: muitas tarefas em aberto, tente novamente mais tarde", HTTPStatus.SERVICE_UNAVAILABLE
+            job_id = self.jobs.submit(
+                self._executar,
+                operacao,
+                conteudo,
+                nome,
+                opcoes,
+                session_id=SESSAO_API,
+                descricao=nome,
+                detalhes={'operacao': operacao}
+            )
+        return job_id, None, HTTPStatus.ACCEPTED
+
+    @staticmethod
+    def descrever(job: Job) -> Dict:
+        """Situação da tarefa em JSON, com as URLs dos artefatos quando concluída"""
+        artefatos = job.resultado if job.status == Job.CONCLUIDO and job.resultado else {}
+        return {
+            'id': job.id,
+            'operacao': job.detalhes.get('operacao'),
+            'arquivo': job.descricao,
+            'status': job.status,
+            'posicao_fila': job.posicao_fila,
+            'etiquetas_feitas': job.etiquetas_feitas,
+            'paginas_feitas': job.paginas_feitas,
+            'erro': job.erro,
+            'criado_em': job.criado_em,
+            'finalizado_em': job.finalizado_em,
+            'artefatos': [
+                {'nome': nome, 'bytes': len(dados), 'url': f"/tarefas/{job.id}/artefatos/{quote(nome)}"}
+                for nome, dados in artefatos.items()
+            ]
+        }
+
+
+class ManipuladorAPI(BaseHTTPRequestHandler):
+    """Rotas da API; o serviço fica em self.server.servico"""
+
+    server_version = "HubAPI/1.0"
+
+    @property
+    def servico(self) -> ServicoTarefas:
+        return self.server.servico
+
+    def _responder_json(self, status: HTTPStatus, dados):
+        corpo = json.dumps(dados, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def _erro(self, status: HTTPStatus, mensagem: str):
+        self._responder_json(status, {'erro': mensagem})
+
+    def do_GET(self):
+        caminho = urlparse(self.path).path
+        if caminho == '/saude':
+            self._responder_json(HTTPStatus.OK, {
+                'status': 'ok',
+                'pool': self.servico.pool.stats(),
+                'tarefas_em_aberto': self.servico.tarefas_em_aberto(),
+                'max_tarefas': self.servico.max_tarefas
+            })
+            return
+        if caminho == '/tarefas':
+            jobs = self.servico.jobs.list_session_jobs(SESSAO_API)
+            self._responder_json(HTTPStatus.OK, [self.servico.descrever(job) for job in jobs])
+            return
+
+        rota = ROTA_TAREFA.match(caminho) or ROTA_ARTEFATO.match(caminho)
+        if rota is None:
+            self._erro(HTTPStatus.NOT_FOUND, "rota não encontrada")
+            return
+        job = self.servico.jobs.get(rota.group(1))
+        if job is None:
+            self._erro(HTTPStatus.NOT_FOUND, "tarefa não encontrada ou expirada")
+            return
+        if rota.re is ROTA_TAREFA:
+            self._responder_json(HTTPStatus.OK, self.servico.descrever(job))
+            return
+
+        nome = unquote(rota.group(2))
+        artefatos = job.resultado if job.status == Job.CONCLUIDO and job.resultado else {}
+        if nome not in artefatos:
+            self._erro(HTTPStatus.NOT_FOUND, "artefato não encontrado")
+            return
+        dados = artefatos[nome]
+        arquivo = f"{os.path.splitext(job.descricao)[0]}_{nome}"
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', TIPOS_ARTEFATOS.get(os.path.splitext(nome)[1], 'application/octet-stream'))
+        self.send_header('Content-Length', str(len(dados)))
+        self.send_header('Content-Disposition', f"attachment; filename*=UTF-8''{quote(arquivo)}")
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_POST(self):
+        if urlparse(self.path).path != '/tarefas':
+            self._erro(HTTPStatus.NOT_FOUND, "rota não encontrada")
+            return
+
+        # Sem um Content-Length válido não dá para saber onde o corpo termina
+        comprimento = self.headers.get('Content-Length')
+        if comprimento is None:
+            self.close_connection = True
+            self._erro(HTTPStatus.LENGTH_REQUIRED, "Content-Length é obrigatório")
+            return
+        if not re.fullmatch(r"[0-9]+", comprimento.strip()):
+            self.close_connection = True
+            self._erro(HTTPStatus.BAD_REQUEST, "Content-Length inválido")
+            return
+        tamanho = int(comprimento)
+
+        # Base64 aumenta o tamanho em 4/3; a logo e o JSON entram na folga
+        if tamanho > self.servico.pool.max_upload_bytes * 4 // 3 + 10 * 1024 * 1024:
+            # O corpo é descartado sem guardar, para o cliente conseguir ler a resposta
+            while tamanho > 0:
+                bloco = self.rfile.read(min(tamanho, 1024 * 1024))
+                if not bloco:
+                    break
+                tamanho -= len(bloco)
+            self._erro(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "pedido maior que o limite de upload")
+            return
+        try:
+            pedido = json.loads(self.rfile.read(tamanho) or b'{}')
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            self._erro(HTTPStatus.BAD_REQUEST, "corpo deve ser JSON")
+            return
+        if not isinstance(pedido, dict):
+            self._erro(HTTPStatus.BAD_REQUEST, "corpo deve ser um objeto JSON")
+            return
+
+        job_id, erro, status = self.servico.enviar(pedido)
+        if erro:
+            self._erro(status, erro)
+        else:
+            self._responder_json(status, {'id': job_id, 'url': f"/tarefas/{job_id}"})
+
+    def do_DELETE(self):
+        rota = ROTA_TAREFA.match(urlparse(self.path).path)
+        if rota is None or self.servico.jobs.get(rota.group(1)) is None:
+            self._erro(HTTPStatus.NOT_FOUND, "tarefa não encontrada ou expirada")
+            return
+        self.servico.jobs.cancel(rota.group(1))
+        self._responder_json(HTTPStatus.ACCEPTED, {'id': rota.group(1), 'cancelamento_solicitado': True})
+
+
+def criar_servidor(host: str, porta: int, servico: Optional[ServicoTarefas] = None) -> ThreadingHTTPServer:
+    """Servidor HTTP com o serviço de tarefas (criado das variáveis de ambiente se não informado)"""
+    servidor = ThreadingHTTPServer((host, porta), ManipuladorAPI)
+    servidor.daemon_threads = True
+    servidor.servico = servico or ServicoTarefas.from_env()
+    return servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API HTTP local do Hub de Automatizações")
+    parser.add_argument('--host', default='127.0.0.1', help="Endereço (padrão: só localhost)")
+    parser.add_argument('--porta', type=int, default=int(os.environ.get('HUB_API_PORTA', 8600)), help="Porta (padrão: 8600)")
+    args = parser.parse_args()
+
+    servidor = criar_servidor(args.host, args.porta)
+    print(f"API em http://{args.host}:{args.porta} ({servidor.servico.pool.max_workers} processos)", flush=True)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == '__main__':
+    main()
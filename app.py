@@ -3,6 +3,12 @@ Hub Central de Automatizacoes
 Sistema unificado com multiplas ferramentas
 """
 
+import importlib
+import sys
+import time
+
+inicio_app = time.perf_counter()
+
 import streamlit as st
 
 st.set_page_config(
@@ -49,13 +55,33 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# Importar paginas
-from app_pages import etiquetas
-from app_pages import unir_abas
+from utils.painel_diagnostico import medir_execucao, render_botao_diagnostico, render_painel_diagnostico
+from utils.servidor import aquecer_servidor, registrar_tempo_inicializacao, render_server_status
+
+# Modulos das paginas, importados so quando a pagina e aberta pela primeira vez
+# (ReportLab, openpyxl e pandas ficam fora da tela inicial)
+PAGINAS = {
+    "etiquetas": "app_pages.etiquetas",
+    "unir_abas": "app_pages.unir_abas",
+    "historico": "app_pages.historico"
+}
+
+def carregar_pagina(nome):
+    """Importa o modulo da pagina, medindo o tempo da primeira importacao"""
+    modulo = PAGINAS[nome]
+    primeira_vez = modulo not in sys.modules
+    inicio = time.perf_counter()
+    pagina = importlib.import_module(modulo)
+    if primeira_vez:
+        registrar_tempo_inicializacao(f"pagina {nome}", time.perf_counter() - inicio)
+    return pagina
 
 def main():
     """Funcao principal do hub"""
     
+    # Aquecimento em segundo plano, uma vez por processo do servidor
+    aquecer_servidor(tuple(PAGINAS.values()))
+    
     # Inicializar session state
     if 'pagina_atual' not in st.session_state:
         st.session_state.pagina_atual = "home"
@@ -75,16 +101,25 @@ def main():
             st.session_state.pagina_atual = "unir_abas"
             st.rerun()
         
+        # Botao Historico
+        if st.button("Historico", use_container_width=True):
+            st.session_state.pagina_atual = "historico"
+            st.rerun()
+        
         st.markdown("---")
         st.caption("💡 Clique em uma opcao acima")
+        
+        render_botao_diagnostico()
+        render_server_status()
     
     # RENDERIZAR CONTEUDO
     if st.session_state.pagina_atual == "home":
         render_home()
-    elif st.session_state.pagina_atual == "etiquetas":
-        etiquetas.run()
-    elif st.session_state.pagina_atual == "unir_abas":
-        unir_abas.run()
+    else:
+        # Com o diagnostico ligado, as etapas do processamento sao medidas e mostradas no fim da pagina
+        with medir_execucao(f"pagina {st.session_state.pagina_atual}"):
+            carregar_pagina(st.session_state.pagina_atual).run()
+        render_painel_diagnostico()
 
 def render_home():
     """Tela inicial - antes de escolher qualquer opcao"""
@@ -102,4 +137,6 @@ def render_home():
     )
 
 if __name__ == "__main__":
+    # Os processos do pool tambem importam este arquivo (como __mp_main__), sem medir nem renderizar
+    registrar_tempo_inicializacao("app.py", time.perf_counter() - inicio_app)
     main()
\ No newline at end of file
@@ -30,7 +30,8 @@ def run():
         "Selecione o tipo de prova:",
         ["📄 Provas Não Adaptadas", "♿ Provas Adaptadas"],
         horizontal=True,
-        label_visibility="collapsed"
+        label_visibility="collapsed",
+        key='tipo_etiqueta'
     )
     
     st.markdown("---")
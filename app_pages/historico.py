@@ -0,0 +1,130 @@
+"""
+Página de Histórico - Comparação das campanhas de olimpíadas salvas
+"""
+
+import sqlite3
+import time
+import streamlit as st
+import pandas as pd
+from utils.file_handler import FileHandler
+from utils.ui_components import get_historico, render_previa_paginada
+
+
+# Os ids das campanhas nunca são reaproveitados, então servem de chave do cache
+@st.cache_data(max_entries=4, show_spinner="Carregando campanha...")
+def carregar_campanha(campanha_id: int):
+    return get_historico().tabelas_da_campanha(campanha_id)
+
+
+@st.cache_data(max_entries=4, show_spinner="Preparando planilhas...")
+def planilhas_da_campanha(campanha_id: int):
+    """Excel das duas tabelas, gerado uma vez por campanha e não a cada rerun"""
+    olimpiadas_df, paralimpiadas_df, _ = carregar_campanha(campanha_id)
+    return FileHandler.to_excel(olimpiadas_df), FileHandler.to_excel(paralimpiadas_df)
+
+
+def run():
+    """Função principal da página de histórico"""
+
+    st.title("📚 Histórico de Olimpíadas")
+
+    st.markdown("""
+    Compare a participação das escolas entre as campanhas salvas na página
+    **Unir Abas**, sem enviar e processar as planilhas de novo.
+    """)
+
+    historico = get_historico()
+    try:
+        campanhas = historico.campanhas()
+    except sqlite3.Error as e:
+        st.error(f"❌ Erro ao abrir o histórico: {str(e)}")
+        return
+
+    if campanhas.empty:
+        st.info(
+            "Nenhuma campanha salva ainda. Processe uma planilha em **Unir Abas** "
+            "e use **💾 Salvar no histórico**."
+        )
+        return
+
+    st.markdown("---")
+    render_totais_por_escola(historico, campanhas)
+    st.markdown("---")
+    render_campanha(historico, campanhas)
+
+
+def render_totais_por_escola(historico, campanhas: pd.DataFrame):
+    """Renderiza os totais de cada escola nas últimas campanhas, lado a lado"""
+    st.markdown("### 🏫 Participantes por Escola")
+
+    ultimas = st.number_input(
+        "Últimas campanhas",
+        min_value=1,
+        max_value=len(campanhas),
+        value=min(5, len(campanhas)),
+        help="Olimpíadas e paralimpíadas somadas, da campanha mais antiga para a mais recente"
+    )
+
+    inicio = time.perf_counter()
+    tabela = historico.totais_por_escola(int(ultimas))
+    st.caption(f"{len(tabela)} escolas · consulta em {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+    # Com ids crescentes, o maior id e a quantidade mudam a cada campanha salva ou excluída
+    versao = f"{campanhas['id'].max()}:{len(campanhas)}"
+    render_previa_paginada(tabela, f"historico:{versao}:{ultimas}")
+
+    csv_data, mime, ext = FileHandler.get_download_button_data(tabela, 'csv')
+    st.download_button(
+        label="📥 Baixar CSV",
+        data=csv_data,
+        file_name=f"historico_escolas.{ext}",
+        mime=mime,
+        use_container_width=True
+    )
+
+
+def render_campanha(historico, campanhas: pd.DataFrame):
+    """Renderiza as campanhas salvas e as tabelas da campanha escolhida"""
+    st.markdown("### 🗂️ Campanhas Salvas")
+
+    st.dataframe(campanhas.drop(columns='id'), use_container_width=True, hide_index=True)
+
+    rotulos = {
+        campanha_id: f"{nome} — {arquivo} ({salva_em})"
+        for campanha_id, nome, arquivo, salva_em in
+        campanhas[['id', 'Campanha', 'Arquivo', 'Salva em']].itertuples(index=False)
+    }
+    campanha_id = st.selectbox("Abrir campanha", list(rotulos), format_func=rotulos.get)
+
+    olimpiadas_df, paralimpiadas_df, _ = carregar_campanha(int(campanha_id))
+    olimpiadas_xlsx, paralimpiadas_xlsx = planilhas_da_campanha(int(campanha_id))
+    mime = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**🥇 Olimpíadas**")
+        render_previa_paginada(olimpiadas_df, f"historico:campanha:{campanha_id}:olimpiadas")
+        st.download_button(
+            label="📥 Baixar Excel",
+            data=olimpiadas_xlsx,
+            file_name="olimpiadas.xlsx",
+            mime=mime,
+            use_container_width=True,
+            key=f"historico_olimpiadas:{campanha_id}"
+        )
+    with col2:
+        st.markdown("**🥈 Paralimpíadas**")
+        render_previa_paginada(paralimpiadas_df, f"historico:campanha:{campanha_id}:paralimpiadas")
+        st.download_button(
+            label="📥 Baixar Excel",
+            data=paralimpiadas_xlsx,
+            file_name="paralimpiadas.xlsx",
+            mime=mime,
+            use_container_width=True,
+            key=f"historico_paralimpiadas:{campanha_id}"
+        )
+
+    confirmar = st.checkbox("Confirmo a exclusão desta campanha do histórico", key=f"confirmar_exclusao:{campanha_id}")
+    if st.button("🗑️ Excluir campanha", disabled=not confirmar, use_container_width=True):
+        historico.excluir(int(campanha_id))
+        st.rerun()
@@ -2,10 +2,15 @@
 Página de Unir Abas - Processamento de Olimpíadas e Paralimpíadas
 """
 
+import os
+import sqlite3
 import streamlit as st
 import pandas as pd
-from utils.data_processor import OlimpiadasProcessor
+from modules.etiquetas_adaptadas_logic import ENTRADA_UNIR_ABAS
+from utils import diagnostico
 from utils.file_handler import FileHandler
+from utils.tarefas import processar_olimpiadas
+from utils.ui_components import get_file_hash, get_historico, get_worker_pool, guardar_na_sessao, obter_da_sessao, render_previa_paginada
 
 def run():
     """Função principal da página de unir abas"""
@@ -43,19 +48,45 @@ def run():
         uploaded_file = st.session_state['uploaded_file_olimpiadas']
         
         try:
-            with st.spinner("🔄 Processando planilha..."):
-                processor = OlimpiadasProcessor()
-                file_handler = FileHandler()
-                workbook_data = file_handler.read_excel(uploaded_file)
-                olimpiadas_df, paralimpiadas_df, anos_ordenados = processor.process_workbook(workbook_data)
-                
-                st.session_state['olimpiadas'] = olimpiadas_df
-                st.session_state['paralimpiadas'] = paralimpiadas_df
-                st.session_state['anos_ordenados'] = anos_ordenados
-                st.session_state['processed'] = True
+            file_handler = FileHandler()
+            
+            # Só processa de novo quando um arquivo diferente é enviado ou quando as
+            # tabelas foram descartadas do armazém (sessão ociosa)
+            olimpiadas_df = obter_da_sessao('unir_abas_olimpiadas')
+            paralimpiadas_df = obter_da_sessao('unir_abas_paralimpiadas')
+            anos_ordenados = obter_da_sessao('unir_abas_anos_ordenados')
+            if (
+                st.session_state.get('processed_file_id') != uploaded_file.file_id
+                or olimpiadas_df is None
+                or paralimpiadas_df is None
+            ):
+                with st.spinner("🔄 Processando planilha..."):
+                    aviso_fila = st.empty()
+                    
+                    def mostrar_posicao(posicao):
+                        aviso_fila.info(f"⏳ Servidor ocupado. Sua posição na fila: {posicao}")
+                    
+                    conteudo = uploaded_file.getvalue()
+                    olimpiadas_df, paralimpiadas_df, anos_ordenados = diagnostico.run_blocking(
+                        get_worker_pool(),
+                        processar_olimpiadas,
+                        conteudo,
+                        tamanho_bytes=len(conteudo),
+                        ao_aguardar=mostrar_posicao
+                    )
+                    aviso_fila.empty()
+                    
+                    # As tabelas ficam no armazém da sessão, que as grava em disco quando passam do orçamento
+                    guardar_na_sessao('unir_abas_olimpiadas', olimpiadas_df)
+                    guardar_na_sessao('unir_abas_paralimpiadas', paralimpiadas_df)
+                    guardar_na_sessao('unir_abas_anos_ordenados', anos_ordenados)
+                    st.session_state['processed'] = True
+                    st.session_state['processed_file_id'] = uploaded_file.file_id
+                    # A tabela enviada antes às etiquetas era de outra planilha
+                    st.session_state.pop(ENTRADA_UNIR_ABAS, None)
                 
             st.success("✅ Planilha processada com sucesso!")
-            render_results_section(olimpiadas_df, paralimpiadas_df, anos_ordenados, file_handler)
+            render_results_section(olimpiadas_df, paralimpiadas_df, anos_ordenados, file_handler, get_file_hash(uploaded_file))
             
         except Exception as e:
             st.error(f"❌ Erro ao processar arquivo: {str(e)}")
@@ -80,7 +111,7 @@ def render_upload_section():
         )
 
 
-def render_results_section(olimpiadas_df, paralimpiadas_df, anos_ordenados, file_handler):
+def render_results_section(olimpiadas_df, paralimpiadas_df, anos_ordenados, file_handler, chave):
     """Renderiza a seção de resultados"""
     st.markdown("---")
     st.markdown("## 📊 Resultados")
@@ -105,7 +136,7 @@ def render_results_section(olimpiadas_df, paralimpiadas_df, anos_ordenados, file
     st.markdown("### 🥇 Olimpíadas - Formato Pivotado")
     
     with st.expander("👁️ Visualizar dados", expanded=True):
-        st.dataframe(olimpiadas_df, use_container_width=True, height=400)
+        render_previa_paginada(olimpiadas_df, f"{chave}:olimpiadas", hide_index=False)
     
     col1, col2 = st.columns(2)
     with col1:
@@ -133,7 +164,7 @@ def render_results_section(olimpiadas_df, paralimpiadas_df, anos_ordenados, file
     st.markdown("### 🥈 Paralimpíadas - Formato Normalizado")
     
     with st.expander("👁️ Visualizar dados", expanded=True):
-        st.dataframe(paralimpiadas_df, use_container_width=True, height=400)
+        render_previa_paginada(paralimpiadas_df, f"{chave}:paralimpiadas", hide_index=False)
     
     col1, col2 = st.columns(2)
     with col1:
@@ -154,6 +185,48 @@ def render_results_section(olimpiadas_df, paralimpiadas_df, anos_ordenados, file
             mime=mime,
             use_container_width=True
         )
+    
+    st.markdown("---")
+    render_salvar_historico(olimpiadas_df, paralimpiadas_df, anos_ordenados, chave)
+    
+    # Envia a tabela direto para as etiquetas adaptadas, sem baixar e carregar o CSV
+    if st.button(
+        "🏷️ Gerar etiquetas adaptadas com estes dados",
+        disabled=paralimpiadas_df.empty,
+        use_container_width=True
+    ):
+        # A tabela continua no armazém da sessão; a página de etiquetas a lê de lá
+        st.session_state[ENTRADA_UNIR_ABAS] = {
+            'chave': get_file_hash(st.session_state['uploaded_file_olimpiadas']),
+            'artefato': 'unir_abas_paralimpiadas'
+        }
+        st.session_state['tipo_etiqueta'] = "♿ Provas Adaptadas"
+        st.session_state.pagina_atual = "etiquetas"
+        st.rerun()
+
+
+def render_salvar_historico(olimpiadas_df, paralimpiadas_df, anos_ordenados, chave):
+    """Renderiza o salvamento das tabelas no histórico de campanhas"""
+    st.markdown("### 💾 Histórico")
+    
+    arquivo = st.session_state['uploaded_file_olimpiadas'].name
+    campanha = st.text_input(
+        "Nome da campanha",
+        value=os.path.splitext(arquivo)[0],
+        help="Campanhas salvas podem ser comparadas na página Histórico sem reenviar a planilha",
+        key=f"campanha_historico:{chave}"
+    ).strip()
+    
+    if st.button("💾 Salvar no histórico", disabled=not campanha, use_container_width=True):
+        try:
+            _, nova = get_historico().salvar(campanha, chave, olimpiadas_df, paralimpiadas_df, anos_ordenados, arquivo)
+        except sqlite3.Error as e:
+            st.error(f"❌ Erro ao salvar no histórico: {str(e)}")
+            return
+        if nova:
+            st.success(f"✅ Planilha salva no histórico na campanha '{campanha}'")
+        else:
+            st.info(f"ℹ️ Esta planilha já está no histórico na campanha '{campanha}'")
 
 
 def render_instructions():
@@ -0,0 +1,10 @@
+"""
+Benchmarks do Hub de Automatizações
+
+Ferramentas para medir o desempenho das etapas de processamento com dados
+sintéticos, sem depender de planilhas reais:
+
+    python -m benchmarks.dados_sinteticos entradas/     # gera as planilhas sintéticas
+    python -m benchmarks.etapas                         # mede cada etapa
+    python -m benchmarks.carga --sessoes 8              # teste de carga do app
+"""
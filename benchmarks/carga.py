@@ -0,0 +1,479 @@
+"""
+Teste de carga com várias sessões simultâneas, usando o AppTest do Streamlit
+
+Cada sessão simulada executa o app.py de verdade e percorre um fluxo de uso
+completo, com planilhas sintéticas (sem rede e sem planilhas reais):
+
+- unir-abas: abre o hub, vai para Unir Abas, envia e processa a planilha de
+  olimpíadas, baixa o Excel e gera as etiquetas adaptadas com a tabela de
+  paralimpíadas
+- nao-adaptadas: abre o hub, vai para Criação de Etiquetas, envia o CSV,
+  baixa a planilha tratada e gera as etiquetas
+
+As sessões rodam em threads do mesmo processo, que faz o papel do servidor
+(caches, pool de processos, armazém e fila de PDFs compartilhados). Com
+--processos, as sessões são divididas entre processos independentes, como
+réplicas do servidor. No fim, mostra percentis da latência de cada passo,
+vazão e o crescimento da memória do servidor e dos processos do pool.
+
+    python -m benchmarks.carga --sessoes 8
+    python -m benchmarks.carga --sessoes 16 --processos 2 --json carga.json
+
+As variáveis de ambiente do app (HUB_POOL_WORKERS, HUB_SESSAO_MB etc.)
+valem também aqui.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from streamlit import config
+from streamlit.logger import set_log_level
+
+from benchmarks.dados_sinteticos import csv_nao_adaptadas, logo_jpeg, planilha_olimpiadas
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(RAIZ, 'app.py')
+FLUXOS = ('unir-abas', 'nao-adaptadas')
+PASSOS = ('abrir', 'navegar', 'enviar e processar', 'baixar', 'preparar etiquetas', 'gerar PDF')
+MIME_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+_sessao_da_thread = threading.local()
+
+
+class ErroFluxo(Exception):
+    """A página não mostrou o que o passo do fluxo esperava"""
+
+
+def _preparar_sessoes_simultaneas():
+    """
+    Adapta o AppTest, feito para uma sessão por vez, a várias sessões simultâneas
+
+    - O AppTest usa o mesmo id em todas as sessões, e o armazém e a fila de
+      PDFs separam os dados pelo id: cada sessão simulada recebe o seu, para
+      que não sobrescrevam as tabelas umas das outras
+    - Cada execução cria o Runtime global e o apaga ao terminar, derrubando
+      as execuções das outras sessões ainda em andamento: enquanto não há
+      Runtime, vale o último criado
+    """
+    from streamlit.runtime.runtime import Runtime
+    from streamlit.testing.v1 import app_test
+
+    original = app_test.LocalScriptRunner
+    if getattr(original, 'sessoes_simultaneas', False):
+        return
+
+    class ScriptRunnerDaSessao(original):
+        sessoes_simultaneas = True
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self._session_id = getattr(_sessao_da_thread, 'id', self._session_id)
+
+    app_test.LocalScriptRunner = ScriptRunnerDaSessao
+
+    ultimo = {}
+    instance_original = Runtime.instance.__func__
+    exists_original = Runtime.exists.__func__
+
+    def instance(cls):
+        if cls._instance is not None:
+            ultimo['runtime'] = cls._instance
+        elif 'runtime' in ultimo:
+            return ultimo['runtime']
+        return instance_original(cls)
+
+    def exists(cls):
+        return 'runtime' in ultimo or exists_original(cls)
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(exists)
+
+
+def _rss_bytes(pid: Optional[int] = None) -> Optional[int]:
+    """Memória residente atual de um processo (None fora do Linux)"""
+    try:
+        with open(f"/proc/{pid or 'self'}/statm") as arquivo:
+            return int(arquivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class AmostradorMemoria:
+    """
+    Acompanha em segundo plano a memória do servidor e dos processos do pool
+
+    Args:
+        intervalo: Segundos entre as amostras
+    """
+
+    def __init__(self, intervalo: float = 0.5):
+        self.intervalo = intervalo
+        self.amostras: List[Dict] = []
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._amostrar, name='amostrador_memoria', daemon=True)
+
+    def _amostra(self) -> Dict:
+        filhos = [_rss_bytes(processo.pid) for processo in multiprocessing.active_children()]
+        return {
+            'instante': time.monotonic(),
+            'servidor_bytes': _rss_bytes(),
+            'pool_bytes': sum(rss for rss in filhos if rss is not None)
+        }
+
+    def _amostrar(self):
+        while not self._parar.wait(self.intervalo):
+            self.amostras.append(self._amostra())
+
+    def iniciar(self):
+        self.amostras.append(self._amostra())
+        self._thread.start()
+
+    def parar(self) -> Dict:
+        """
+        Para a amostragem
+
+        Returns:
+            Memória inicial, final e máxima do servidor e do pool, em bytes
+        """
+        self._parar.set()
+        self._thread.join()
+        self.amostras.append(self._amostra())
+        if self.amostras[0]['servidor_bytes'] is None:
+            return {}
+        servidor = [amostra['servidor_bytes'] for amostra in self.amostras]
+        pool = [amostra['pool_bytes'] for amostra in self.amostras]
+        return {
+            'servidor_inicial_bytes': servidor[0],
+            'servidor_final_bytes': servidor[-1],
+            'servidor_max_bytes': max(servidor),
+            'pool_inicial_bytes': pool[0],
+            'pool_final_bytes': pool[-1],
+            'pool_max_bytes': max(pool)
+        }
+
+
+def _verificar(at):
+    """Falha o passo se a execução terminou com exceção ou mensagem de erro"""
+    if at.exception:
+        raise ErroFluxo(at.exception[0].value)
+    erros = [erro.value for erro in at.error]
+    if erros:
+        raise ErroFluxo(erros[0])
+    return at
+
+
+def _botao(at, rotulo: str):
+    for botao in at.button:
+        if botao.label == rotulo:
+            return botao
+    raise ErroFluxo(f"Botão '{rotulo}' não encontrado")
+
+
+def _uploader(at, inicio_rotulo: str):
+    for uploader in at.file_uploader:
+        if uploader.label.startswith(inicio_rotulo):
+            return uploader
+    raise ErroFluxo(f"Campo de upload '{inicio_rotulo}' não encontrado")
+
+
+def _texto(at, inicio_rotulo: str):
+    for campo in at.text_input:
+        if campo.label.startswith(inicio_rotulo):
+            return campo
+    raise ErroFluxo(f"Campo '{inicio_rotulo}' não encontrado")
+
+
+def _preparar_etiquetas(at, logo: bytes, rotulo_campeonato: str, rotulo_etapa: str):
+    _uploader(at, "Carregue a imagem da logo" if rotulo_campeonato == "Nome do Campeonato" else "Carregar logo") \
+        .set_value(("logo.jpg", logo, "image/jpeg"))
+    _texto(at, rotulo_campeonato).set_value("OLIMPÍADA DE CARGA")
+    _texto(at, rotulo_etapa).set_value("1ª FASE")
+    return _verificar(at.run())
+
+
+def _gerar_pdf(at, timeout: float):
+    """Pede o PDF e reexecuta a página a cada segundo, como o fragmento de progresso, até o download aparecer"""
+    _verificar(_botao(at, "🏷️ Gerar PDF de Etiquetas").click().run())
+    limite = time.monotonic() + timeout
+    while True:
+        if any((botao.key or "").startswith("baixar_") for botao in at.download_button):
+            return at
+        if any("cancelada" in aviso.value for aviso in at.warning):
+            raise ErroFluxo("Geração do PDF cancelada")
+        if time.monotonic() > limite:
+            raise ErroFluxo(f"PDF não ficou pronto em {timeout:.0f} s")
+        time.sleep(1)
+        _verificar(at.run())
+
+
+def executar_sessao(indice: int, fluxo: str, entradas: Dict[str, bytes], timeout: float) -> List[Dict]:
+    """
+    Percorre um fluxo completo numa sessão simulada
+
+    Args:
+        indice: Número da sessão (define o id da sessão)
+        fluxo: 'unir-abas' ou 'nao-adaptadas'
+        entradas: Planilha da sessão ('planilha') e logo ('logo')
+        timeout: Segundos máximos de cada execução do app
+
+    Returns:
+        Uma medição por passo executado (o fluxo para no primeiro erro)
+    """
+    from streamlit.testing.v1 import AppTest
+
+    _sessao_da_thread.id = f"carga-{os.getpid()}-{indice}"
+    at = AppTest.from_file(APP, default_timeout=timeout)
+
+    if fluxo == 'unir-abas':
+        passos: List[Callable] = [
+            lambda: _verificar(at.run()),
+            lambda: _verificar(_botao(at, "Unir Abas").click().run()),
+            lambda: _verificar(_uploader(at, "Escolha o arquivo Excel")
+                               .set_value(("olimpiadas.xlsx", entradas['planilha'], MIME_XLSX)).run()),
+            lambda: _verificar(at.download_button[0].click().run()),
+            lambda: _preparar_etiquetas(
+                _verificar(_botao(at, "🏷️ Gerar etiquetas adaptadas com estes dados").click().run()),
+                entradas['logo'], "Nome do Campeonato", "Etapa"
+            ),
+            lambda: _gerar_pdf(at, timeout),
+        ]
+    else:
+        passos = [
+            lambda: _verificar(at.run()),
+            lambda: _verificar(_botao(at, "Criacao de Etiquetas").click().run()),
+            lambda: _verificar(_uploader(at, "Carregar planilha CSV")
+                               .set_value(("nao_adaptadas.csv", entradas['planilha'], "text/csv")).run()),
+            lambda: _verificar(at.download_button[0].click().run()),
+            lambda: _preparar_etiquetas(at, entradas['logo'], "Nome do Campeonato/Prova", "Etapa/Fase"),
+            lambda: _gerar_pdf(at, timeout),
+        ]
+
+    medicoes = []
+    for passo, executar in zip(PASSOS, passos):
+        instante = time.time()
+        inicio = time.perf_counter()
+        erro = None
+        try:
+            executar()
+        except Exception as e:
+            erro = f"{type(e).__name__}: {e}"
+        medicoes.append({
+            'sessao': indice,
+            'fluxo': fluxo,
+            'passo': passo,
+            'inicio': instante,
+            'segundos': time.perf_counter() - inicio,
+            'erro': erro
+        })
+        if erro:
+            break
+    return medicoes
+
+
+def fluxo_da_sessao(indice: int, fluxos: List[str]) -> str:
+    """Os fluxos se alternam entre as sessões"""
+    return fluxos[indice % len(fluxos)]
+
+
+def entradas_das_sessoes(sessoes: List[int], parametros: Dict) -> Dict[int, Dict[str, bytes]]:
+    """Planilha de cada sessão; cada uma tem dados próprios, a menos que --mesmo-arquivo seja usado"""
+    logo = logo_jpeg()
+    entradas = {}
+    for indice in sessoes:
+        semente = 0 if parametros['mesmo_arquivo'] else indice
+        if fluxo_da_sessao(indice, parametros['fluxos']) == 'unir-abas':
+            planilha = planilha_olimpiadas(
+                escolas=parametros['escolas'], alunos_por_escola=parametros['alunos'], semente=semente
+            )
+        else:
+            planilha = csv_nao_adaptadas(
+                escolas=parametros['escolas'], respostas_por_escola=parametros['respostas'], semente=semente
+            )
+        entradas[indice] = {'planilha': planilha, 'logo': logo}
+    return entradas
+
+
+def executar_servidor(sessoes: List[int], parametros: Dict) -> Dict:
+    """
+    Executa as sessões em threads deste processo, que faz o papel do servidor
+
+    As planilhas são geradas antes, fora das medições. As sessões começam
+    espaçadas por `intervalo` segundos.
+
+    Returns:
+        Medições de todos os passos, duração total e memória do processo
+    """
+    if RAIZ not in sys.path:
+        sys.path.insert(0, RAIZ)
+    # Os avisos de depreciação do Streamlit se repetiriam a cada execução de cada sessão
+    # (na configuração também, que o AppTest relê a cada execução)
+    config.set_option('logger.level', 'error')
+    set_log_level('error')
+    _preparar_sessoes_simultaneas()
+    entradas = entradas_das_sessoes(sessoes, parametros)
+
+    medicoes: List[Dict] = []
+    lock = threading.Lock()
+
+    def sessao(indice: int):
+        resultado = executar_sessao(
+            indice, fluxo_da_sessao(indice, parametros['fluxos']), entradas[indice], parametros['timeout']
+        )
+        with lock:
+            medicoes.extend(resultado)
+
+    amostrador = AmostradorMemoria()
+    amostrador.iniciar()
+    inicio = time.perf_counter()
+    threads = []
+    for indice in sessoes:
+        thread = threading.Thread(target=sessao, args=(indice,), name=f"sessao_{indice}")
+        thread.start()
+        threads.append(thread)
+        time.sleep(parametros['intervalo'])
+    for thread in threads:
+        thread.join()
+    segundos = time.perf_counter() - inicio
+    memoria = amostrador.parar()
+
+    from utils.servidor import get_armazem, get_worker_pool
+    # Fora de uma execução do app, os recursos do servidor avisam do "bare mode";
+    # o AppTest restaura o nível do log ao terminar cada execução
+    set_log_level('error')
+    armazem = get_armazem().stats()
+    memoria.update(armazem_sessoes=armazem['sessoes'], armazem_bytes=armazem['memoria_bytes'], armazem_disco_bytes=armazem['disco_bytes'])
+    # Sem isso, um processo servidor de --processos esperaria para sempre pelos processos do pool ao sair
+    get_worker_pool().encerrar()
+
+    return {
+        'pid': os.getpid(),
+        'segundos': segundos,
+        'medicoes': medicoes,
+        'memoria': memoria
+    }
+
+
+def percentis(valores: List[float]) -> Dict[str, float]:
+    p50, p90, p95, p99 = np.percentile(valores, [50, 90, 95, 99])
+    return {'p50': p50, 'p90': p90, 'p95': p95, 'p99': p99, 'max': max(valores)}
+
+
+def resumir(servidores: List[Dict], segundos: float, sessoes: int) -> Dict:
+    """Latência por passo, vazão e memória de todos os servidores"""
+    medicoes = [medicao for servidor in servidores for medicao in servidor['medicoes']]
+    passos = {}
+    for passo in PASSOS:
+        do_passo = [medicao for medicao in medicoes if medicao['passo'] == passo]
+        if not do_passo:
+            continue
+        ok = [medicao['segundos'] for medicao in do_passo if medicao['erro'] is None]
+        passos[passo] = {
+            'execucoes': len(do_passo),
+            'erros': len(do_passo) - len(ok),
+            **(percentis(ok) if ok else {})
+        }
+
+    concluidas = sum(
+        1 for medicao in medicoes if medicao['passo'] == PASSOS[-1] and medicao['erro'] is None
+    )
+    return {
+        'sessoes': sessoes,
+        'sessoes_concluidas': concluidas,
+        'segundos': segundos,
+        'fluxos_por_minuto': concluidas / segundos * 60 if segundos > 0 else 0.0,
+        'passos_por_segundo': len(medicoes) / segundos if segundos > 0 else 0.0,
+        'passos': passos,
+        'erros': sorted({medicao['erro'] for medicao in medicoes if medicao['erro']}),
+        'memoria': [{'pid': servidor['pid'], **servidor['memoria']} for servidor in servidores]
+    }
+
+
+def imprimir(resumo: Dict):
+    """Tabela de latências, vazão e memória"""
+    cabecalho = f"{'Passo':<22}{'Execuções':>10}{'Erros':>7}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'máx':>9}"
+    print(cabecalho)
+    print("-" * len(cabecalho))
+    for passo, estatisticas in resumo['passos'].items():
+        linha = f"{passo:<22}{estatisticas['execucoes']:>10}{estatisticas['erros']:>7}"
+        if 'p50' in estatisticas:
+            linha += "".join(f"{estatisticas[chave]:>8.2f}s" for chave in ('p50', 'p90', 'p95', 'p99', 'max'))
+        print(linha)
+
+    print(
+        f"\nSessões concluídas: {resumo['sessoes_concluidas']}/{resumo['sessoes']} em {resumo['segundos']:.1f} s · "
+        f"{resumo['fluxos_por_minuto']:.1f} fluxos/min · {resumo['passos_por_segundo']:.2f} passos/s"
+    )
+    mb = 1024 ** 2
+    for memoria in resumo['memoria']:
+        if 'servidor_inicial_bytes' not in memoria:
+            print(f"Servidor {memoria['pid']}: memória indisponível nesta plataforma")
+            continue
+        print(
+            f"Servidor {memoria['pid']}: "
+            f"{memoria['servidor_inicial_bytes'] / mb:,.0f} → {memoria['servidor_final_bytes'] / mb:,.0f} MB "
+            f"(+{(memoria['servidor_final_bytes'] - memoria['servidor_inicial_bytes']) / mb:,.0f} MB, "
+            f"máx. {memoria['servidor_max_bytes'] / mb:,.0f} MB) · "
+            f"pool: {memoria['pool_inicial_bytes'] / mb:,.0f} → {memoria['pool_final_bytes'] / mb:,.0f} MB "
+            f"(máx. {memoria['pool_max_bytes'] / mb:,.0f} MB) · "
+            f"armazém: {memoria['armazem_sessoes']} sessões, {memoria['armazem_bytes'] / mb:,.1f} MB "
+            f"+ {memoria['armazem_disco_bytes'] / mb:,.1f} MB em disco"
+        )
+    for erro in resumo['erros']:
+        print(f"❌ {erro}")
+
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Teste de carga do app com sessões simultâneas simuladas")
+    parser.add_argument('--sessoes', type=int, default=4, help="Sessões simultâneas")
+    parser.add_argument('--processos', type=int, default=1, help="Processos servidores entre os quais as sessões são divididas")
+    parser.add_argument('--fluxos', nargs='+', choices=FLUXOS, default=list(FLUXOS), help="Fluxos, alternados entre as sessões")
+    parser.add_argument('--intervalo', type=float, default=0.5, help="Segundos entre o início de uma sessão e da seguinte")
+    parser.add_argument('--escolas', type=int, default=30, help="Escolas nas planilhas de cada sessão")
+    parser.add_argument('--alunos', type=int, default=30, help="Alunos por escola na planilha de olimpíadas")
+    parser.add_argument('--respostas', type=int, default=2, help="Respostas por escola no CSV das não adaptadas")
+    parser.add_argument('--mesmo-arquivo', action='store_true', help="Todas as sessões enviam a mesma planilha (mede os caches)")
+    parser.add_argument('--timeout', type=float, default=300, help="Segundos máximos de cada execução do app e de cada PDF")
+    parser.add_argument('--json', help="Grava o resumo e as medições neste arquivo JSON")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = criar_parser().parse_args(argv)
+    parametros = vars(args)
+
+    # Sessões distribuídas entre os processos em rodízio
+    grupos = [list(range(processo, args.sessoes, args.processos)) for processo in range(args.processos)]
+    grupos = [grupo for grupo in grupos if grupo]
+
+    inicio = time.perf_counter()
+    if len(grupos) == 1:
+        servidores = [executar_servidor(grupos[0], parametros)]
+    else:
+        contexto = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=len(grupos), mp_context=contexto) as executor:
+            servidores = list(executor.map(executar_servidor, grupos, [parametros] * len(grupos)))
+    segundos = time.perf_counter() - inicio
+
+    resumo = resumir(servidores, segundos, args.sessoes)
+    imprimir(resumo)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump({
+                'parametros': parametros,
+                'resumo': resumo,
+                'medicoes': [medicao for servidor in servidores for medicao in servidor['medicoes']]
+            }, arquivo, ensure_ascii=False, indent=2)
+    return 0 if not resumo['erros'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,221 @@
+"""
+Gerador determinístico de planilhas sintéticas
+
+Produz os três formatos de entrada do hub, com a quantidade de escolas,
+linhas e categorias configurável. A mesma semente gera sempre os mesmos dados:
+
+- Planilha de olimpíadas (Unir Abas): uma aba por escola, com o nome da
+  escola na primeira linha, os cabeçalhos na segunda e um aluno por linha,
+  além da aba DIVISÃO, que o processador ignora
+- CSV das provas não adaptadas: respostas do formulário, uma coluna por
+  ano e turno, com a maioria das células vazias ou zeradas
+- Tabela das provas adaptadas: uma linha por escola, categoria e ano
+
+Os nomes das escolas vêm com siglas, códigos INEP e variações de caixa,
+como nas planilhas reais, para exercitar a limpeza dos nomes.
+
+    python -m benchmarks.dados_sinteticos entradas/ --escolas 500
+"""
+
+import argparse
+import os
+from io import BytesIO
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+SIGLAS = ["E.M.E.F. ", "EMEF ", "ESCOLA MUNICIPAL ", "E M E I F ", "CMEI ", "ESC EST ", ""]
+NOMES = [
+    "PROFESSORA MARIA DAS GRAÇAS", "SÃO JOSÉ", "MONTEIRO LOBATO", "CECÍLIA MEIRELES",
+    "SANTA RITA", "RUI BARBOSA", "PAULO FREIRE", "NOSSA SENHORA DE NAZARÉ",
+    "TIRADENTES", "DOM PEDRO II", "ANÍSIO TEIXEIRA", "VILA NOVA"
+]
+ANOS_OLIMPIADAS = [f"{numero}º ano" for numero in range(1, 10)] + ["EJAI 1", "EJAI 2"]
+CATEGORIAS = [
+    "TEA", "TDAH", "Deficiência visual", "Deficiência auditiva", "Deficiência intelectual",
+    "Deficiência física", "Altas habilidades", "Dislexia", "Deficiência múltipla", "Surdocegueira"
+]
+SEM_DEFICIENCIA = "Não possui deficiência/transtorno"
+COLUNAS_NAO_ADAPTADAS = [
+    f"Total de alunos do {numero}º ano da {turno}" for numero in range(1, 10) for turno in ("MANHÃ", "TARDE")
+] + ["Total de alunos da EJAI 1", "Total de alunos da EJAI 2", "Total de alunos da EJA"]
+
+
+def nomes_escolas(escolas: int, semente: int = 0) -> List[str]:
+    """Nomes distintos de escolas, com siglas, código INEP e caixa variados"""
+    rng = np.random.default_rng(semente)
+    nomes = []
+    for indice in range(escolas):
+        nome = f"{SIGLAS[rng.integers(len(SIGLAS))]}{NOMES[indice % len(NOMES)]} {indice:05d}"
+        if rng.random() < 0.2:
+            nome += f" (INEP: {15000000 + indice})"
+        if rng.random() < 0.1:
+            nome = nome.lower()
+        nomes.append(nome)
+    return nomes
+
+
+def abas_olimpiadas(
+    escolas: int = 50,
+    alunos_por_escola: int = 40,
+    categorias: int = 6,
+    proporcao_paralimpiadas: float = 0.15,
+    semente: int = 0
+) -> Dict[str, pd.DataFrame]:
+    """
+    Abas da planilha de olimpíadas, como FileHandler.read_excel as retorna
+
+    Args:
+        escolas: Quantidade de abas (uma por escola)
+        alunos_por_escola: Linhas de alunos em cada aba
+        categorias: Quantidade de deficiências/transtornos usados
+        proporcao_paralimpiadas: Fração dos alunos com deficiência/transtorno
+        semente: Semente do gerador
+
+    Returns:
+        Dicionário {nome da aba: DataFrame sem cabeçalho}
+    """
+    rng = np.random.default_rng(semente)
+    categorias_usadas = np.array(CATEGORIAS[:max(1, min(categorias, len(CATEGORIAS)))], dtype=object)
+    abas = {"DIVISÃO": pd.DataFrame([["Escolas por polo"], ["Polo 1"]])}
+
+    for indice, nome in enumerate(nomes_escolas(escolas, semente)):
+        anos = np.array(ANOS_OLIMPIADAS, dtype=object)[rng.integers(len(ANOS_OLIMPIADAS), size=alunos_por_escola)]
+        deficiencias = np.where(
+            rng.random(alunos_por_escola) < proporcao_paralimpiadas,
+            categorias_usadas[rng.integers(len(categorias_usadas), size=alunos_por_escola)],
+            SEM_DEFICIENCIA
+        )
+        # Alguns alunos sem a deficiência informada vão para "Não informado"
+        deficiencias[rng.random(alunos_por_escola) < 0.02] = None
+        linhas = [[nome, None, None], ["Nome do aluno", "Ano", "Deficiência/Transtorno"]]
+        linhas += [[f"ALUNO {indice}-{aluno}", ano, deficiencia] for aluno, (ano, deficiencia) in enumerate(zip(anos, deficiencias))]
+        abas[f"ESCOLA {indice + 1}"] = pd.DataFrame(linhas)
+    return abas
+
+
+def planilha_olimpiadas(**parametros) -> bytes:
+    """Planilha Excel de olimpíadas (aceita os parâmetros de abas_olimpiadas)"""
+    buffer = BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        for aba, df in abas_olimpiadas(**parametros).items():
+            df.to_excel(writer, sheet_name=aba, header=False, index=False)
+    return buffer.getvalue()
+
+
+def tabela_nao_adaptadas(
+    escolas: int = 200,
+    respostas_por_escola: int = 2,
+    preenchimento: float = 0.3,
+    semente: int = 0
+) -> pd.DataFrame:
+    """
+    Respostas do formulário das provas não adaptadas (uma coluna por ano e turno)
+
+    Args:
+        escolas: Quantidade de escolas distintas
+        respostas_por_escola: Linhas de cada escola (respostas repetidas do formulário)
+        preenchimento: Fração das células de quantidade com alunos
+        semente: Semente do gerador
+
+    Returns:
+        DataFrame no formato do CSV exportado pelo formulário
+    """
+    rng = np.random.default_rng(semente)
+    nomes = np.repeat(np.array(nomes_escolas(escolas, semente), dtype=object), respostas_por_escola)
+    rng.shuffle(nomes)
+    linhas = len(nomes)
+
+    df = pd.DataFrame({
+        "Carimbo de data/hora": [f"2024/03/{1 + linha % 28:02d} 10:{linha % 60:02d}:00" for linha in range(linhas)],
+        "Qual é o nome da sua escola?": nomes
+    })
+    for coluna in COLUNAS_NAO_ADAPTADAS:
+        quantidades = rng.integers(1, 40, size=linhas).astype(object)
+        vazias = rng.random(linhas) >= preenchimento
+        # Células sem alunos ficam vazias ou com zero, como no formulário
+        quantidades[vazias] = np.where(rng.random(vazias.sum()) < 0.5, None, 0)
+        df[coluna] = quantidades
+    return df
+
+
+def csv_nao_adaptadas(**parametros) -> bytes:
+    """CSV das provas não adaptadas (aceita os parâmetros de tabela_nao_adaptadas)"""
+    return tabela_nao_adaptadas(**parametros).to_csv(index=False).encode('utf-8')
+
+
+def tabela_adaptadas(
+    escolas: int = 100,
+    linhas: int = 2000,
+    categorias: int = 6,
+    semente: int = 0
+) -> pd.DataFrame:
+    """
+    Tabela das provas adaptadas (uma linha por escola, categoria e ano)
+
+    Args:
+        escolas: Quantidade de escolas distintas
+        linhas: Quantidade de linhas (combinações repetidas são somadas pelo processamento)
+        categorias: Quantidade de deficiências/transtornos usados
+        semente: Semente do gerador
+    """
+    rng = np.random.default_rng(semente)
+    nomes = np.array(nomes_escolas(escolas, semente), dtype=object)
+    categorias_usadas = np.array(CATEGORIAS[:max(1, min(categorias, len(CATEGORIAS)))], dtype=object)
+    anos = np.array([f"{numero}º" for numero in range(1, 10)] + ["EJAI 1", "EJA"], dtype=object)
+    return pd.DataFrame({
+        "Escola": nomes[rng.integers(len(nomes), size=linhas)],
+        "Categoria": categorias_usadas[rng.integers(len(categorias_usadas), size=linhas)],
+        "Ano": anos[rng.integers(len(anos), size=linhas)],
+        "Quantidade": rng.integers(1, 6, size=linhas)
+    })
+
+
+def csv_adaptadas(**parametros) -> bytes:
+    """CSV das provas adaptadas (aceita os parâmetros de tabela_adaptadas)"""
+    return tabela_adaptadas(**parametros).to_csv(index=False).encode('utf-8')
+
+
+def logo_jpeg(largura: int = 600, altura: int = 180) -> bytes:
+    """Logo JPEG simples para as etiquetas"""
+    from PIL import Image, ImageDraw
+
+    imagem = Image.new("RGB", (largura, altura), "white")
+    desenho = ImageDraw.Draw(imagem)
+    desenho.rectangle([10, 10, largura - 10, altura - 10], outline="navy", width=8)
+    desenho.ellipse([30, 30, altura - 30, altura - 30], fill="darkorange")
+    buffer = BytesIO()
+    imagem.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera as planilhas sintéticas de entrada do hub")
+    parser.add_argument('saida', help="Diretório onde os arquivos são gravados (criado se não existir)")
+    parser.add_argument('--escolas', type=int, default=200, help="Escolas em cada arquivo")
+    parser.add_argument('--alunos', type=int, default=40, help="Alunos por escola na planilha de olimpíadas")
+    parser.add_argument('--linhas', type=int, default=5000, help="Linhas da tabela das provas adaptadas")
+    parser.add_argument('--categorias', type=int, default=6, help="Deficiências/transtornos usados")
+    parser.add_argument('--semente', type=int, default=0, help="Semente do gerador")
+    args = parser.parse_args()
+
+    os.makedirs(args.saida, exist_ok=True)
+    arquivos = {
+        'olimpiadas.xlsx': planilha_olimpiadas(
+            escolas=args.escolas, alunos_por_escola=args.alunos, categorias=args.categorias, semente=args.semente
+        ),
+        'nao_adaptadas.csv': csv_nao_adaptadas(escolas=args.escolas, semente=args.semente),
+        'adaptadas.csv': csv_adaptadas(
+            escolas=args.escolas, linhas=args.linhas, categorias=args.categorias, semente=args.semente
+        ),
+        'logo.jpg': logo_jpeg()
+    }
+    for nome, dados in arquivos.items():
+        with open(os.path.join(args.saida, nome), 'wb') as arquivo:
+            arquivo.write(dados)
+        print(f"{nome}: {len(dados) / 1024:,.0f} KB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,277 @@
+"""
+Micro-benchmarks de cada etapa do processamento, com dados sintéticos
+
+Mede leitura do Excel, process_workbook, exportações, limpeza dos nomes,
+normalização dos anos escolares, conversão para o formato longo (o "melt" das provas não adaptadas),
+montagem das tabelas e gerar_etiquetas. Para cada etapa informa o melhor
+tempo entre as repetições, a vazão (linhas/s ou etiquetas/s) e o pico de
+memória alocada, medido numa execução extra com tracemalloc (que deixa o
+código mais lento, por isso fica fora da cronometragem).
+
+    python -m benchmarks.etapas
+    python -m benchmarks.etapas --escolas 1000 --repeticoes 5 --json depois.json --comparar antes.json
+    python -m benchmarks.etapas --etapas gerar_etiquetas
+
+A geração de PDF começa sempre com o cache de segmentos vazio, exceto na
+etapa "(cache quente)", que mede o reaproveitamento dos segmentos.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from io import BytesIO
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.dados_sinteticos import (
+    abas_olimpiadas,
+    csv_adaptadas,
+    csv_nao_adaptadas,
+    logo_jpeg,
+    planilha_olimpiadas
+)
+from modules import criacao_adaptadas, criacao_nao_adaptadas, layout_etiquetas
+from modules.normalizacao import _limpar_texto, limpar_nomes_escolas, normalizar_ano_escolar
+from modules.transformacoes import detectar_colunas_nao_adaptadas, transformar_formato_longo
+from utils.data_processor import OlimpiadasProcessor
+from utils.file_handler import FileHandler
+from utils.tarefas import ler_tabela_adaptadas, ler_tabela_nao_adaptadas
+
+# Valores de ANO ESCOLAR como chegam das planilhas: anos regulares com e sem "ANO",
+# EJAI com e sem ordinal e ETAPA, EJA, minúsculas, espaços e células vazias
+ANOS_ESCOLARES = [
+    "1º ANO", "2º ANO", "3º", "4º ano", "5º ANO ", "6º", "7º ANO", "8º", "9º ANO",
+    "EJAI 1", "EJAI 2ª ETAPA", "ejai 3", "EJAI 4ª", "EJA", "eja", " EJAI 1 ", None
+]
+
+
+# (nome, unidade, preparar antes de cada execução, executar -> quantidade processada)
+Etapa = Tuple[str, str, Optional[Callable[[], None]], Callable[[], int]]
+
+
+def medir(executar: Callable[[], int], repeticoes: int, preparar: Optional[Callable[[], None]] = None) -> Dict:
+    """
+    Cronometra uma etapa e mede o pico de memória alocada
+
+    Returns:
+        Dicionário com melhor tempo, mediana, quantidade processada e pico de memória
+    """
+    tempos = []
+    quantidade = 0
+    for _ in range(repeticoes):
+        if preparar is not None:
+            preparar()
+        gc.collect()
+        inicio = time.perf_counter()
+        quantidade = executar()
+        tempos.append(time.perf_counter() - inicio)
+
+    if preparar is not None:
+        preparar()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        executar()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'segundos': min(tempos),
+        'mediana_segundos': statistics.median(tempos),
+        'quantidade': quantidade,
+        'por_segundo': quantidade / min(tempos) if min(tempos) > 0 else float('inf'),
+        'pico_bytes': pico
+    }
+
+
+def montar_etapas(args: argparse.Namespace, diretorio_cache: str) -> List[Etapa]:
+    """Gera os dados sintéticos (fora da cronometragem) e monta a lista de etapas"""
+    xlsx = planilha_olimpiadas(
+        escolas=args.escolas, alunos_por_escola=args.alunos, categorias=args.categorias, semente=args.semente
+    )
+    abas = abas_olimpiadas(
+        escolas=args.escolas, alunos_por_escola=args.alunos, categorias=args.categorias, semente=args.semente
+    )
+    csv_nao = csv_nao_adaptadas(escolas=args.escolas, respostas_por_escola=args.respostas, semente=args.semente)
+    csv_ad = csv_adaptadas(escolas=args.escolas, linhas=args.linhas, categorias=args.categorias, semente=args.semente)
+    logo = logo_jpeg()
+
+    olimpiadas_df, paralimpiadas_df, _ = OlimpiadasProcessor().process_workbook(abas)
+    tabela_nao, _ = ler_tabela_nao_adaptadas(BytesIO(csv_nao))
+    tabela_ad, _ = ler_tabela_adaptadas(BytesIO(csv_ad), 'adaptadas.csv')
+
+    # Tabela larga já com as colunas padronizadas, entrada do formato longo
+    df_nao = pd.read_csv(BytesIO(csv_nao), dtype=str)
+    mapeamento, _ = detectar_colunas_nao_adaptadas(df_nao)
+    df_largo = df_nao.rename(columns=mapeamento)[list(mapeamento.values())]
+    colunas_anos = [coluna for coluna in mapeamento.values() if coluna != 'NOME ESCOLA']
+    nomes = transformar_formato_longo(df_largo, colunas_anos)['NOME ESCOLA']
+    anos = pd.Series(
+        np.random.default_rng(args.semente).choice(np.array(ANOS_ESCOLARES, dtype=object), args.anos),
+        name='ANO ESCOLAR'
+    )
+
+    linhas_excel = sum(len(df) for df in abas.values())
+    alunos = args.escolas * args.alunos
+
+    execucoes_pdf = iter(range(sys.maxsize))
+
+    def cache_vazio():
+        layout_etiquetas.cache_segmentos.caminho = os.path.join(diretorio_cache, f"segmentos_{next(execucoes_pdf)}.sqlite")
+
+    def gerar(modulo, tabela):
+        def executar():
+            modulo.gerar_etiquetas(tabela, BytesIO(logo), "OLIMPÍADA SINTÉTICA", "1ª FASE")
+            return len(tabela)
+        return executar
+
+    etiquetas_nao = tabela_nao.head(args.etiquetas)
+    etiquetas_ad = tabela_ad.head(args.etiquetas)
+    cache_quente = os.path.join(diretorio_cache, "segmentos_quente.sqlite")
+
+    def usar_cache_quente():
+        layout_etiquetas.cache_segmentos.caminho = cache_quente
+        if not os.path.exists(cache_quente):
+            # Preenche o cache numa execução fora da cronometragem
+            gerar(criacao_adaptadas, etiquetas_ad)()
+
+    return [
+        ("read_excel (olimpíadas)", "linhas",
+         None, lambda: (FileHandler.read_excel(BytesIO(xlsx)), linhas_excel)[1]),
+        ("process_workbook", "alunos",
+         None, lambda: (OlimpiadasProcessor().process_workbook(abas), alunos)[1]),
+        ("exportar Excel (olimpíadas + paralimpíadas)", "linhas",
+         None, lambda: (FileHandler.to_excel(olimpiadas_df), FileHandler.to_excel(paralimpiadas_df),
+                        len(olimpiadas_df) + len(paralimpiadas_df))[2]),
+        ("exportar CSV (etiquetas não adaptadas)", "linhas",
+         None, lambda: (FileHandler.to_csv(tabela_nao), len(tabela_nao))[1]),
+        ("limpar nomes de escolas", "linhas",
+         _limpar_texto.cache_clear, lambda: (limpar_nomes_escolas(nomes), len(nomes))[1]),
+        ("normalizar ANO ESCOLAR", "linhas",
+         None, lambda: (normalizar_ano_escolar(anos), len(anos))[1]),
+        ("normalizar ANO ESCOLAR (acrescentar_ano)", "linhas",
+         None, lambda: (normalizar_ano_escolar(anos, acrescentar_ano=True), len(anos))[1]),
+        ("formato longo (melt) não adaptadas", "linhas",
+         None, lambda: (transformar_formato_longo(df_largo, colunas_anos), len(df_largo))[1]),
+        ("tabela não adaptadas (CSV completo)", "linhas",
+         _limpar_texto.cache_clear, lambda: (ler_tabela_nao_adaptadas(BytesIO(csv_nao)), len(df_nao))[1]),
+        ("tabela adaptadas (CSV completo)", "linhas",
+         _limpar_texto.cache_clear, lambda: (ler_tabela_adaptadas(BytesIO(csv_ad), 'adaptadas.csv'), args.linhas)[1]),
+        ("gerar_etiquetas não adaptadas", "etiquetas", cache_vazio, gerar(criacao_nao_adaptadas, etiquetas_nao)),
+        ("gerar_etiquetas adaptadas", "etiquetas", cache_vazio, gerar(criacao_adaptadas, etiquetas_ad)),
+        ("gerar_etiquetas adaptadas (cache quente)", "etiquetas", usar_cache_quente, gerar(criacao_adaptadas, etiquetas_ad)),
+    ]
+
+
+def ambiente() -> Dict[str, str]:
+    """Versões e máquina, para comparar resultados de execuções diferentes"""
+    import reportlab
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'reportlab': reportlab.Version,
+        'plataforma': platform.platform(),
+        'cpus': str(os.cpu_count())
+    }
+
+
+def memoria_maxima_processo() -> Optional[float]:
+    """Memória residente máxima do processo em MB (None onde não há o módulo resource)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    maxima = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return maxima / 1024 ** 2 if sys.platform == 'darwin' else maxima / 1024
+
+
+def imprimir(resultados: List[Dict], anteriores: Dict[str, Dict]):
+    """Tabela com os resultados e, se houver, a comparação com uma execução anterior"""
+    cabecalho = f"{'Etapa':<46}{'Entrada':>21}{'Melhor (s)':>12}{'Vazão':>27}{'Pico mem.':>12}"
+    if anteriores:
+        cabecalho += f"{'vs anterior':>14}"
+    print(cabecalho)
+    print("-" * len(cabecalho))
+    for resultado in resultados:
+        linha = (
+            f"{resultado['etapa']:<46}"
+            f"{resultado['quantidade']:>11,} {resultado['unidade']:<9}"
+            f"{resultado['segundos']:>12.3f}"
+            f"{resultado['por_segundo']:>14,.0f} {resultado['unidade'] + '/s':<12}"
+            f"{resultado['pico_bytes'] / 1024 ** 2:>9.1f} MB"
+        )
+        anterior = anteriores.get(resultado['etapa'])
+        if anterior:
+            # Acima de 1x a etapa ficou mais rápida
+            linha += f"{anterior['segundos'] / resultado['segundos']:>12.2f}x"
+        print(linha, flush=True)
+
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Mede cada etapa do processamento com dados sintéticos")
+    parser.add_argument('--escolas', type=int, default=200, help="Escolas em cada entrada")
+    parser.add_argument('--alunos', type=int, default=40, help="Alunos por escola na planilha de olimpíadas")
+    parser.add_argument('--respostas', type=int, default=2, help="Respostas por escola no CSV das não adaptadas")
+    parser.add_argument('--linhas', type=int, default=5000, help="Linhas da tabela das provas adaptadas")
+    parser.add_argument('--anos', type=int, default=100000, help="Linhas da coluna ANO ESCOLAR sintética")
+    parser.add_argument('--categorias', type=int, default=6, help="Deficiências/transtornos usados")
+    parser.add_argument('--etiquetas', type=int, default=2000, help="Máximo de etiquetas por PDF")
+    parser.add_argument('--repeticoes', type=int, default=3, help="Execuções cronometradas por etapa")
+    parser.add_argument('--semente', type=int, default=0, help="Semente do gerador")
+    parser.add_argument('--etapas', nargs='*', help="Só as etapas cujo nome contém algum destes textos")
+    parser.add_argument('--json', help="Grava os resultados neste arquivo JSON")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior, para mostrar a variação")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = criar_parser().parse_args(argv)
+
+    anteriores = {}
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            anteriores = {resultado['etapa']: resultado for resultado in json.load(arquivo)['etapas']}
+
+    with tempfile.TemporaryDirectory(prefix='hub_bench_') as diretorio_cache:
+        caminho_original = layout_etiquetas.cache_segmentos.caminho
+        try:
+            etapas = montar_etapas(args, diretorio_cache)
+            if args.etapas:
+                etapas = [etapa for etapa in etapas if any(texto in etapa[0] for texto in args.etapas)]
+
+            resultados = []
+            for nome, unidade, preparar, executar in etapas:
+                resultados.append({'etapa': nome, 'unidade': unidade, **medir(executar, args.repeticoes, preparar)})
+            imprimir(resultados, anteriores)
+        finally:
+            layout_etiquetas.cache_segmentos.caminho = caminho_original
+
+    memoria = memoria_maxima_processo()
+    if memoria is not None:
+        print(f"\nMemória residente máxima do processo: {memoria:,.0f} MB")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump({
+                'parametros': vars(args),
+                'ambiente': ambiente(),
+                'memoria_maxima_processo_mb': memoria,
+                'etapas': resultados
+            }, arquivo, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
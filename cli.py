@@ -0,0 +1,182 @@
+"""
+Execução em lote pela linha de comando, sem o Streamlit
+
+Processa todos os arquivos de um diretório com o mesmo fluxo das páginas,
+distribuindo os arquivos entre processos, e grava os resultados no
+diretório de saída:
+
+    python cli.py unir-abas entradas/ saidas/
+    python cli.py adaptadas entradas/ saidas/ --logo logo.jpg --campeonato "OLIMPÍADA" --etapa "1ª FASE"
+    python cli.py nao-adaptadas entradas/ saidas/ --processos 8
+
+Sem --logo, os fluxos de etiquetas gravam só a planilha tratada (CSV).
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+from utils.tarefas import EXTENSOES, gerar_arquivos_etiquetas, gerar_arquivos_unir_abas
+from utils.worker_pool import TaskTooLargeError
+
+
+def processar_arquivo(fluxo: str, caminho: str, saida: str, opcoes: Dict) -> Dict:
+    """
+    Processa um arquivo de entrada e grava os resultados (executado num processo do pool)
+
+    Returns:
+        Dicionário com arquivo, erro, arquivos gravados, etiquetas e segundos gastos
+    """
+    inicio = time.perf_counter()
+    nome = os.path.splitext(os.path.basename(caminho))[0]
+    resultado = {'arquivo': os.path.basename(caminho), 'erro': None, 'saidas': [], 'etiquetas': 0}
+
+    try:
+        with open(caminho, 'rb') as arquivo:
+            conteudo = arquivo.read()
+        if fluxo == 'unir-abas':
+            artefatos = gerar_arquivos_unir_abas(conteudo)
+        else:
+            artefatos, resultado['etiquetas'] = gerar_arquivos_etiquetas(
+                fluxo,
+                conteudo,
+                caminho,
+                logo=opcoes['logo'],
+                championship=opcoes['campeonato'],
+                stage=opcoes['etapa'],
+                compacto=opcoes['compacto'],
+                todas_abas=opcoes['todas_abas'],
+                max_etiquetas=opcoes['max_etiquetas']
+            )
+
+        for sufixo, dados in artefatos.items():
+            destino = os.path.join(saida, f"{nome}_{sufixo}")
+            with open(destino, 'wb') as arquivo:
+                arquivo.write(dados)
+            resultado['saidas'].append(os.path.basename(destino))
+    except (ValueError, TaskTooLargeError) as e:
+        resultado['erro'] = str(e)
+    except Exception as e:
+        resultado['erro'] = f"{type(e).__name__}: {e}"
+
+    resultado['segundos'] = time.perf_counter() - inicio
+    return resultado
+
+
+def listar_entradas(diretorio: str, fluxo: str) -> List[str]:
+    """Arquivos do diretório com as extensões aceitas pelo fluxo, em ordem alfabética"""
+    return sorted(
+        os.path.join(diretorio, nome)
+        for nome in os.listdir(diretorio)
+        if nome.lower().endswith(EXTENSOES[fluxo]) and not nome.startswith(('.', '~$'))
+    )
+
+
+def nomes_repetidos(entradas: List[str]) -> List[str]:
+    """
+    Arquivos com o mesmo nome e extensões diferentes (x.csv e x.xlsx)
+
+    As saídas usam o nome sem a extensão, então as de um arquivo
+    sobrescreveriam as do outro.
+    """
+    por_nome: Dict[str, List[str]] = {}
+    for caminho in entradas:
+        arquivo = os.path.basename(caminho)
+        por_nome.setdefault(os.path.splitext(arquivo)[0].lower(), []).append(arquivo)
+    return [arquivo for arquivos in por_nome.values() if len(arquivos) > 1 for arquivo in arquivos]
+
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Processa em lote os arquivos de um diretório com os fluxos do Hub de Automatizações"
+    )
+    parser.add_argument('fluxo', choices=list(EXTENSOES), help="Fluxo aplicado a cada arquivo")
+    parser.add_argument('entrada', help="Diretório com os arquivos de entrada")
+    parser.add_argument('saida', help="Diretório onde os resultados são gravados (criado se não existir)")
+    parser.add_argument(
+        '--processos', type=int, default=os.cpu_count() or 1,
+        help="Arquivos processados ao mesmo tempo (padrão: nº de CPUs)"
+    )
+    parser.add_argument('--logo', help="Logo (JPEG) das etiquetas; sem ela só a planilha tratada é gravada")
+    parser.add_argument('--campeonato', default="", help="Nome do campeonato/prova")
+    parser.add_argument('--etapa', default="", help="Etapa/fase")
+    parser.add_argument('--compacto', action='store_true', help="Gera o PDF no modo compacto")
+    parser.add_argument('--todas-abas', action='store_true', help="Provas adaptadas: lê todas as abas do Excel")
+    parser.add_argument(
+        '--max-etiquetas', type=int, default=int(os.environ.get('HUB_MAX_ETIQUETAS', 50000)),
+        help="Etiquetas por PDF; arquivos acima disso falham (padrão: HUB_MAX_ETIQUETAS ou 50000)"
+    )
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = criar_parser()
+    args = parser.parse_args(argv)
+
+    if args.logo and not (args.campeonato and args.etapa):
+        parser.error("--logo exige --campeonato e --etapa")
+    if not os.path.isdir(args.entrada):
+        parser.error(f"diretório de entrada não encontrado: {args.entrada}")
+
+    entradas = listar_entradas(args.entrada, args.fluxo)
+    if not entradas:
+        print(f"Nenhum arquivo {', '.join(EXTENSOES[args.fluxo])} em {args.entrada}")
+        return 1
+    repetidos = nomes_repetidos(entradas)
+    if repetidos:
+        parser.error(f"arquivos com o mesmo nome gravariam as mesmas saídas, renomeie: {', '.join(repetidos)}")
+    os.makedirs(args.saida, exist_ok=True)
+
+    logo = None
+    if args.logo and args.fluxo != 'unir-abas':
+        with open(args.logo, 'rb') as arquivo:
+            logo = arquivo.read()
+    opcoes = {
+        'logo': logo,
+        'campeonato': args.campeonato.upper(),
+        'etapa': args.etapa.upper(),
+        'compacto': args.compacto,
+        'todas_abas': args.todas_abas,
+        'max_etiquetas': args.max_etiquetas
+    }
+
+    processos = max(1, min(args.processos, len(entradas)))
+    print(f"{len(entradas)} arquivos, {processos} processos", flush=True)
+    inicio = time.perf_counter()
+    falhas = 0
+
+    # spawn, como no WorkerPool: cada processo começa limpo, sem herdar threads nem estado
+    contexto = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=processos, mp_context=contexto) as executor:
+        futures = {
+            executor.submit(processar_arquivo, args.fluxo, caminho, args.saida, opcoes): caminho
+            for caminho in entradas
+        }
+        for future in as_completed(futures):
+            try:
+                resultado = future.result()
+            except Exception as e:
+                # Processo encerrado à força (falta de memória): o pool inteiro quebra e os
+                # arquivos restantes falham aqui, sem impedir o resumo
+                resultado = {
+                    'arquivo': os.path.basename(futures[future]),
+                    'erro': f"{type(e).__name__}: {e}",
+                    'segundos': 0.0
+                }
+            if resultado['erro']:
+                falhas += 1
+                print(f"{resultado['segundos']:8.2f}s  ERRO  {resultado['arquivo']}: {resultado['erro']}", flush=True)
+            else:
+                etiquetas = f" ({resultado['etiquetas']} etiquetas)" if resultado['etiquetas'] else ""
+                print(f"{resultado['segundos']:8.2f}s  OK    {resultado['arquivo']} -> {', '.join(resultado['saidas'])}{etiquetas}", flush=True)
+
+    print(f"Concluído em {time.perf_counter() - inicio:.2f}s: {len(entradas) - falhas} ok, {falhas} com erro")
+    return 1 if falhas else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Cache em disco dos segmentos de etiquetas já renderizados
+
+Cada segmento guarda os operadores PDF do texto das etiquetas de uma escola,
+identificado pelo hash do conteúdo dessas etiquetas. O arquivo SQLite fica
+num diretório do temporário acessível só pelo usuário do servidor e é
+compartilhado pelos processos do pool.
+
+Os segmentos são gravados como JSON (listas de texto), nunca com pickle: um
+arquivo adulterado ou corrompido não executa código, e qualquer segmento que
+não possa ser lido conta apenas como ausente do cache.
+"""
+
+import getpass
+import json
+import os
+import sqlite3
+import stat
+import tempfile
+import time
+from contextlib import closing
+from typing import Dict, Iterable, List, Optional
+
+
+def diretorio_privado() -> str:
+    """
+    Diretório do temporário só do usuário atual (permissão 0700)
+
+    O nome é fixo por usuário, para que os processos do pool usem o mesmo
+    cache. Se o diretório já existe com outro dono ou aberto a outros
+    usuários, um diretório novo e aleatório é usado no lugar.
+    """
+    try:
+        usuario = getpass.getuser()
+    except Exception:
+        usuario = str(os.getpid())
+    diretorio = os.path.join(tempfile.gettempdir(), f"hub_automatizacoes_{usuario}")
+    try:
+        os.mkdir(diretorio, 0o700)
+    except FileExistsError:
+        pass
+    except OSError:
+        return tempfile.mkdtemp(prefix='hub_automatizacoes_')
+
+    info = os.lstat(diretorio)
+    dono_diferente = hasattr(os, 'getuid') and info.st_uid != os.getuid()
+    if not stat.S_ISDIR(info.st_mode) or dono_diferente or info.st_mode & 0o077:
+        return tempfile.mkdtemp(prefix='hub_automatizacoes_')
+    return diretorio
+
+
+def _codificar(segmento: List) -> str:
+    return json.dumps(segmento, ensure_ascii=False, separators=(',', ':'))
+
+
+def _decodificar(dados) -> Optional[List]:
+    """Segmento gravado por _codificar, ou None se o conteúdo não for válido"""
+    try:
+        segmento = json.loads(dados)
+    except (TypeError, ValueError):
+        return None
+    # Um segmento é a lista dos operadores (textos) de cada etiqueta da escola
+    if not isinstance(segmento, list) or not all(
+        isinstance(operadores, list) and all(isinstance(operador, str) for operador in operadores)
+        for operadores in segmento
+    ):
+        return None
+    return segmento
+
+
+class CacheSegmentos:
+    """Cache SQLite de segmentos renderizados, com descarte dos menos usados"""
+
+    def __init__(self, caminho: str = None, max_segmentos: int = 20000):
+        """
+        Args:
+            caminho: Arquivo SQLite (padrão: HUB_CACHE_SEGMENTOS ou diretório_privado())
+            max_segmentos: Quantidade máxima de segmentos guardados
+        """
+        # O diretório padrão só é criado na primeira consulta
+        self.caminho = caminho or os.environ.get('HUB_CACHE_SEGMENTOS')
+        self.max_segmentos = max_segmentos
+
+    def _conectar(self) -> sqlite3.Connection:
+        if self.caminho is None:
+            self.caminho = os.path.join(diretorio_privado(), 'segmentos_etiquetas.sqlite')
+        conexao = sqlite3.connect(self.caminho, timeout=30)
+        conexao.execute(
+            "CREATE TABLE IF NOT EXISTS segmentos ("
+            "chave TEXT PRIMARY KEY, dados BLOB NOT NULL, usado_em REAL NOT NULL)"
+        )
+        return conexao
+
+    def get_many(self, chaves: Iterable[str]) -> Dict[str, List]:
+        """Retorna {chave: segmento} para as chaves encontradas no cache (e legíveis)"""
+        chaves = list(dict.fromkeys(chaves))
+        if not chaves:
+            return {}
+
+        encontrados = {}
+        try:
+            with closing(self._conectar()) as conexao, conexao:
+                # O SQLite limita a quantidade de parâmetros por consulta
+                for inicio in range(0, len(chaves), 500):
+                    lote = chaves[inicio:inicio + 500]
+                    marcadores = ",".join("?" * len(lote))
+                    linhas = conexao.execute(
+                        f"SELECT chave, dados FROM segmentos WHERE chave IN ({marcadores})", lote
+                    ).fetchall()
+                    for chave, dados in linhas:
+                        segmento = _decodificar(dados)
+                        if segmento is not None:
+                            encontrados[chave] = segmento
+
+                conexao.executemany(
+                    "UPDATE segmentos SET usado_em = ? WHERE chave = ?",
+                    [(time.time(), chave) for chave in encontrados]
+                )
+        except sqlite3.Error:
+            # Sem cache o PDF é apenas renderizado por completo
+            return {}
+        return encontrados
+
+    def put_many(self, segmentos: Dict[str, List]):
+        """Guarda os segmentos e descarta os menos usados além do limite"""
+        if not segmentos:
+            return
+
+        agora = time.time()
+        try:
+            with closing(self._conectar()) as conexao, conexao:
+                conexao.executemany(
+                    "INSERT OR REPLACE INTO segmentos (chave, dados, usado_em) VALUES (?, ?, ?)",
+                    [
+                        (chave, _codificar(segmento), agora)
+                        for chave, segmento in segmentos.items()
+                    ]
+                )
+                conexao.execute(
+                    "DELETE FROM segmentos WHERE chave IN ("
+                    "SELECT chave FROM segmentos ORDER BY usado_em DESC LIMIT -1 OFFSET ?)",
+                    (self.max_segmentos,)
+                )
+        except sqlite3.Error:
+            pass
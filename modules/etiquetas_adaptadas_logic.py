@@ -1,182 +1,181 @@
 import streamlit as st
 import pandas as pd
-from modules.criacao_adaptadas import gerar_etiquetas
-import re
-
-@st.cache_data
-def convert_df(df: pd.DataFrame):
-    return df.to_csv(index=False).encode('utf-8')
-
-def limpar_nome_escola_simples(nome):
-    """Função SUPER SIMPLES para limpar nomes - SEM PERDER ESCOLAS"""
-    if pd.isna(nome):
-        return nome
-    
-    nome = str(nome).upper().strip()
-    
-    # Remove códigos INEP se existirem
-    nome = re.sub(r"\(INEP:\s*\d+\)", "", nome).strip()
-    
-    # Lista completa de siglas para remover - apenas remove do início
-    siglas_para_remover = [
-        "E.M.E.F. ",
-        "E.M.E.I.F. ",
-        "M.E.I.F ",
-        "E M E I F ",
-        "E M E F I ",
-        "E M E F ", 
-        "E M E I ",
-        "C M E I ",
-        "ESC EST ",
-        "ESC ",
-        "EMEF ",
-        "EMEI ",
-        "EMEIF ",
-        "CMEI ",
-        "CMEF ",
-        "CMEIF ",
-        "ESCOLA MUNICIPAL DE ENSINO FUNDAMENTAL E INFANTIL ",
-        "ESCOLA MUNICIPAL DE ENSINO FUNDAMENTAL ",
-        "ESCOLA MUNICIPAL DE ENSINO INFANTIL ",
-        "ESCOLA MUNICIPAL ",
-        "CENTRO MUNICIPAL DE EDUCACAO INFANTIL ",
-        "CENTRO MUNICIPAL ",
-        "ESCOLA ",
-        "ESC MUNICIPAL ",
-        "Escola M.E.I.F ",
-        "ESC MUN ",
-        "E I F ",
-        "E F "
-    ]
-    
-    # Remover apenas se começar com a sigla E sobrar nome decente
-    nome_original = nome
-    for sigla in siglas_para_remover:
-        if nome.startswith(sigla):
-            nome_sem_sigla = nome[len(sigla):].strip()
-            if len(nome_sem_sigla) > 3:  # Só aceita se sobrar um nome
-                nome = nome_sem_sigla
-                break
-    
-    # Se deu algo errado, volta pro original
-    if len(nome) < 3:
-        nome = nome_original
-        
-    return nome
-
-def detectar_colunas_automaticamente(df):
-    """Detecta automaticamente as colunas da planilha adaptadas"""
-    
-    # Normalizar nomes das colunas
-    df.columns = [col.upper().strip() for col in df.columns]
-    
-    # Mapear colunas conhecidas
-    mapeamento = {}
-    
-    # Detectar coluna da escola
-    for col in df.columns:
-        if any(palavra in col.upper() for palavra in ['ESCOLA', 'NOME']):
-            mapeamento[col] = 'NOME ESCOLA'
-            break
-    
-    # Detectar outras colunas
-    for col in df.columns:
-        col_upper = col.upper()
-        if 'CATEGORIA' in col_upper or 'DEFICIENCIA' in col_upper:
-            mapeamento[col] = 'CATEGORIA'
-        elif 'ANO' in col_upper and col not in mapeamento:
-            mapeamento[col] = 'ANO ESCOLAR'
-        elif any(palavra in col_upper for palavra in ['QUANTIDADE', 'TOTAL', 'QTD']):
-            mapeamento[col] = 'TOTAL'
-    
-    # Se não encontrou escola
-    if 'NOME ESCOLA' not in mapeamento.values():
-        return None, "Coluna com nome da escola não encontrada!"
-    
-    return mapeamento, None
+from io import BytesIO
+from modules.criacao_adaptadas import gerar_etiquetas, campos_etiqueta
+from modules.transformacoes import (
+    detectar_colunas_adaptadas,
+    juntar_tabelas_adaptadas,
+    montar_tabela_adaptadas,
+    transformar_tabela_adaptadas
+)
+from utils.diagnostico import etapa
+from utils.file_handler import FileHandler
+from utils.tarefas import processar_abas_no_pool
+from utils.ui_components import get_file_hash, get_worker_pool, obter_da_sessao, render_pdf_job, render_previa_paginada
+
+# O DataFrame não entra no hash do cache: a chave é o hash do arquivo que deu origem a ele
+@st.cache_data(max_entries=16)
+def convert_df(_df: pd.DataFrame, chave: str):
+    return _df.to_csv(index=False).encode('utf-8')
+
+# Colunas da tabela de Paralimpíadas do Unir Abas e seus nomes padronizados (esquema fixo, sem detecção)
+COLUNAS_UNIR_ABAS = {
+    'Escola': 'NOME ESCOLA',
+    'Categoria': 'CATEGORIA',
+    'Ano': 'ANO ESCOLAR',
+    'Quantidade': 'TOTAL'
+}
+
+# Chave da sessão com a tabela enviada pelo Unir Abas: {'chave': hash do upload, 'artefato': nome no armazém da sessão}
+ENTRADA_UNIR_ABAS = 'etiquetas_adaptadas_unir_abas'
+
+@st.cache_data(max_entries=16, show_spinner="Processando planilha...")
+def processar_planilha(_arquivo, chave: str):
+    """
+    Lê a planilha enviada e monta a tabela das etiquetas
+
+    Função pura, em cache pelo hash do conteúdo (chave); o arquivo não entra no hash.
+
+    Returns:
+        Tuple com (DataFrame transformado, mensagem de erro ou None)
+    """
+    # Carregar arquivo
+    _arquivo.seek(0)
+    if _arquivo.name.endswith('.csv'):
+        df = pd.read_csv(_arquivo)
+    else:
+        df = pd.read_excel(_arquivo)
+
+    return montar_tabela_adaptadas(df)
+
+@st.cache_data(max_entries=16, show_spinner="Processando as abas da planilha...")
+def processar_todas_abas(_arquivo, chave: str):
+    """
+    Lê todas as abas do Excel e junta as tabelas das etiquetas
+
+    As colunas são detectadas uma vez para cada cabeçalho distinto e as abas
+    são lidas e transformadas em paralelo no pool de processos. Abas sem
+    coluna de escola são ignoradas e aparecem no relatório.
+
+    Returns:
+        Tuple com (DataFrame transformado, relatório por aba, mensagem de erro ou None)
+    """
+    conteudo = _arquivo.getvalue()
+    cabecalhos = FileHandler.read_excel_headers(BytesIO(conteudo))
+
+    # Detectar colunas uma vez por cabeçalho distinto
+    deteccoes = {}
+    abas = []
+    relatorio = {}
+    for aba, colunas in cabecalhos.items():
+        assinatura = tuple(str(coluna) for coluna in colunas)
+        if assinatura not in deteccoes:
+            deteccoes[assinatura] = detectar_colunas_adaptadas(pd.DataFrame(columns=list(assinatura)))
+        mapeamento, erro = deteccoes[assinatura]
+        if erro:
+            relatorio[aba] = {'Aba': aba, 'Linhas lidas': 0, 'Etiquetas': 0, 'Tempo (s)': 0.0, 'Situação': erro}
+        else:
+            abas.append((aba, mapeamento))
+
+    with etapa('pool: processar_aba_adaptadas', abas=len(abas)):
+        resultados = processar_abas_no_pool(get_worker_pool(), conteudo, abas)
+
+    tabelas = []
+    for (aba, _), (resultado, erro) in zip(abas, resultados):
+        if erro is not None:
+            relatorio[aba] = {'Aba': aba, 'Linhas lidas': 0, 'Etiquetas': 0, 'Tempo (s)': 0.0, 'Situação': f"Erro: {erro}"}
+            continue
+        tabela, linhas_lidas, segundos = resultado
+        tabelas.append(tabela)
+        relatorio[aba] = {
+            'Aba': aba,
+            'Linhas lidas': linhas_lidas,
+            'Etiquetas': len(tabela),
+            'Tempo (s)': round(segundos, 3),
+            'Situação': 'OK'
+        }
+
+    relatorio = pd.DataFrame([relatorio[aba] for aba in cabecalhos])
+    relatorio.attrs['cabecalhos_distintos'] = len(deteccoes)
+    if not tabelas:
+        return None, relatorio, "Nenhuma aba com coluna de escola encontrada!"
+
+    return juntar_tabelas_adaptadas(tabelas), relatorio, None
+
+@st.cache_data(max_entries=16, show_spinner="Processando tabela do Unir Abas...")
+def processar_tabela_unir_abas(_tabela: pd.DataFrame, chave: str):
+    """
+    Monta a tabela das etiquetas direto da tabela de Paralimpíadas do Unir Abas
+
+    O esquema é conhecido (COLUNAS_UNIR_ABAS), então não há leitura de arquivo
+    nem detecção de colunas. Em cache pelo hash da planilha que originou a tabela.
+    """
+    df_mapeado = _tabela[list(COLUNAS_UNIR_ABAS)].rename(columns=COLUNAS_UNIR_ABAS)
+    return transformar_tabela_adaptadas(df_mapeado)
 
 def interface_adaptadas():
     st.header("Etiquetas - Provas Adaptadas")
 
-    # Exemplo de tabela esperada
-    exemplo = {
-        "Escola": ["ESCOLA MUNICIPAL PEIXE-BOI"],
-        "Categoria": ["TEA"],
-        "Ano": ["5º"],
-        "Quantidade": ["10"]
-    }
-    st.markdown("### 📊 Estrutura esperada da planilha:")
-    st.dataframe(pd.DataFrame(exemplo), hide_index=True)
-
-    uploaded_file = st.file_uploader("Carregue sua planilha (CSV ou Excel)", type=['csv', 'xlsx'])
-
-    if uploaded_file:
+    # Tabela enviada pela página Unir Abas, usada no lugar do upload
+    entrada = st.session_state.get(ENTRADA_UNIR_ABAS)
+    tabela_unir_abas = obter_da_sessao(entrada['artefato']) if entrada is not None else None
+    uploaded_file = None
+
+    if entrada is not None and tabela_unir_abas is None:
+        st.info("⌛ A tabela enviada pelo Unir Abas expirou. Carregue a planilha novamente.")
+        del st.session_state[ENTRADA_UNIR_ABAS]
+        entrada = None
+
+    if entrada is not None:
+        st.info(f"📎 Usando a tabela de Paralimpíadas do Unir Abas ({len(tabela_unir_abas)} linhas)")
+        if st.button("📤 Carregar outra planilha"):
+            del st.session_state[ENTRADA_UNIR_ABAS]
+            st.rerun()
+    else:
+        # Exemplo de tabela esperada
+        exemplo = {
+            "Escola": ["ESCOLA MUNICIPAL PEIXE-BOI"],
+            "Categoria": ["TEA"],
+            "Ano": ["5º"],
+            "Quantidade": ["10"]
+        }
+        st.markdown("### 📊 Estrutura esperada da planilha:")
+        st.dataframe(pd.DataFrame(exemplo), hide_index=True)
+
+        uploaded_file = st.file_uploader("Carregue sua planilha (CSV ou Excel)", type=['csv', 'xlsx'])
+        todas_abas = st.checkbox(
+            "📑 Ler todas as abas da planilha",
+            help="Junta as abas do Excel (por exemplo, uma por município) numa única tabela de etiquetas",
+            disabled=uploaded_file is None or uploaded_file.name.endswith('.csv')
+        )
+
+    if uploaded_file or entrada is not None:
         try:
-            # Carregar arquivo
-            if uploaded_file.name.endswith('.csv'):
-                df = pd.read_csv(uploaded_file)
+            if entrada is not None:
+                # Esquema conhecido: sem leitura de arquivo nem detecção de colunas. Chave própria:
+                # a mesma planilha enviada direto nesta página gera outra tabela
+                chave = f"{entrada['chave']}:unir_abas"
+                df_transformado, erro = processar_tabela_unir_abas(tabela_unir_abas, chave), None
+            elif todas_abas and not uploaded_file.name.endswith('.csv'):
+                # Chave própria: a mesma planilha lida só na primeira aba gera outra tabela
+                chave = f"{get_file_hash(uploaded_file)}:todas_abas"
+                df_transformado, relatorio, erro = processar_todas_abas(uploaded_file, chave)
+
+                st.markdown("### 📑 Abas Processadas:")
+                st.caption(
+                    f"{len(relatorio)} abas, {relatorio.attrs['cabecalhos_distintos']} cabeçalhos distintos "
+                    f"(colunas detectadas uma vez por cabeçalho)"
+                )
+                st.dataframe(relatorio, use_container_width=True, hide_index=True)
             else:
-                df = pd.read_excel(uploaded_file)
+                # Transformação em cache pelo conteúdo do arquivo: reruns só redesenham a página
+                chave = get_file_hash(uploaded_file)
+                df_transformado, erro = processar_planilha(uploaded_file, chave)
 
-            # Detectar colunas automaticamente
-            mapeamento, erro = detectar_colunas_automaticamente(df)
-            
             if erro:
                 st.error(f"❌ {erro}")
                 st.info("💡 Verifique se sua planilha contém uma coluna com nome da escola")
                 st.stop()
-            
-            # Aplicar mapeamento
-            df_mapeado = df.rename(columns=mapeamento)
-            
-            # Verificar colunas obrigatórias
-            required_columns = ['NOME ESCOLA']
-            missing_columns = [col for col in required_columns if col not in df_mapeado.columns]
-            
-            if missing_columns:
-                st.error(f"❌ Colunas obrigatórias não encontradas: {', '.join(missing_columns)}")
-                st.info("💡 Verifique se sua planilha contém pelo menos uma coluna com nome da escola")
-                st.stop()
-
-            # Criar colunas padrão se não existirem
-            if 'CATEGORIA' not in df_mapeado.columns:
-                df_mapeado['CATEGORIA'] = 'GERAL'
-            if 'ANO ESCOLAR' not in df_mapeado.columns:
-                df_mapeado['ANO ESCOLAR'] = 'NÃO INFORMADO'
-            if 'TOTAL' not in df_mapeado.columns:
-                df_mapeado['TOTAL'] = 1
-
-            # Processar dados
-            df_mapeado['ANO ESCOLAR'] = df_mapeado['ANO ESCOLAR'].astype(str).str.strip()
-            
-            # NOVA LÓGICA: Adicionar "ETAPA" APENAS para EJAI, nada para EJA, e "ANO" para o resto
-            for idx, row in df_mapeado.iterrows():
-                ano_escolar = str(row['ANO ESCOLAR']).upper().strip()
-                
-                # Verificar se é EJAI (APENAS EJAI, não EJA)
-                if 'EJAI' in ano_escolar:
-                    # Se já não contém "ETAPA"
-                    if 'ETAPA' not in ano_escolar:
-                        # Verificar se tem número sem "ª" e adicionar
-                        if re.search(r'\b\d+\b', ano_escolar) and not re.search(r'\d+[ªº]', ano_escolar):
-                            ano_escolar = re.sub(r'\b(\d+)\b', r'\1ª', ano_escolar)
-                        df_mapeado.loc[idx, 'ANO ESCOLAR'] = ano_escolar + ' ETAPA'
-                elif 'EJA' in ano_escolar and 'EJAI' not in ano_escolar:
-                    # Para EJA (que não seja EJAI), não adiciona nada, mantém exatamente como está
-                    df_mapeado.loc[idx, 'ANO ESCOLAR'] = ano_escolar
-                else:
-                    # Para outros casos, adicionar "ANO" se não contém "ANO"
-                    if 'ANO' not in ano_escolar:
-                        df_mapeado.loc[idx, 'ANO ESCOLAR'] = ano_escolar + ' ANO'
-
-            # Processar coluna TOTAL
-            df_mapeado['TOTAL'] = pd.to_numeric(df_mapeado['TOTAL'], errors='coerce').fillna(1).astype(int)
-            df_transformado = df_mapeado[df_mapeado['TOTAL'] > 0].copy()
-
-            # Limpar nomes das escolas usando a nova função
-            df_transformado["NOME ESCOLA"] = df_transformado['NOME ESCOLA'].apply(limpar_nome_escola_simples)
-            
-            df_transformado = df_transformado.sort_values(by='NOME ESCOLA').reset_index(drop=True)
 
             # Verificar se há dados válidos
             if df_transformado.empty:
@@ -194,11 +193,11 @@ def interface_adaptadas():
                 st.metric("Total de Alunos", df_transformado['TOTAL'].sum())
 
             st.markdown("### 📋 Dados Processados:")
-            st.dataframe(df_transformado, use_container_width=True, hide_index=True)
+            render_previa_paginada(df_transformado, f"adaptadas:{chave}")
 
             st.download_button(
                 "📥 Baixar arquivo transformado (CSV)", 
-                convert_df(df_transformado), 
+                convert_df(df_transformado, chave), 
                 "dados_transformados.csv", 
                 "text/csv"
             )
@@ -207,19 +206,24 @@ def interface_adaptadas():
             st.markdown("### 🏷️ Gerar Etiquetas PDF")
             logo_file = st.file_uploader("Carregue a imagem da logo para o PDF (formato JPEG)", type=["jpg", "jpeg"])
             campeonato = st.text_input("Nome do Campeonato").upper()
-            etapa = st.text_input("Etapa").upper()
-
-            if logo_file and campeonato and etapa:
-                try:
-                    pdf_data = gerar_etiquetas(df_transformado, logo_file, campeonato, etapa)
-                    st.download_button(
-                        label="📥 Baixar PDF de Etiquetas",
-                        data=pdf_data,
-                        file_name='etiquetas_adaptadas.pdf',
-                        mime='application/pdf'
-                    )
-                except Exception as e:
-                    st.error(f"❌ Erro ao gerar PDF: {str(e)}")
+            nome_etapa = st.text_input("Etapa").upper()
+            compacto = st.checkbox(
+                "📦 PDF compacto",
+                help="Gera um arquivo menor, mais rápido de baixar e enviar para a gráfica"
+            )
+
+            if logo_file and campeonato and nome_etapa:
+                render_pdf_job(
+                    'etiquetas_adaptadas',
+                    gerar_etiquetas,
+                    df_transformado,
+                    logo_file,
+                    campeonato,
+                    nome_etapa,
+                    'etiquetas_adaptadas.pdf',
+                    campos_etiqueta,
+                    compacto=compacto
+                )
                     
         except Exception as e:
             st.error(f"❌ Erro ao processar planilha: {str(e)}")
@@ -1,102 +1,55 @@
 import streamlit as st
 import pandas as pd
-from modules.criacao_nao_adaptadas import gerar_etiquetas
-import re
+from modules.criacao_nao_adaptadas import gerar_etiquetas, campos_etiqueta
+from modules.transformacoes import detectar_colunas_nao_adaptadas, montar_tabela_nao_adaptadas
+from modules.processamento_em_lotes import LIMITE_EM_LOTES_BYTES, processar_csv_em_lotes
+from utils.diagnostico import etapa
+from utils.file_handler import FileHandler
+from utils.ui_components import get_file_hash, render_pdf_job, render_previa_paginada
 
-@st.cache_data
-def convert_df(df: pd.DataFrame):
-    return df.to_csv(index=False).encode('utf-8')
+# O DataFrame não entra no hash do cache: a chave é o hash do arquivo que deu origem a ele
+@st.cache_data(max_entries=16)
+def convert_df(_df: pd.DataFrame, chave: str):
+    return _df.to_csv(index=False).encode('utf-8')
 
-def limpar_nome_escola_simples(nome):
-    """Função SUPER SIMPLES para limpar nomes - SEM PERDER ESCOLAS"""
-    if pd.isna(nome):
-        return nome
-    
-    nome = str(nome).upper().strip()
-    
-    # Remove códigos INEP se existirem
-    nome = re.sub(r"\(INEP:\s*\d+\)", "", nome).strip()
-    
-    # Lista simples de substituições - apenas remove do início
-    siglas_para_remover = [
-        "E.M.E.F. ",
-        "E.M.E.I.F. ",
-        "M.E.I.F ",
-        "E M E I F ",
-        "E M E F I ",
-        "E M E F ", 
-        "E M E I ",
-        "C M E I ",
-        "ESC EST ",
-        "ESC ",
-        "EMEF ",
-        "EMEI ",
-        "EMEIF ",
-        "CMEI ",
-        "CMEF ",
-        "CMEIF ",
-        "ESCOLA MUNICIPAL DE ENSINO FUNDAMENTAL E INFANTIL ",
-        "ESCOLA MUNICIPAL DE ENSINO FUNDAMENTAL ",
-        "ESCOLA MUNICIPAL DE ENSINO INFANTIL ",
-        "ESCOLA MUNICIPAL ",
-        "CENTRO MUNICIPAL DE EDUCACAO INFANTIL ",
-        "CENTRO MUNICIPAL ",
-        "ESCOLA ",
-        "ESC MUNICIPAL ",
-        "ESC MUN ",
-        "E I F ",
-        "E F ",
-    ]
-    
-    # Remover apenas se começar com a sigla E sobrar nome decente
-    nome_original = nome
-    for sigla in siglas_para_remover:
-        if nome.startswith(sigla):
-            nome_sem_sigla = nome[len(sigla):].strip()
-            if len(nome_sem_sigla) > 3:  # Só aceita se sobrar um nome
-                nome = nome_sem_sigla
-                break
-    
-    # Se deu algo errado, volta pro original
-    if len(nome) < 3:
-        nome = nome_original
-        
-    return nome
+@st.cache_data(max_entries=16, show_spinner="Processando planilha...")
+def processar_em_memoria(_arquivo, chave, mapeamento, colunas_anos):
+    """
+    Lê as colunas usadas e monta a tabela das etiquetas em memória
 
-def detectar_colunas_automaticamente(df):
-    """Detecta automaticamente as colunas da planilha e cria mapeamento dinâmico"""
-    
-    # Coluna obrigatória (nome da escola)
-    coluna_escola = None
-    for col in df.columns:
-        if 'escola' in col.lower():
-            coluna_escola = col
-            break
-    
-    if not coluna_escola:
-        return None, "Coluna com nome da escola não encontrada!"
-    
-    # Detectar colunas de alunos automaticamente
-    colunas_alunos = []
-    for col in df.columns:
-        col_lower = col.lower()
-        # Procura por padrões como "total", "aluno", números, "manhã", "tarde", "eja", etc.
-        if any(palavra in col_lower for palavra in ['total', 'aluno', '1º', '2º', '3º', '4º', '5º', 
-                                                    '6º', '7º', '8º', '9º', 'eja', 'manhã', 'tarde']):
-            if col != coluna_escola:  # Não incluir a coluna da escola
-                colunas_alunos.append(col)
-    
-    # Criar mapeamento dinâmico
-    mapeamento = {coluna_escola: 'NOME ESCOLA'}
-    
-    # Para cada coluna de alunos, criar um nome mais limpo
-    for col in colunas_alunos:
-        nome_limpo = col.replace('Total de alunos do ', '').replace('Total de alunos da ', '')
-        nome_limpo = nome_limpo.replace(' da ', ' ').replace(' do ', ' ')
-        nome_limpo = nome_limpo.upper().strip()
-        mapeamento[col] = nome_limpo
-    
-    return mapeamento, None
+    Função pura, em cache pelo hash do conteúdo (chave); o arquivo não entra no hash.
+    """
+    # Ler apenas as colunas usadas (e-mail, data e respostas livres do formulário ficam de fora).
+    # Tudo é lido como texto; as quantidades são convertidas para número na transformação.
+    df = FileHandler.read_csv_columns(
+        _arquivo,
+        usecols=list(mapeamento),
+        dtype={coluna: str for coluna in mapeamento}
+    )
+
+    # Aplicar mapeamento
+    with etapa('aplicar mapeamento', linhas=len(df)):
+        df_final = df.rename(columns=mapeamento)[list(mapeamento.values())].copy()
+
+    return montar_tabela_nao_adaptadas(df_final, colunas_anos)
+
+def processar_em_lotes(uploaded_file, chave, mapeamento):
+    """
+    Processa a planilha em lotes, uma vez por conteúdo de arquivo
+
+    A tabela ordenada fica em disco e o CSV tratado é gravado ao lado dela só
+    quando o download é pedido: o botão recebe tabela.abrir_csv, que devolve
+    o arquivo aberto. Os arquivos temporários são apagados quando a tabela
+    deixa de ser usada pela sessão, pelo botão e pelas tarefas do pool.
+    """
+    atual = st.session_state.get('nao_adaptadas_em_lotes')
+    if atual is None or atual[0] != chave:
+        with st.spinner("Processando planilha grande em lotes..."), etapa('processar_csv_em_lotes') as medida:
+            tabela = processar_csv_em_lotes(uploaded_file, mapeamento)
+            medida.registrar(etiquetas=len(tabela))
+            st.session_state['nao_adaptadas_em_lotes'] = (chave, tabela)
+    tabela = st.session_state['nao_adaptadas_em_lotes'][1]
+    return tabela, tabela.abrir_csv
 
 def interface_nao_adaptadas():
     st.header("Etiquetas - Provas Não Adaptadas")
@@ -158,106 +111,58 @@ def interface_nao_adaptadas():
 
     if uploaded_file:
         try:
-            df = pd.read_csv(uploaded_file)
-            
-            # Detectar colunas automaticamente
-            mapeamento, erro = detectar_colunas_automaticamente(df)
+            # A transformação fica em cache pelo conteúdo do arquivo: reruns só redesenham a página
+            chave = get_file_hash(uploaded_file)
+
+            # Detectar colunas automaticamente a partir do cabeçalho
+            cabecalho = FileHandler.read_csv_header(uploaded_file)
+            mapeamento, erro = detectar_colunas_nao_adaptadas(pd.DataFrame(columns=cabecalho))
             
             if erro:
                 st.error(f"❌ {erro}")
                 st.info("Verifique se existe uma coluna com 'escola' no nome")
                 st.stop()
             
-            # Aplicar mapeamento
-            df_mapeado = df.rename(columns=mapeamento)
-            colunas_finais = list(mapeamento.values())
-            df_final = df_mapeado[colunas_finais].copy()
-            
-            # Transformar para formato longo
-            colunas_anos = [col for col in colunas_finais if col != 'NOME ESCOLA']
+            colunas_anos = [col for col in mapeamento.values() if col != 'NOME ESCOLA']
             if not colunas_anos:
                 st.warning("Nenhuma coluna de alunos foi detectada!")
                 st.stop()
-                
-            df_transformado = df_final.melt(
-                id_vars=['NOME ESCOLA'], 
-                value_vars=colunas_anos,
-                var_name='ANO ESCOLAR', 
-                value_name='TOTAL'
-            )
-            
-            # Limpeza cuidadosa dos dados
-            df_transformado = df_transformado.dropna(subset=['NOME ESCOLA'])
-            df_transformado['TOTAL'] = pd.to_numeric(df_transformado['TOTAL'], errors='coerce').fillna(0).astype(int)
-            
-            # Estratégia para NÃO perder escolas:
-            # 1. Manter todas as linhas com TOTAL > 0
-            linhas_com_alunos = df_transformado[df_transformado['TOTAL'] > 0].copy()
-            
-            # 2. Para escolas que só têm TOTAL = 0, manter pelo menos uma linha
-            escolas_com_alunos = linhas_com_alunos['NOME ESCOLA'].unique()
-            escolas_sem_alunos = df_transformado[~df_transformado['NOME ESCOLA'].isin(escolas_com_alunos)]
-            
-            if not escolas_sem_alunos.empty:
-                # Manter uma linha por escola que só tem zeros
-                linhas_sem_alunos = escolas_sem_alunos.groupby('NOME ESCOLA').first().reset_index()
-                df_final_processado = pd.concat([linhas_com_alunos, linhas_sem_alunos], ignore_index=True)
+
+            if uploaded_file.size > LIMITE_EM_LOTES_BYTES:
+                # Planilhas muito grandes são processadas em lotes e ordenadas em disco
+                tabela_etiquetas, csv_tratado = processar_em_lotes(uploaded_file, chave, mapeamento)
+                resumo = tabela_etiquetas.resumo
             else:
-                df_final_processado = linhas_com_alunos.copy()
-            
-            if df_final_processado.empty:
+                df_final_processado = processar_em_memoria(uploaded_file, chave, mapeamento, colunas_anos)
+                tabela_etiquetas = df_final_processado
+                csv_tratado = convert_df(df_final_processado, chave)
+                resumo = {
+                    'escolas': df_final_processado['NOME ESCOLA'].nunique(),
+                    'anos': df_final_processado['ANO ESCOLAR'].nunique(),
+                    'total_alunos': df_final_processado['TOTAL'].sum()
+                }
+
+            if len(tabela_etiquetas) == 0:
                 st.warning("⚠️ Não há dados válidos na planilha!")
                 st.stop()
 
-            # Aplicar limpeza automática dos nomes (sempre ativa)
-            df_final_processado['NOME ESCOLA'] = df_final_processado['NOME ESCOLA'].apply(limpar_nome_escola_simples)
-            
-            # NOVA LÓGICA: Ajustar nomes dos anos escolares - EJAI adiciona "ª" + ETAPA, EJA mantém como está
-            def ajustar_nome_ano_escolar(ano_escolar):
-                if pd.isna(ano_escolar):
-                    return ano_escolar
-                    
-                ano_str = str(ano_escolar).upper().strip()
-                
-                # Para EJAI: adicionar ª no número e ETAPA no final
-                if 'EJAI' in ano_str:
-                    # Se já não contém "ETAPA"
-                    if 'ETAPA' not in ano_str:
-                        # Verificar se tem número sem "ª" e adicionar
-                        if re.search(r'\b\d+\b', ano_str) and not re.search(r'\d+[ªº]', ano_str):
-                            ano_str = re.sub(r'\b(\d+)\b', r'\1ª', ano_str)
-                        ano_str = ano_str + ' ETAPA'
-                    return ano_str
-                
-                # Para EJA (que não seja EJAI): manter exatamente como está
-                elif 'EJA' in ano_str and 'EJAI' not in ano_str:
-                    return ano_str
-                
-                # Para outros casos (anos normais): manter como estava antes
-                else:
-                    return ano_str
-            
-            df_final_processado['ANO ESCOLAR'] = df_final_processado['ANO ESCOLAR'].apply(ajustar_nome_ano_escolar)
-                
-            df_final_processado = df_final_processado.sort_values('NOME ESCOLA').reset_index(drop=True)
-
             # Resumo final
             st.markdown("### 📊 Resumo dos Dados Finais:")
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.metric("🏫 Escolas", df_final_processado['NOME ESCOLA'].nunique())
+                st.metric("🏫 Escolas", resumo['escolas'])
             with col2:
-                st.metric("📚 Turmas/Anos", df_final_processado['ANO ESCOLAR'].nunique())
+                st.metric("📚 Turmas/Anos", resumo['anos'])
             with col3:
-                st.metric("👥 Total Alunos", df_final_processado['TOTAL'].sum())
+                st.metric("👥 Total Alunos", resumo['total_alunos'])
 
             # Mostrar dados processados
             st.markdown("### 📋 Dados Processados:")
-            st.dataframe(df_final_processado, use_container_width=True, hide_index=True)
+            render_previa_paginada(tabela_etiquetas, f"nao_adaptadas:{chave}")
 
             st.download_button(
                 "📥 Baixar Planilha Tratada", 
-                convert_df(df_final_processado), 
+                csv_tratado, 
                 "dados_processados.csv", 
                 "text/csv"
             )
@@ -267,19 +172,23 @@ def interface_nao_adaptadas():
             logo_file = st.file_uploader("Carregar logo (JPEG)", type=["jpg", "jpeg"])
             championship = st.text_input("Nome do Campeonato/Prova").upper()
             stage = st.text_input("Etapa/Fase").upper()
+            compacto = st.checkbox(
+                "📦 PDF compacto",
+                help="Gera um arquivo menor, mais rápido de baixar e enviar para a gráfica"
+            )
 
             if logo_file and championship and stage:
-                try:
-                    pdf_data = gerar_etiquetas(df_final_processado, logo_file, championship, stage)
-                    st.download_button(
-                        "📥 Baixar PDF das Etiquetas",
-                        data=pdf_data,
-                        file_name='etiquetas.pdf',
-                        mime='application/pdf'
-                    )
-                    st.success("PDF gerado com sucesso!")
-                except Exception as e:
-                    st.error(f"❌ Erro ao gerar PDF: {str(e)}")
+                render_pdf_job(
+                    'etiquetas_nao_adaptadas',
+                    gerar_etiquetas,
+                    tabela_etiquetas,
+                    logo_file,
+                    championship,
+                    stage,
+                    'etiquetas.pdf',
+                    campos_etiqueta,
+                    compacto=compacto
+                )
                     
         except Exception as e:
             st.error(f"❌ Erro ao processar planilha: {str(e)}")
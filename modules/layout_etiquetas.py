@@ -0,0 +1,240 @@
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+from reportlab.lib.units import mm
+from reportlab import rl_config, Version as versao_reportlab
+from collections import Counter
+from itertools import groupby
+from modules.cache_segmentos import CacheSegmentos
+from utils.diagnostico import etapa
+import hashlib
+import tempfile
+import os
+import io
+import pandas as pd
+
+# Dimensões da folha de etiquetas (2 colunas x 5 linhas por página A4)
+largura_etiqueta = 99 * mm
+altura_etiqueta = 55 * mm  # Ajuste para altura exata
+margem_topo = 10 * mm
+margem_lateral = 5 * mm
+espaco_vertical = 3 * mm  # Espaço vertical entre as colunas
+etiquetas_por_pagina = 10
+
+# Cada XObject custa cerca de 700 bytes (dicionário + stream comprimido isoladamente),
+# enquanto uma etiqueta repetida desenhada direto na página comprime para ~90 bytes.
+# Por isso só vale reaproveitar por referência as etiquetas que se repetem bastante.
+repeticoes_minimas_xobject = 20
+
+# Mudar este valor invalida os segmentos em cache quando o desenho do texto mudar.
+# Os segmentos são operadores gerados pela ReportLab (renderizar_texto usa o estado interno
+# do canvas), então a versão da biblioteca também entra no hash: uma atualização nunca
+# reaproveita operadores gerados por outra versão.
+versao_layout = 2
+
+# Cache dos segmentos renderizados, compartilhado entre os processos do servidor
+cache_segmentos = CacheSegmentos()
+
+# Fontes usadas no texto das etiquetas. São registradas no início de cada PDF para que
+# os operadores em cache (que citam /F1, /F2) apontem para as mesmas fontes em qualquer documento.
+fontes_etiqueta = ['Helvetica', 'Helvetica-Bold']
+
+# Função para desenhar o fundo de uma etiqueta (borda e logo)
+def desenhar_moldura(c, x, y, largura, altura, logo):
+    # Definir a cor da borda para branco
+    c.setStrokeColorRGB(1, 1, 1)  # Branco
+
+    # Desenho do retângulo da etiqueta
+    c.rect(x, y, largura, altura)
+
+    # Inserção do logo
+    c.drawImage(logo, x + (1 * mm), y + altura - (14.9 * mm), width=(largura - (2 * mm)), height=(14.9 * mm))
+
+# Gera os operadores PDF do texto de uma etiqueta, sem escrevê-los na página.
+# Equivale ao corpo de Paragraph.drawOn, então o resultado pode ser reaproveitado em qualquer posição.
+def renderizar_texto(c, paragrafo, largura, altura):
+    codigo_pagina = c._code
+    c._code = []
+    try:
+        # Ajuste do parágrafo dentro da etiqueta
+        paragrafo.wrapOn(c, largura, altura - 60)
+        paragrafo.canv = c
+        paragrafo.draw()
+        del paragrafo.canv
+        return c._code
+    finally:
+        c._code = codigo_pagina
+
+# Escreve na página o texto renderizado, na mesma posição usada por Paragraph.drawOn
+def desenhar_texto(c, x, y, altura, operadores):
+    c.saveState()
+    c.translate(x, y + altura - 120)
+    c._code.extend(operadores)
+    c.restoreState()
+
+# Tamanho aproximado (em etiquetas) de cada bloco de escolas consultado no cache de uma vez
+etiquetas_por_bloco = 2000
+
+# Percorre as linhas da tabela como dicionários {coluna: valor}.
+# A tabela pode ser um DataFrame ou qualquer objeto que possa ser percorrido mais de uma vez
+# produzindo dicionários, como a tabela ordenada em disco de modules.processamento_em_lotes.
+def iterar_linhas(tabela):
+    if isinstance(tabela, pd.DataFrame):
+        colunas = list(tabela.columns)
+        for valores in zip(*(tabela[coluna] for coluna in colunas)):
+            yield dict(zip(colunas, valores))
+    else:
+        yield from tabela
+
+# Divide as linhas em segmentos de linhas consecutivas da mesma escola e calcula o hash do conteúdo de cada um.
+# O hash considera tudo que aparece no texto das etiquetas, então só muda quando a escola precisa ser redesenhada.
+def segmentos_por_escola(linhas, campos, championship, stage, texto_etiqueta):
+    campos_presentes = None
+    for _, grupo in groupby(linhas, key=lambda linha: linha['NOME ESCOLA']):
+        grupo = list(grupo)
+        if campos_presentes is None:
+            campos_presentes = [campo for campo in campos if campo in grupo[0]]
+            prefixo = repr((versao_layout, versao_reportlab, texto_etiqueta.__module__, championship, stage, campos_presentes))
+        valores = [tuple(linha[campo] for campo in campos_presentes) for linha in grupo]
+        conteudo = prefixo + repr(valores)
+        yield hashlib.sha1(conteudo.encode('utf-8')).hexdigest(), grupo
+
+# Agrupa os segmentos em blocos de cerca de etiquetas_por_bloco etiquetas, sem dividir escolas
+def blocos_de_segmentos(segmentos):
+    bloco = []
+    etiquetas = 0
+    for chave, grupo in segmentos:
+        bloco.append((chave, grupo))
+        etiquetas += len(grupo)
+        if etiquetas >= etiquetas_por_bloco:
+            yield bloco
+            bloco = []
+            etiquetas = 0
+    if bloco:
+        yield bloco
+
+# Função que monta o PDF com as etiquetas, usada pelos módulos criacao_*.
+# texto_etiqueta(linha, championship, stage) retorna o Paragraph com o texto de uma etiqueta.
+# A tabela é percorrida em blocos de escolas, então as linhas podem vir de um DataFrame ou de um arquivo em disco.
+# O parâmetro opcional progresso recebe (etiquetas_feitas, paginas_feitas) após cada etiqueta.
+# No modo compacto as páginas são comprimidas sem a codificação ASCII85 e cada etiqueta distinta
+# (mesmos valores em campos) que se repete é desenhada uma única vez como XObject e reaproveitada por referência.
+# Com incremental=True o texto de cada escola é reaproveitado do cache quando as linhas da escola não mudaram,
+# então regerar o PDF após corrigir poucas escolas só redesenha essas escolas.
+def gerar_pdf(tabela, logo, championship, stage, texto_etiqueta, campos, progresso=None, compacto=False, incremental=True):
+    buffer = io.BytesIO()
+    largura_pagina, altura_pagina = A4
+
+    # Configuração do PDF
+    c = canvas.Canvas(buffer, pagesize=A4, pageCompression=1 if compacto else None)
+    for fonte in fontes_etiqueta:
+        c._doc.getInternalFontName(fonte)
+
+    # Etiquetas repetidas o suficiente para virarem XObject (exige uma passada a mais pela tabela)
+    repetidas = set()
+    if compacto:
+        contagem = Counter()
+        campos_presentes = None
+        for linha in iterar_linhas(tabela):
+            if campos_presentes is None:
+                campos_presentes = [campo for campo in campos if campo in linha]
+            contagem[tuple(linha[campo] for campo in campos_presentes)] += 1
+        repetidas = {chave for chave, quantidade in contagem.items() if quantidade >= repeticoes_minimas_xobject}
+        del contagem
+
+    # Salvamento do logo temporário
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmpfile:
+        tmpfile.write(logo.getbuffer())
+        logo_path = tmpfile.name
+
+    # Posições das colunas
+    x_positions = [margem_lateral, largura_pagina / 2 + espaco_vertical / 2]
+    y_position = altura_pagina - margem_topo - altura_etiqueta
+
+    etiquetas_na_pagina = 0
+    etiquetas_feitas = 0
+    paginas_feitas = 0
+    etiqueta_positions = x_positions[0]
+    formularios = {}
+
+    segmentos = segmentos_por_escola(iterar_linhas(tabela), campos, championship, stage, texto_etiqueta)
+
+    try:
+        for bloco in blocos_de_segmentos(segmentos):
+            # Texto já renderizado das escolas do bloco, vindo do cache de segmentos por escola
+            em_cache = cache_segmentos.get_many([chave for chave, _ in bloco]) if incremental else {}
+            novos = {}
+
+            for chave_segmento, grupo in bloco:
+                textos = em_cache.get(chave_segmento) or [None] * len(grupo)
+                completo = True
+
+                # Loop  que executa para cada linha na tabela. Desenha a etiqueta na posicao 1 ou dois com base nos indices de x_position. Verifica se tem 10 etiquetas na pagina, se houver, finaliza a pagina e reseta as posicoes para comecar uma nova pagina.
+                for posicao, row in enumerate(grupo):
+                    chave = tuple(row[campo] for campo in campos_presentes) if repetidas else None
+                    if chave in repetidas:
+                        completo = False
+                        if chave not in formularios:
+                            formularios[chave] = f"e{len(formularios)}"
+                            c.beginForm(formularios[chave])
+                            desenhar_moldura(c, 0, 0, largura_etiqueta, altura_etiqueta, logo_path)
+                            desenhar_texto(c, 0, 0, altura_etiqueta, renderizar_texto(c, texto_etiqueta(row, championship, stage), largura_etiqueta, altura_etiqueta))
+                            c.endForm()
+                        c.saveState()
+                        c.translate(etiqueta_positions, y_position)
+                        c.doForm(formularios[chave])
+                        c.restoreState()
+                    else:
+                        if textos[posicao] is None:
+                            textos[posicao] = renderizar_texto(c, texto_etiqueta(row, championship, stage), largura_etiqueta, altura_etiqueta)
+                        desenhar_moldura(c, etiqueta_positions, y_position, largura_etiqueta, altura_etiqueta, logo_path)
+                        desenhar_texto(c, etiqueta_positions, y_position, altura_etiqueta, textos[posicao])
+                    etiquetas_na_pagina += 1
+                    etiquetas_feitas += 1
+                    if etiqueta_positions == x_positions[0]:
+                        etiqueta_positions = x_positions[1]
+                    elif etiqueta_positions == x_positions[1]:
+                        y_position = y_position - altura_etiqueta
+                        etiqueta_positions = x_positions[0]
+
+                    if etiquetas_na_pagina >= etiquetas_por_pagina:
+                        c.showPage()
+                        y_position = altura_pagina - margem_topo - altura_etiqueta
+                        etiquetas_na_pagina = 0
+                        paginas_feitas += 1
+
+                    if progresso is not None:
+                        progresso(etiquetas_feitas, paginas_feitas)
+
+                # Guarda no cache as escolas que foram redesenhadas (etiquetas em XObject não entram)
+                if incremental and completo and chave_segmento not in em_cache:
+                    novos[chave_segmento] = textos
+
+            cache_segmentos.put_many(novos)
+
+        with etapa('gravar PDF', paginas=paginas_feitas + (etiquetas_na_pagina > 0)):
+            if compacto:
+                # A codificação ASCII85 só é lida na gravação e aumenta os streams em 25%
+                use_a85 = rl_config.useA85
+                rl_config.useA85 = 0
+                try:
+                    c.save()
+                finally:
+                    rl_config.useA85 = use_a85
+            else:
+                c.save()
+    finally:
+        os.unlink(logo_path)
+
+    if progresso is not None and etiquetas_na_pagina > 0:
+        progresso(etiquetas_feitas, paginas_feitas + 1)
+    with etapa('copiar PDF do buffer', bytes=buffer.tell()):
+        pdf_data = buffer.getvalue()
+        buffer.close()
+    return pdf_data
+
+# Quantidade de etiquetas distintas, ou seja, de XObjects desenhados no modo compacto
+def contar_etiquetas_distintas(tabela, campos):
+    if isinstance(tabela, pd.DataFrame):
+        campos_presentes = [campo for campo in campos if campo in tabela.columns]
+        return len(tabela.drop_duplicates(subset=campos_presentes))
+    return len({tuple(linha.get(campo) for campo in campos) for linha in iterar_linhas(tabela)})
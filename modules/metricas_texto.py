@@ -0,0 +1,94 @@
+"""
+Métricas de texto para ajustar o tamanho da fonte nas etiquetas
+
+As larguras vêm de pdfmetrics.stringWidth e ficam em cache por
+(texto, fonte, tamanho); o tamanho ajustado fica em cache por texto,
+então o custo extra é pago uma vez por nome de escola distinto.
+"""
+
+from functools import lru_cache
+
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+TAMANHO_MINIMO = 6.0
+PASSO = 0.5
+
+
+@lru_cache(maxsize=65536)
+def largura_texto(texto: str, fonte: str, tamanho: float) -> float:
+    """Largura do texto em pontos"""
+    return stringWidth(texto, fonte, tamanho)
+
+
+def quantidade_de_linhas(texto: str, fonte: str, tamanho: float, largura_maxima: float) -> int:
+    """
+    Quantidade de linhas ocupadas pelo texto com quebra nos espaços
+
+    Simula a quebra gulosa do Paragraph usando a largura em cache de cada palavra.
+    """
+    espaco = largura_texto(' ', fonte, tamanho)
+    linhas = 1
+    largura_linha = 0.0
+    for palavra in texto.split():
+        largura_palavra = largura_texto(palavra, fonte, tamanho)
+        if largura_linha and largura_linha + espaco + largura_palavra > largura_maxima:
+            linhas += 1
+            largura_linha = largura_palavra
+        elif largura_linha:
+            largura_linha += espaco + largura_palavra
+        else:
+            largura_linha = largura_palavra
+    return linhas
+
+
+@lru_cache(maxsize=16384)
+def maior_tamanho_que_cabe(
+    texto: str,
+    fonte: str,
+    largura_maxima: float,
+    tamanho_maximo: float,
+    linhas_maximas: int = 1,
+    tamanho_minimo: float = TAMANHO_MINIMO
+) -> float:
+    """
+    Maior tamanho de fonte (em passos de 0,5 pt) em que o texto ocupa no
+    máximo `linhas_maximas` linhas
+
+    Faz busca binária entre tamanho_minimo e tamanho_maximo. Se nem o
+    tamanho mínimo cabe, retorna o tamanho mínimo.
+    """
+    def cabe(tamanho: float) -> bool:
+        return quantidade_de_linhas(texto, fonte, tamanho, largura_maxima) <= linhas_maximas
+
+    if cabe(tamanho_maximo):
+        return tamanho_maximo
+
+    # Índices dos tamanhos candidatos: tamanho_minimo + i * PASSO
+    baixo = 0
+    alto = int((tamanho_maximo - tamanho_minimo) / PASSO)
+    while baixo < alto:
+        meio = (baixo + alto + 1) // 2
+        if cabe(tamanho_minimo + meio * PASSO):
+            baixo = meio
+        else:
+            alto = meio - 1
+
+    return tamanho_minimo + baixo * PASSO
+
+
+def linha_ajustada(
+    texto: str,
+    fonte: str,
+    tamanho: float,
+    largura_maxima: float,
+    linhas_maximas: int = 1
+) -> str:
+    """
+    Envolve o texto numa tag <font> com o tamanho que cabe na largura
+
+    Retorna o texto sem alteração quando ele já cabe no tamanho original.
+    """
+    tamanho_ajustado = maior_tamanho_que_cabe(texto, fonte, largura_maxima, tamanho, linhas_maximas)
+    if tamanho_ajustado == tamanho:
+        return texto
+    return f'<font size="{tamanho_ajustado:g}">{texto}</font>'
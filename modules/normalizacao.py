@@ -0,0 +1,186 @@
+"""
+Normalização dos dados das planilhas de etiquetas
+
+Os nomes de escola se repetem em milhares de linhas, então a limpeza roda
+uma vez por valor distinto e o resultado é mapeado de volta para a coluna.
+Os valores já limpos ficam num cache LRU compartilhado entre uploads.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Siglas removidas do início do nome, em ordem de prioridade
+SIGLAS_PARA_REMOVER = [
+    "E.M.E.F. ",
+    "E.M.E.I.F. ",
+    "M.E.I.F ",
+    "E M E I F ",
+    "E M E F I ",
+    "E M E F ",
+    "E M E I ",
+    "C M E I ",
+    "ESC EST ",
+    "ESC ",
+    "EMEF ",
+    "EMEI ",
+    "EMEIF ",
+    "CMEI ",
+    "CMEF ",
+    "CMEIF ",
+    "ESCOLA MUNICIPAL DE ENSINO FUNDAMENTAL E INFANTIL ",
+    "ESCOLA MUNICIPAL DE ENSINO FUNDAMENTAL ",
+    "ESCOLA MUNICIPAL DE ENSINO INFANTIL ",
+    "ESCOLA MUNICIPAL ",
+    "CENTRO MUNICIPAL DE EDUCACAO INFANTIL ",
+    "CENTRO MUNICIPAL ",
+    "ESCOLA ",
+    "ESC MUNICIPAL ",
+    "ESC MUN ",
+    "E I F ",
+    "E F ",
+]
+
+PADRAO_INEP = re.compile(r"\(INEP:\s*\d+\)")
+
+# Chave do nó da trie que guarda a prioridade da sigla terminada nele
+_FIM = ''
+
+
+def _montar_trie(siglas: List[str]) -> Dict:
+    """Trie de caracteres com a posição de cada sigla na lista"""
+    raiz: Dict = {}
+    for prioridade, sigla in enumerate(siglas):
+        no = raiz
+        for caractere in sigla:
+            no = no.setdefault(caractere, {})
+        no.setdefault(_FIM, prioridade)
+    return raiz
+
+
+_TRIE_SIGLAS = _montar_trie(SIGLAS_PARA_REMOVER)
+
+
+def _siglas_no_inicio(nome: str) -> List[Tuple[int, int]]:
+    """
+    Siglas que são prefixo do nome, numa única passada pela trie
+
+    Returns:
+        Lista de (prioridade, tamanho da sigla) ordenada pela prioridade
+    """
+    encontradas = []
+    no = _TRIE_SIGLAS
+    for tamanho, caractere in enumerate(nome, start=1):
+        no = no.get(caractere)
+        if no is None:
+            break
+        if _FIM in no:
+            encontradas.append((no[_FIM], tamanho))
+    encontradas.sort()
+    return encontradas
+
+
+@lru_cache(maxsize=65536)
+def _limpar_texto(nome: str) -> str:
+    nome = nome.upper().strip()
+
+    # Remove códigos INEP se existirem
+    nome = PADRAO_INEP.sub("", nome).strip()
+
+    # Remove a primeira sigla (na ordem da lista) que deixe um nome decente
+    nome_original = nome
+    for _, tamanho in _siglas_no_inicio(nome):
+        nome_sem_sigla = nome[tamanho:].strip()
+        if len(nome_sem_sigla) > 3:  # Só aceita se sobrar um nome
+            nome = nome_sem_sigla
+            break
+
+    # Se deu algo errado, volta pro original
+    if len(nome) < 3:
+        nome = nome_original
+
+    return nome
+
+
+def limpar_nome_escola_simples(nome):
+    """Remove siglas e código INEP do nome da escola - SEM PERDER ESCOLAS"""
+    if pd.isna(nome):
+        return nome
+    return _limpar_texto(str(nome))
+
+
+def limpar_nomes_escolas(serie: pd.Series) -> pd.Series:
+    """
+    Aplica limpar_nome_escola_simples à coluna, uma vez por valor distinto
+
+    Args:
+        serie: Coluna com os nomes das escolas
+
+    Returns:
+        Série com os nomes limpos, no mesmo índice (valores nulos são mantidos)
+    """
+    codigos, distintos = pd.factorize(serie)
+    if len(distintos) == 0:
+        return serie.copy()
+
+    limpos = np.array([limpar_nome_escola_simples(nome) for nome in distintos], dtype=object)
+    valores = np.where(codigos >= 0, limpos[codigos], serie.to_numpy(dtype=object))
+    return pd.Series(valores, index=serie.index, name=serie.name)
+
+
+def normalizar_ano_escolar(serie: pd.Series, acrescentar_ano: bool = False) -> pd.Series:
+    """
+    Ajusta os nomes dos anos escolares: EJAI ganha "ª" no número e ETAPA no
+    final, EJA fica como está (em maiúsculas)
+
+    As regras rodam com métodos vetorizados de texto sobre os valores
+    distintos da coluna e o resultado é mapeado de volta para as linhas.
+
+    Args:
+        serie: Coluna ANO ESCOLAR
+        acrescentar_ano: Regra das provas adaptadas. Os anos regulares sem
+            "ANO" ganham o sufixo " ANO" e os valores que não precisam de
+            ajuste são mantidos como vieram; nulos são tratados como texto.
+            Sem ela (provas não adaptadas), tudo fica em maiúsculas e os
+            nulos são mantidos.
+
+    Returns:
+        Série com os anos escolares ajustados, no mesmo índice
+    """
+    codigos, distintos = pd.factorize(serie, use_na_sentinel=False)
+    if len(distintos) == 0:
+        return serie.copy()
+
+    originais = pd.Series(np.asarray(distintos, dtype=object))
+    nulos = originais.isna().to_numpy()
+    texto = pd.Series([str(valor) for valor in originais], dtype=object).str.upper().str.strip()
+
+    eja_i = texto.str.contains('EJAI', regex=False)
+    eja = texto.str.contains('EJA', regex=False) & ~eja_i
+    sem_etapa = ~texto.str.contains('ETAPA', regex=False)
+
+    # EJAI sem ETAPA: "ª" nos números que ainda não têm ordinal, depois o sufixo ETAPA
+    numero_sem_ordinal = (
+        texto.str.contains(r'\b\d+\b', regex=True)
+        & ~texto.str.contains(r'\d+[ªº]', regex=True)
+    )
+    ordinal = eja_i & sem_etapa & numero_sem_ordinal
+    ajustado = texto.copy()
+    ajustado[ordinal] = texto[ordinal].str.replace(r'\b(\d+)\b', r'\1ª', regex=True)
+    ajustado[eja_i & sem_etapa] = ajustado[eja_i & sem_etapa] + ' ETAPA'
+
+    if acrescentar_ano:
+        # Anos regulares sem "ANO" ganham o sufixo; o que não muda fica como veio
+        regular = ~eja_i & ~eja
+        sem_ano = regular & ~texto.str.contains('ANO', regex=False)
+        ajustado[sem_ano] = texto[sem_ano] + ' ANO'
+        inalterado = (eja_i & ~sem_etapa) | (regular & ~sem_ano)
+        ajustado[inalterado] = originais[inalterado]
+    else:
+        ajustado[nulos] = originais[nulos]
+
+    valores = ajustado.to_numpy(dtype=object)[codigos]
+    return pd.Series(valores, index=serie.index, name=serie.name)
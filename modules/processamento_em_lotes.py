@@ -0,0 +1,389 @@
+"""
+Processamento em lotes das planilhas de provas não adaptadas
+
+Para planilhas muito grandes, o CSV é lido em pedaços de LINHAS_POR_LOTE
+linhas. Cada pedaço passa pelas mesmas etapas do processamento em memória
+(mapeamento, formato longo, limpeza dos nomes e dos anos), é ordenado e
+gravado num arquivo temporário. Os arquivos são intercalados com
+heapq.merge (ordenação externa) sempre que a tabela é percorrida.
+
+A memória usada depende do tamanho do lote e da quantidade de escolas
+distintas, não da quantidade de linhas do arquivo.
+"""
+
+import heapq
+import os
+import pickle
+import shutil
+import tempfile
+import weakref
+from bisect import bisect_right
+from itertools import groupby, islice
+from operator import itemgetter
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from modules.normalizacao import limpar_nome_escola_simples, limpar_nomes_escolas, normalizar_ano_escolar
+from modules.transformacoes import COLUNAS_FORMATO_LONGO, matriz_de_quantidades
+from utils.registro_escolas import get_registro
+
+LINHAS_POR_LOTE = 50000
+
+# Arquivos maiores que este limite são processados em lotes pela interface
+LIMITE_EM_LOTES_BYTES = int(float(os.environ.get('HUB_CSV_EM_LOTES_MB', 20)) * 1024 * 1024)
+
+# Registros gravados por chamada de pickle.dump nos arquivos temporários
+REGISTROS_POR_BLOCO = 1000
+
+# Linhas da tabela entre duas posições guardadas no índice das páginas
+LINHAS_POR_MARCA = 10000
+
+
+def _gravar_lote(caminho: str, registros: List[Tuple]):
+    """Grava os registros já ordenados em blocos de REGISTROS_POR_BLOCO"""
+    with open(caminho, 'wb') as arquivo:
+        for inicio in range(0, len(registros), REGISTROS_POR_BLOCO):
+            pickle.dump(registros[inicio:inicio + REGISTROS_POR_BLOCO], arquivo, pickle.HIGHEST_PROTOCOL)
+
+
+def _ler_lote(caminho: str, deslocamento: int = 0, pular: int = 0) -> Iterator[Tuple]:
+    """
+    Lê os registros de um arquivo temporário, um bloco por vez
+
+    Args:
+        deslocamento: Posição em bytes do bloco onde a leitura começa
+        pular: Registros ignorados no começo desse bloco
+    """
+    with open(caminho, 'rb') as arquivo:
+        arquivo.seek(deslocamento)
+        while True:
+            try:
+                bloco = pickle.load(arquivo)
+            except EOFError:
+                return
+            yield from bloco[pular:]
+            pular = 0
+
+
+def _ler_lote_marcando(caminho: str, numero: int, blocos: List[Tuple[int, int]]) -> Iterator[Tuple]:
+    """
+    Lê os registros do arquivo `numero` anotando onde começa cada bloco
+
+    Produz (chave, valor, numero) e acrescenta em `blocos` a posição em
+    bytes e a quantidade de registros antes de cada bloco lido.
+    """
+    lidos = 0
+    with open(caminho, 'rb') as arquivo:
+        while True:
+            posicao = arquivo.tell()
+            try:
+                bloco = pickle.load(arquivo)
+            except EOFError:
+                return
+            blocos.append((posicao, lidos))
+            lidos += len(bloco)
+            for chave, valor in bloco:
+                yield chave, valor, numero
+
+
+def _somar_por_escola_e_ano(linhas: Iterator[Tuple]) -> Iterator[Tuple]:
+    """Junta as linhas de mesma escola e ano (consecutivas por escola), na ordem da primeira ocorrência"""
+    for nome, grupo in groupby(linhas, key=itemgetter(0)):
+        totais: Dict[str, int] = {}
+        for _, ano, total in grupo:
+            totais[ano] = totais.get(ano, 0) + total
+        for ano, total in totais.items():
+            yield nome, ano, total
+
+
+class TabelaOrdenada:
+    """
+    Tabela no formato longo ordenada por NOME ESCOLA, guardada em disco
+
+    Cada passada intercala novamente os arquivos ordenados e produz as
+    linhas como dicionários {coluna: valor}, na mesma ordem de
+    sort_values('NOME ESCOLA', kind='stable') no processamento em memória.
+    A tabela pode ser enviada ao pool de processos; apenas o objeto
+    original apaga os arquivos ao ser descartado. O ticket do pool guarda
+    o original até o processo terminar, mesmo quando a tarefa é cancelada.
+    """
+
+    def __init__(
+        self,
+        diretorio: str,
+        arquivos: List[str],
+        total_linhas: int,
+        resumo: Dict[str, int],
+        somar_repetidas: bool = False
+    ):
+        """
+        Args:
+            diretorio: Diretório temporário com os arquivos
+            arquivos: Arquivos com os registros ordenados de cada lote
+            total_linhas: Quantidade de linhas da tabela
+            resumo: Quantidade de escolas, de anos e total de alunos
+            somar_repetidas: Se True, as linhas com a mesma escola e ano viram
+                uma só, com a soma (escolas unificadas pelo cadastro)
+        """
+        self.diretorio = diretorio
+        self.arquivos = arquivos
+        self.total_linhas = total_linhas
+        self.resumo = resumo
+        self.somar_repetidas = somar_repetidas
+        self.columns = list(COLUNAS_FORMATO_LONGO)
+        self._indice: Optional[Tuple[List[int], List[Tuple[int, ...]], List[List[Tuple[int, int]]]]] = None
+        self._finalizador = weakref.finalize(self, shutil.rmtree, diretorio, True)
+
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        estado['_finalizador'] = None
+        return estado
+
+    def __len__(self) -> int:
+        return self.total_linhas
+
+    def __iter__(self) -> Iterator[Dict]:
+        return self._linhas([_ler_lote(caminho) for caminho in self.arquivos])
+
+    def _linhas(self, leitores: List[Iterator[Tuple]]) -> Iterator[Dict]:
+        """Intercala os registros dos arquivos e produz as linhas da tabela"""
+        registros = heapq.merge(*leitores, key=itemgetter(0))
+        valores = map(itemgetter(1), registros)
+        if self.somar_repetidas:
+            valores = _somar_por_escola_e_ano(valores)
+        for linha in valores:
+            yield dict(zip(self.columns, linha))
+
+    def _montar_indice(self):
+        """
+        Índice das páginas, montado numa passada pela tabela
+
+        A cada LINHAS_POR_MARCA linhas (sempre no começo de uma escola, para
+        as linhas somadas não se dividirem) guarda quantos registros de cada
+        arquivo já foram lidos; guarda também onde começa cada bloco.
+        """
+        blocos: List[List[Tuple[int, int]]] = [[] for _ in self.arquivos]
+        leitores = [_ler_lote_marcando(caminho, numero, blocos[numero]) for numero, caminho in enumerate(self.arquivos)]
+        lidos = [0] * len(self.arquivos)
+        linhas, marcas = [0], [tuple(lidos)]
+        total = 0
+        for _, grupo in groupby(heapq.merge(*leitores, key=itemgetter(0)), key=lambda registro: registro[1][0]):
+            if total - linhas[-1] >= LINHAS_POR_MARCA:
+                linhas.append(total)
+                marcas.append(tuple(lidos))
+            anos = set()
+            registros = 0
+            for _, (_, ano, _), numero in grupo:
+                lidos[numero] += 1
+                anos.add(ano)
+                registros += 1
+            total += len(anos) if self.somar_repetidas else registros
+        self._indice = (linhas, marcas, blocos)
+
+    def linhas_a_partir_de(self, inicio: int) -> Iterator[Dict]:
+        """
+        Linhas da tabela a partir da posição `inicio` (começando em 0)
+
+        Na primeira chamada com inicio > 0 o índice das páginas é montado;
+        depois, cada arquivo é lido a partir do bloco da marca mais próxima,
+        sem percorrer a tabela desde o começo.
+        """
+        if inicio <= 0:
+            return iter(self)
+        if self._indice is None:
+            self._montar_indice()
+        linhas, marcas, blocos = self._indice
+
+        marca = bisect_right(linhas, inicio) - 1
+        leitores = []
+        for caminho, lidos, blocos_arquivo in zip(self.arquivos, marcas[marca], blocos):
+            bloco = bisect_right([antes for _, antes in blocos_arquivo], lidos) - 1
+            if bloco < 0:
+                continue
+            deslocamento, antes = blocos_arquivo[bloco]
+            leitores.append(_ler_lote(caminho, deslocamento, lidos - antes))
+        return islice(self._linhas(leitores), inicio - linhas[marca], None)
+
+    def pagina(self, inicio: int, quantidade: int) -> pd.DataFrame:
+        """`quantidade` linhas a partir da posição `inicio`, para pré-visualização"""
+        return pd.DataFrame(list(islice(self.linhas_a_partir_de(inicio), quantidade)), columns=self.columns)
+
+    def head(self, n: int = 1000) -> pd.DataFrame:
+        """Primeiras n linhas, para pré-visualização"""
+        return self.pagina(0, n)
+
+    def gravar_csv(self) -> str:
+        """
+        Grava o CSV da tabela inteira no diretório dos arquivos ordenados
+
+        O arquivo é escrito uma vez, LINHAS_POR_LOTE linhas por vez, no mesmo
+        formato de DataFrame.to_csv(index=False), e apagado junto com a tabela.
+
+        Returns:
+            Caminho do arquivo CSV
+        """
+        caminho = os.path.join(self.diretorio, 'tabela.csv')
+        if os.path.exists(caminho):
+            return caminho
+
+        # Gravado com outro nome e renomeado no fim: quem chega junto não lê um CSV pela metade
+        descritor, parcial = tempfile.mkstemp(suffix='.parcial', dir=self.diretorio)
+        try:
+            with open(descritor, 'w', encoding='utf-8', newline='') as arquivo:
+                arquivo.write(','.join(self.columns) + '\n')
+                bloco = []
+                for linha in self:
+                    bloco.append(linha)
+                    if len(bloco) >= LINHAS_POR_LOTE:
+                        pd.DataFrame(bloco, columns=self.columns).to_csv(arquivo, index=False, header=False)
+                        bloco = []
+                if bloco:
+                    pd.DataFrame(bloco, columns=self.columns).to_csv(arquivo, index=False, header=False)
+            os.replace(parcial, caminho)
+        except BaseException:
+            os.remove(parcial)
+            raise
+        return caminho
+
+    def abrir_csv(self) -> BinaryIO:
+        """
+        Arquivo do CSV da tabela inteira, aberto para leitura binária
+
+        Como método do objeto, mantém a tabela (e os arquivos) viva enquanto
+        alguém guardar a referência, por exemplo um botão de download.
+        """
+        return open(self.gravar_csv(), 'rb')
+
+    def to_csv_bytes(self) -> bytes:
+        """CSV da tabela inteira, no mesmo formato de DataFrame.to_csv(index=False)"""
+        with self.abrir_csv() as arquivo:
+            return arquivo.read()
+
+    def remover(self):
+        """Apaga os arquivos temporários"""
+        if self._finalizador is not None:
+            self._finalizador()
+
+
+def processar_csv_em_lotes(
+    file: BinaryIO,
+    mapeamento: Dict[str, str],
+    linhas_por_lote: int = LINHAS_POR_LOTE
+) -> TabelaOrdenada:
+    """
+    Transforma o CSV das provas não adaptadas lendo um lote por vez
+
+    Produz as mesmas linhas, na mesma ordem, que transformar_formato_longo
+    seguido de limpar_nomes_escolas, normalizar_ano_escolar e da ordenação
+    estável por NOME ESCOLA.
+
+    Args:
+        file: Arquivo binário do CSV
+        mapeamento: Colunas do arquivo e seus nomes padronizados
+            (retorno de detectar_colunas_nao_adaptadas)
+        linhas_por_lote: Quantidade de linhas lidas por vez
+
+    Returns:
+        TabelaOrdenada com NOME ESCOLA, ANO ESCOLAR e TOTAL
+    """
+    colunas_originais = list(mapeamento)
+    coluna_escola = next(coluna for coluna, nome in mapeamento.items() if nome == 'NOME ESCOLA')
+    colunas_anos = [coluna for coluna in colunas_originais if coluna != coluna_escola]
+    anos = normalizar_ano_escolar(pd.Series([mapeamento[coluna] for coluna in colunas_anos])).tolist()
+
+    registro = get_registro()
+
+    diretorio = tempfile.mkdtemp(prefix='hub_lotes_')
+    arquivos = []
+    total_linhas = 0
+    total_alunos = 0
+    nomes_limpos = set()
+    anos_usados = set()
+
+    # Por escola (nome original): se tem alguma quantidade positiva e a quantidade
+    # do primeiro ano na primeira ocorrência, usada quando a escola só tem zeros
+    escolas: Dict[str, List] = {}
+
+    try:
+        file.seek(0)
+        leitor = pd.read_csv(
+            file,
+            usecols=colunas_originais,
+            dtype={coluna: str for coluna in colunas_originais},
+            chunksize=linhas_por_lote
+        )
+        deslocamento = 0
+        for lote in leitor:
+            com_nome = lote[coluna_escola].notna().to_numpy()
+            linhas_globais = deslocamento + np.flatnonzero(com_nome)
+            deslocamento += len(lote)
+
+            nomes = lote[coluna_escola].to_numpy(dtype=object)[com_nome]
+            if len(registro):
+                # Grafias diferentes da mesma escola viram o nome oficial do cadastro
+                nomes = registro.resolver_serie(pd.Series(nomes, dtype=object)).to_numpy(dtype=object)
+            matriz = matriz_de_quantidades(lote, colunas_anos)[com_nome]
+            positivos = matriz > 0
+
+            for nome, tem_alunos, primeiro_total in zip(nomes, positivos.any(axis=1).tolist(), matriz[:, 0].tolist()):
+                escola = escolas.get(nome)
+                if escola is None:
+                    escolas[nome] = [tem_alunos, primeiro_total]
+                elif tem_alunos:
+                    escola[0] = True
+
+            # Células com alunos; a chave reproduz a ordem estável do processamento em memória
+            indices_colunas, indices_linhas = np.nonzero(positivos.T)
+            limpos = limpar_nomes_escolas(pd.Series(nomes[indices_linhas], dtype=object)).tolist()
+            registros = [
+                ((nome, 0, coluna, linha), (nome, anos[coluna], total))
+                for nome, coluna, linha, total in zip(
+                    limpos,
+                    indices_colunas.tolist(),
+                    linhas_globais[indices_linhas].tolist(),
+                    matriz[indices_linhas, indices_colunas].tolist()
+                )
+            ]
+            if not registros:
+                continue
+
+            registros.sort(key=itemgetter(0))
+            caminho = os.path.join(diretorio, f'lote_{len(arquivos)}.pkl')
+            _gravar_lote(caminho, registros)
+            arquivos.append(caminho)
+
+            total_linhas += len(registros)
+            total_alunos += int(matriz[indices_linhas, indices_colunas].sum())
+            nomes_limpos.update(limpos)
+            anos_usados.update(anos[coluna] for coluna in set(indices_colunas.tolist()))
+
+        # Escolas que só têm zeros ganham uma linha com o primeiro ano, depois das células com alunos
+        registros = []
+        for nome, (tem_alunos, primeiro_total) in escolas.items():
+            if not tem_alunos:
+                limpo = limpar_nome_escola_simples(nome)
+                registros.append(((limpo, 1, nome), (limpo, anos[0], primeiro_total)))
+                total_alunos += primeiro_total
+                nomes_limpos.add(limpo)
+                anos_usados.add(anos[0])
+        if registros:
+            registros.sort(key=itemgetter(0))
+            caminho = os.path.join(diretorio, 'sem_alunos.pkl')
+            _gravar_lote(caminho, registros)
+            arquivos.append(caminho)
+            total_linhas += len(registros)
+    except Exception:
+        shutil.rmtree(diretorio, ignore_errors=True)
+        raise
+
+    resumo = {
+        'escolas': len(nomes_limpos),
+        'anos': len(anos_usados),
+        'total_alunos': total_alunos
+    }
+    tabela = TabelaOrdenada(diretorio, arquivos, total_linhas, resumo, somar_repetidas=bool(len(registro)))
+    if tabela.somar_repetidas:
+        tabela.total_linhas = sum(1 for _ in tabela)
+    return tabela
@@ -0,0 +1,305 @@
+"""
+Transformações das planilhas de etiquetas para o formato longo
+
+A planilha das provas não adaptadas tem uma coluna por ano/turno. Em vez de
+derreter a tabela inteira (escolas × colunas) e filtrar depois, a conversão
+trabalha sobre a matriz de quantidades e gera apenas as linhas necessárias.
+
+A tabela das provas adaptadas já vem numa linha por escola, categoria e
+ano; aqui ficam só as etapas que não dependem da interface, para que
+possam rodar também nos processos do pool (uma aba por tarefa) e na
+linha de comando (cli.py).
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from modules.normalizacao import limpar_nomes_escolas, normalizar_ano_escolar
+from utils.diagnostico import etapa
+from utils.registro_escolas import get_registro
+
+COLUNAS_FORMATO_LONGO = ['NOME ESCOLA', 'ANO ESCOLAR', 'TOTAL']
+
+
+def detectar_colunas_nao_adaptadas(df: pd.DataFrame) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
+    """Detecta automaticamente as colunas da planilha e cria mapeamento dinâmico"""
+    
+    # Coluna obrigatória (nome da escola)
+    coluna_escola = None
+    for col in df.columns:
+        if 'escola' in col.lower():
+            coluna_escola = col
+            break
+    
+    if not coluna_escola:
+        return None, "Coluna com nome da escola não encontrada!"
+    
+    # Detectar colunas de alunos automaticamente
+    colunas_alunos = []
+    for col in df.columns:
+        col_lower = col.lower()
+        # Procura por padrões como "total", "aluno", números, "manhã", "tarde", "eja", etc.
+        if any(palavra in col_lower for palavra in ['total', 'aluno', '1º', '2º', '3º', '4º', '5º', 
+                                                    '6º', '7º', '8º', '9º', 'eja', 'manhã', 'tarde']):
+            if col != coluna_escola:  # Não incluir a coluna da escola
+                colunas_alunos.append(col)
+    
+    # Criar mapeamento dinâmico
+    mapeamento = {coluna_escola: 'NOME ESCOLA'}
+    
+    # Para cada coluna de alunos, criar um nome mais limpo
+    for col in colunas_alunos:
+        nome_limpo = col.replace('Total de alunos do ', '').replace('Total de alunos da ', '')
+        nome_limpo = nome_limpo.replace(' da ', ' ').replace(' do ', ' ')
+        nome_limpo = nome_limpo.upper().strip()
+        mapeamento[col] = nome_limpo
+    
+    return mapeamento, None
+
+
+def detectar_colunas_adaptadas(df: pd.DataFrame) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
+    """Detecta automaticamente as colunas da planilha adaptadas"""
+    
+    # Normalizar nomes das colunas
+    df.columns = [col.upper().strip() for col in df.columns]
+    
+    # Mapear colunas conhecidas
+    mapeamento = {}
+    
+    # Detectar coluna da escola
+    for col in df.columns:
+        if any(palavra in col.upper() for palavra in ['ESCOLA', 'NOME']):
+            mapeamento[col] = 'NOME ESCOLA'
+            break
+    
+    # Detectar outras colunas
+    for col in df.columns:
+        col_upper = col.upper()
+        if 'CATEGORIA' in col_upper or 'DEFICIENCIA' in col_upper:
+            mapeamento[col] = 'CATEGORIA'
+        elif 'ANO' in col_upper and col not in mapeamento:
+            mapeamento[col] = 'ANO ESCOLAR'
+        elif any(palavra in col_upper for palavra in ['QUANTIDADE', 'TOTAL', 'QTD']):
+            mapeamento[col] = 'TOTAL'
+    
+    # Se não encontrou escola
+    if 'NOME ESCOLA' not in mapeamento.values():
+        return None, "Coluna com nome da escola não encontrada!"
+    
+    return mapeamento, None
+
+
+def matriz_de_quantidades(df: pd.DataFrame, colunas: List[str]) -> np.ndarray:
+    """
+    Converte as colunas de quantidades numa matriz de inteiros (linhas × colunas)
+
+    Valores que não são números viram 0 e decimais são truncados, como em
+    pd.to_numeric(errors='coerce').fillna(0).astype(int). Colunas lidas como
+    texto são convertidas uma vez por valor distinto.
+    """
+    matriz = np.empty((len(df), len(colunas)), dtype=np.int64)
+    for posicao, coluna in enumerate(colunas):
+        valores = df[coluna]
+        if pd.api.types.is_numeric_dtype(valores):
+            matriz[:, posicao] = valores.fillna(0).to_numpy().astype(np.int64)
+            continue
+
+        codigos, distintos = pd.factorize(valores)
+        numeros = pd.to_numeric(pd.Series(np.asarray(distintos, dtype=object)), errors='coerce')
+        numeros = numeros.fillna(0).to_numpy().astype(np.int64)
+        matriz[:, posicao] = np.where(codigos >= 0, numeros[codigos] if len(numeros) else 0, 0)
+    return matriz
+
+
+def transformar_formato_longo(df: pd.DataFrame, colunas_anos: List[str]) -> pd.DataFrame:
+    """
+    Converte a tabela larga (uma coluna por ano) em uma linha por escola e ano
+
+    Mantém as células com quantidade maior que zero, na ordem em que
+    df.melt as produziria (coluna a coluna), e acrescenta uma linha por
+    escola que só tem zeros, com o primeiro ano e a quantidade da primeira
+    ocorrência, para que nenhuma escola se perca. Linhas sem nome de escola
+    são descartadas.
+
+    Args:
+        df: Tabela com NOME ESCOLA e as colunas de anos
+        colunas_anos: Colunas com as quantidades de alunos
+
+    Returns:
+        DataFrame com NOME ESCOLA, ANO ESCOLAR e TOTAL
+    """
+    com_nome = df['NOME ESCOLA'].notna().to_numpy()
+    nomes = df['NOME ESCOLA'].to_numpy(dtype=object)[com_nome]
+    matriz = matriz_de_quantidades(df, colunas_anos)
+    if not com_nome.all():
+        matriz = matriz[com_nome]
+    positivos = matriz > 0
+
+    # Células com alunos, coluna a coluna (a transposta percorre na ordem do melt)
+    indices_colunas, indices_linhas = np.nonzero(positivos.T)
+    anos = np.asarray(colunas_anos, dtype=object)
+    com_alunos = pd.DataFrame({
+        'NOME ESCOLA': nomes[indices_linhas],
+        'ANO ESCOLAR': anos[indices_colunas],
+        'TOTAL': matriz[indices_linhas, indices_colunas]
+    })
+
+    # Escolas sem nenhuma célula positiva ganham uma linha, em ordem alfabética
+    codigos, escolas = pd.factorize(nomes)
+    escola_com_alunos = np.zeros(len(escolas), dtype=bool)
+    escola_com_alunos[codigos[positivos.any(axis=1)]] = True
+    if not escola_com_alunos.all():
+        # A linha da escola usa o primeiro ano da primeira ocorrência, como no formato longo completo
+        _, primeiras = np.unique(codigos, return_index=True)
+        linhas = primeiras[~escola_com_alunos]
+        sem_alunos = pd.DataFrame({
+            'NOME ESCOLA': nomes[linhas],
+            'ANO ESCOLAR': anos[np.zeros(len(linhas), dtype=np.intp)],
+            'TOTAL': matriz[linhas, 0]
+        }).sort_values('NOME ESCOLA')
+        com_alunos = pd.concat([com_alunos, sem_alunos], ignore_index=True)
+
+    return com_alunos[COLUNAS_FORMATO_LONGO]
+
+
+def montar_tabela_nao_adaptadas(df_final: pd.DataFrame, colunas_anos: List[str]) -> pd.DataFrame:
+    """
+    Monta a tabela das etiquetas não adaptadas a partir das colunas já padronizadas
+
+    Args:
+        df_final: DataFrame com NOME ESCOLA e as colunas de anos (nomes do mapeamento)
+        colunas_anos: Colunas com as quantidades de alunos
+
+    Returns:
+        DataFrame com NOME ESCOLA, ANO ESCOLAR e TOTAL, ordenado por NOME ESCOLA
+    """
+    with etapa('montar_tabela_nao_adaptadas', linhas=len(df_final)) as medida:
+        # Grafias diferentes da mesma escola viram o nome oficial do cadastro
+        registro = get_registro()
+        with etapa('cadastro de escolas'):
+            df_final['NOME ESCOLA'] = registro.resolver_serie(df_final['NOME ESCOLA'])
+
+        # Uma linha por escola e ano com alunos, sem perder as escolas que só têm zeros
+        with etapa('formato longo', linhas=len(df_final)):
+            df_final_processado = transformar_formato_longo(df_final, colunas_anos)
+
+        # Aplicar limpeza automática dos nomes (sempre ativa)
+        with etapa('limpar nomes', linhas=len(df_final_processado)):
+            df_final_processado['NOME ESCOLA'] = limpar_nomes_escolas(df_final_processado['NOME ESCOLA'])
+
+        # NOVA LÓGICA: Ajustar nomes dos anos escolares - EJAI adiciona "ª" + ETAPA, EJA mantém como está
+        df_final_processado['ANO ESCOLAR'] = normalizar_ano_escolar(df_final_processado['ANO ESCOLAR'])
+
+        # Ordenação estável: escolas com o mesmo nome mantêm a ordem da planilha (igual ao processamento em lotes)
+        with etapa('ordenar'):
+            df_final_processado = df_final_processado.sort_values('NOME ESCOLA', kind='stable').reset_index(drop=True)
+
+            # Escolas unificadas pelo cadastro podem repetir o ano: uma etiqueta só, com a soma
+            if len(registro):
+                df_final_processado = somar_linhas_repetidas(df_final_processado, ['NOME ESCOLA', 'ANO ESCOLAR'])
+        medida.registrar(etiquetas=len(df_final_processado))
+    return df_final_processado
+
+
+def somar_linhas_repetidas(df: pd.DataFrame, chaves: List[str]) -> pd.DataFrame:
+    """
+    Junta as linhas com os mesmos valores em `chaves`, somando TOTAL
+
+    As demais colunas ficam com o valor da primeira linha e os grupos
+    mantêm a ordem da primeira ocorrência.
+    """
+    agregacoes = {coluna: 'first' for coluna in df.columns if coluna not in chaves}
+    agregacoes['TOTAL'] = 'sum'
+    agrupado = df.groupby(chaves, sort=False, dropna=False, as_index=False).agg(agregacoes)
+    return agrupado[list(df.columns)]
+
+
+def completar_colunas_adaptadas(df_mapeado: pd.DataFrame) -> pd.DataFrame:
+    """Cria CATEGORIA, ANO ESCOLAR e TOTAL com os valores padrão quando a planilha não os tem"""
+    if 'CATEGORIA' not in df_mapeado.columns:
+        df_mapeado['CATEGORIA'] = 'GERAL'
+    if 'ANO ESCOLAR' not in df_mapeado.columns:
+        df_mapeado['ANO ESCOLAR'] = 'NÃO INFORMADO'
+    if 'TOTAL' not in df_mapeado.columns:
+        df_mapeado['TOTAL'] = 1
+    return df_mapeado
+
+
+def transformar_tabela_adaptadas(df_mapeado: pd.DataFrame) -> pd.DataFrame:
+    """
+    Monta a tabela das etiquetas adaptadas a partir das colunas já padronizadas
+
+    Args:
+        df_mapeado: DataFrame com NOME ESCOLA, CATEGORIA, ANO ESCOLAR e TOTAL
+
+    Returns:
+        DataFrame ordenado por NOME ESCOLA, só com as linhas que têm alunos
+    """
+    with etapa('transformar_tabela_adaptadas', linhas=len(df_mapeado)) as medida:
+        # Processar dados
+        df_mapeado['ANO ESCOLAR'] = df_mapeado['ANO ESCOLAR'].astype(str).str.strip()
+
+        # NOVA LÓGICA: Adicionar "ETAPA" APENAS para EJAI, nada para EJA, e "ANO" para o resto
+        df_mapeado['ANO ESCOLAR'] = normalizar_ano_escolar(df_mapeado['ANO ESCOLAR'], acrescentar_ano=True)
+
+        # Processar coluna TOTAL (a tabela do Unir Abas já chega com inteiros)
+        if not pd.api.types.is_integer_dtype(df_mapeado['TOTAL']):
+            df_mapeado['TOTAL'] = pd.to_numeric(df_mapeado['TOTAL'], errors='coerce').fillna(1).astype(int)
+        df_transformado = df_mapeado[df_mapeado['TOTAL'] > 0].copy()
+
+        # Grafias diferentes da mesma escola viram o nome oficial do cadastro
+        registro = get_registro()
+        with etapa('cadastro de escolas'):
+            df_transformado['NOME ESCOLA'] = registro.resolver_serie(df_transformado['NOME ESCOLA'])
+
+        # Limpar nomes das escolas usando a nova função
+        with etapa('limpar nomes', linhas=len(df_transformado)):
+            df_transformado["NOME ESCOLA"] = limpar_nomes_escolas(df_transformado['NOME ESCOLA'])
+
+        # Escolas unificadas pelo cadastro podem repetir categoria e ano: uma etiqueta só, com a soma
+        with etapa('ordenar'):
+            if len(registro):
+                df_transformado = somar_linhas_repetidas(df_transformado, ['NOME ESCOLA', 'CATEGORIA', 'ANO ESCOLAR'])
+
+            df_transformado = df_transformado.sort_values(by='NOME ESCOLA').reset_index(drop=True)
+        medida.registrar(etiquetas=len(df_transformado))
+    return df_transformado
+
+
+def montar_tabela_adaptadas(df: pd.DataFrame) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+    """
+    Detecta as colunas da planilha das provas adaptadas e monta a tabela das etiquetas
+
+    Returns:
+        Tuple com (DataFrame transformado, mensagem de erro ou None)
+    """
+    # Detectar colunas automaticamente
+    mapeamento, erro = detectar_colunas_adaptadas(df)
+    if erro:
+        return None, erro
+
+    # Aplicar mapeamento
+    df_mapeado = df.rename(columns=mapeamento)
+
+    # Verificar colunas obrigatórias
+    required_columns = ['NOME ESCOLA']
+    missing_columns = [col for col in required_columns if col not in df_mapeado.columns]
+    if missing_columns:
+        return None, f"Colunas obrigatórias não encontradas: {', '.join(missing_columns)}"
+
+    return transformar_tabela_adaptadas(completar_colunas_adaptadas(df_mapeado)), None
+
+
+def juntar_tabelas_adaptadas(tabelas: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Junta as tabelas das etiquetas adaptadas de várias abas numa só
+
+    Cada tabela já vem ordenada; a ordenação estável mantém a ordem das abas
+    dentro de cada escola.
+    """
+    df_transformado = pd.concat(tabelas, ignore_index=True)
+    if len(get_registro()):
+        df_transformado = somar_linhas_repetidas(df_transformado, ['NOME ESCOLA', 'CATEGORIA', 'ANO ESCOLAR'])
+    return df_transformado.sort_values(by='NOME ESCOLA', kind='stable').reset_index(drop=True)
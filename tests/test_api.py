@@ -0,0 +1,80 @@
+"""
+Testes da validação dos pedidos da API HTTP
+"""
+
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from api import SESSAO_API, ServicoTarefas, criar_servidor
+from utils.worker_pool import WorkerPool
+
+
+@pytest.fixture
+def endereco():
+    pool = WorkerPool(max_workers=1, max_queue=2)
+    servidor = criar_servidor('127.0.0.1', 0, ServicoTarefas(pool, max_tarefas=2, retencao_segundos=60))
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield servidor.server_address
+    servidor.shutdown()
+    servidor.server_close()
+    pool.encerrar()
+
+
+def _post(endereco, cabecalhos: str, corpo: bytes = b""):
+    """POST /tarefas cru; devolve (status, JSON da resposta)"""
+    with socket.create_connection(endereco, timeout=5) as conexao:
+        conexao.sendall(f"POST /tarefas HTTP/1.1\r\nHost: x\r\n{cabecalhos}\r\n".encode() + corpo)
+        resposta = b""
+        while True:
+            bloco = conexao.recv(65536)
+            if not bloco:
+                break
+            resposta += bloco
+    cabecalho, _, corpo_resposta = resposta.partition(b"\r\n\r\n")
+    return int(cabecalho.split()[1]), json.loads(corpo_resposta)
+
+
+def test_sem_content_length(endereco):
+    status, resposta = _post(endereco, "")
+    assert status == 411
+    assert "Content-Length" in resposta['erro']
+
+
+@pytest.mark.parametrize('valor', ["abc", "-1", "-100", "1_0", "1.5", "", "+3"])
+def test_content_length_invalido(endereco, valor):
+    status, resposta = _post(endereco, f"Content-Length: {valor}\r\n")
+    assert status == 400
+    assert "Content-Length" in resposta['erro']
+
+
+def test_content_length_valido_chega_na_validacao_do_pedido(endereco):
+    corpo = json.dumps({'operacao': 'outra'}).encode()
+    status, resposta = _post(endereco, f"Content-Length: {len(corpo)}\r\n", corpo)
+    assert status == 400
+    assert resposta['erro'].startswith("operacao deve ser")
+
+
+def test_artefatos_antigos_descartados_acima_do_limite():
+    pool = WorkerPool(max_workers=1, max_queue=2)
+    servico = ServicoTarefas(pool, max_tarefas=4, retencao_segundos=60, max_retidos_bytes=300)
+    ids = []
+    for indice in range(3):
+        ids.append(servico.jobs.submit(
+            lambda progresso, indice=indice: {'etiquetas.csv': bytes([indice]) * 100},
+            session_id=SESSAO_API
+        ))
+        while servico.jobs.get(ids[-1]).finalizado_em is None:
+            time.sleep(0.01)
+
+    servico._liberar_espaco(100)
+    assert servico.jobs.get(ids[0]) is None
+    assert servico.jobs.get(ids[1]) is not None and servico.jobs.get(ids[2]) is not None
+
+    servico._liberar_espaco(1000)
+    assert all(servico.jobs.get(job_id) is None for job_id in ids)
+    pool.encerrar()
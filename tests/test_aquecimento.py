@@ -0,0 +1,33 @@
+"""
+Testes do aquecimento dos processos do pool
+"""
+
+import pytest
+
+from utils import aquecimento
+from utils.worker_pool import WorkerPool
+
+
+def _aquecimento_com_erro(renderizar: bool = True):
+    raise ValueError("HUB_REGISTRO_ESCOLAS inválido")
+
+
+def test_erro_no_aquecimento_nao_propaga(monkeypatch):
+    monkeypatch.setenv('HUB_AQUECIMENTO', '1')
+    monkeypatch.setattr(aquecimento, 'aquecer_processo', _aquecimento_com_erro)
+
+    aquecimento.inicializar_processo_do_pool()
+
+
+def test_pool_funciona_com_cadastro_invalido(tmp_path, monkeypatch):
+    # O cadastro inválido faz o aquecimento falhar nos processos filhos (que herdam o ambiente)
+    registro = tmp_path / "registro.csv"
+    registro.write_text("isto não é um cadastro\n\x00\x00", encoding='utf-8')
+    monkeypatch.setenv('HUB_REGISTRO_ESCOLAS', str(registro))
+    monkeypatch.setenv('HUB_AQUECIMENTO', '1')
+
+    pool = WorkerPool(max_workers=1, inicializador=aquecimento.inicializar_processo_do_pool)
+    try:
+        assert pool.run_blocking(sum, [1, 2, 3], intervalo=0.05) == 6
+    finally:
+        pool.encerrar()
@@ -0,0 +1,154 @@
+"""
+Testes do armazém de artefatos das sessões
+"""
+
+import os
+import stat
+import subprocess
+import sys
+import threading
+
+import pandas as pd
+import pytest
+
+from utils.armazem_sessao import ArmazemSessoes
+
+KB = 1024
+
+
+@pytest.fixture
+def armazem(tmp_path):
+    armazem = ArmazemSessoes(limite_sessao_bytes=100 * KB, limite_total_bytes=1024 * KB, diretorio=str(tmp_path / 'sessoes'))
+    yield armazem
+    armazem.fechar()
+
+
+def _tabela(linhas: int = 5000) -> pd.DataFrame:
+    return pd.DataFrame({'NOME ESCOLA': [f"ESCOLA {i % 50}" for i in range(linhas)], 'TOTAL': range(linhas)})
+
+
+def _em_outra_thread(func, *args):
+    resultado = {}
+    thread = threading.Thread(target=lambda: resultado.update(valor=func(*args)), daemon=True)
+    thread.start()
+    return thread, resultado
+
+
+def test_artefatos_vao_para_o_disco_e_voltam(armazem):
+    tabela = _tabela()
+    pdf = b'%PDF' + bytes(80 * KB)
+    armazem.guardar('s', 'tabela', tabela)
+    armazem.guardar('s', 'pdf', pdf)
+    assert armazem.stats()['gravados'] == 1
+
+    pd.testing.assert_frame_equal(armazem.obter('s', 'tabela'), tabela)
+    assert armazem.obter('s', 'pdf') == pdf
+    assert armazem.memoria_sessao('s') <= 100 * KB + len(pdf)
+
+
+def test_leitura_do_disco_nao_bloqueia_o_armazem(armazem, monkeypatch):
+    armazem.guardar('s1', 'pdf', bytes(150 * KB))
+    armazem.guardar('s1', 'outro', bytes(10 * KB))
+    armazem.guardar('s2', 'tabela', _tabela(10))
+    assert armazem.stats()['gravados'] == 1
+
+    lendo, liberar = threading.Event(), threading.Event()
+    ler = ArmazemSessoes._ler
+    chamadas = []
+
+    def ler_devagar(caminho, tabela):
+        chamadas.append(caminho)
+        lendo.set()
+        liberar.wait(5)
+        return ler(caminho, tabela)
+
+    monkeypatch.setattr(armazem, '_ler', ler_devagar)
+    primeira, resultado_primeira = _em_outra_thread(armazem.obter, 's1', 'pdf')
+    assert lendo.wait(5)
+    segunda, resultado_segunda = _em_outra_thread(armazem.obter, 's1', 'pdf')
+
+    # Com a leitura em andamento, as outras sessões continuam sendo atendidas
+    outra, resultado_outra = _em_outra_thread(armazem.obter, 's2', 'tabela')
+    outra.join(2)
+    assert not outra.is_alive() and len(resultado_outra['valor']) == 10
+    armazem.guardar('s3', 'x', b'1')
+
+    liberar.set()
+    primeira.join(5)
+    segunda.join(5)
+    assert resultado_primeira['valor'] == resultado_segunda['valor'] == bytes(150 * KB)
+    assert len(chamadas) == 1
+
+
+def test_gravacao_em_disco_fora_do_lock(armazem, monkeypatch):
+    armazem.guardar('s1', 'tabela', _tabela())
+
+    gravando, liberar = threading.Event(), threading.Event()
+    to_pickle = pd.DataFrame.to_pickle
+
+    def gravar_devagar(df, *args, **kwargs):
+        gravando.set()
+        liberar.wait(5)
+        return to_pickle(df, *args, **kwargs)
+
+    monkeypatch.setattr(pd.DataFrame, 'to_pickle', gravar_devagar)
+    gravacao, _ = _em_outra_thread(armazem.guardar, 's1', 'pdf', bytes(90 * KB))
+    assert gravando.wait(5)
+
+    # Enquanto grava, a tabela ainda é servida da memória e o armazém responde
+    leitura, resultado = _em_outra_thread(armazem.obter, 's1', 'tabela')
+    leitura.join(2)
+    assert not leitura.is_alive() and len(resultado['valor']) == 5000
+    assert armazem.memoria_sessao('s1') == 90 * KB
+
+    liberar.set()
+    gravacao.join(5)
+    assert armazem.stats()['gravados'] == 1
+    assert len(armazem.obter('s1', 'tabela')) == 5000
+
+
+def test_artefato_removido_durante_a_leitura(armazem, monkeypatch):
+    armazem.guardar('s', 'pdf', bytes(150 * KB))
+    armazem.guardar('s', 'outro', b'1')
+
+    lendo, liberar = threading.Event(), threading.Event()
+    ler = ArmazemSessoes._ler
+
+    def ler_devagar(caminho, tabela):
+        lendo.set()
+        liberar.wait(5)
+        return ler(caminho, tabela)
+
+    monkeypatch.setattr(armazem, '_ler', ler_devagar)
+    leitura, resultado = _em_outra_thread(armazem.obter, 's', 'pdf', 'expirou')
+    assert lendo.wait(5)
+    armazem.remover('s', 'pdf')
+    liberar.set()
+    leitura.join(5)
+
+    assert resultado['valor'] == 'expirou'
+    assert armazem.obter('s', 'pdf') is None
+
+
+def test_diretorio_criado_so_para_o_usuario(armazem, tmp_path):
+    assert armazem.diretorio == str(tmp_path / 'sessoes')
+    assert stat.S_IMODE(os.stat(armazem.diretorio).st_mode) & 0o077 == 0
+
+
+def test_diretorio_aberto_a_outros_nao_e_usado(tmp_path):
+    aberto = tmp_path / 'aberto'
+    aberto.mkdir()
+    os.chmod(aberto, 0o777)
+    armazem = ArmazemSessoes(diretorio=str(aberto))
+    try:
+        assert armazem.diretorio != str(aberto)
+        assert stat.S_IMODE(os.stat(armazem.diretorio).st_mode) & 0o077 == 0
+    finally:
+        armazem.fechar()
+
+
+def test_tela_inicial_nao_importa_o_pandas():
+    codigo = "import sys, utils.servidor; print('pandas' in sys.modules)"
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    saida = subprocess.run([sys.executable, '-c', codigo], cwd=raiz, capture_output=True, text=True, check=True)
+    assert saida.stdout.strip() == 'False'
@@ -0,0 +1,59 @@
+"""
+Testes do cache em disco dos segmentos de etiquetas
+"""
+
+import os
+import pickle
+import sqlite3
+import stat
+
+from modules.cache_segmentos import CacheSegmentos, diretorio_privado
+
+
+class _Explosivo:
+    """Objeto cujo unpickle executaria código"""
+
+    def __reduce__(self):
+        return (os.system, ("echo pickle executado",))
+
+
+def _gravar_bruto(caminho, chave, dados):
+    with sqlite3.connect(caminho) as conexao:
+        conexao.execute("INSERT OR REPLACE INTO segmentos VALUES (?, ?, 0)", (chave, dados))
+    conexao.close()
+
+
+def test_ida_e_volta(tmp_path):
+    cache = CacheSegmentos(str(tmp_path / "c.sqlite"))
+    segmento = [['q', 'BT (ESCOLA \\272) Tj ET', 'Q'], ['q', 'Q']]
+    cache.put_many({'a': segmento})
+
+    assert cache.get_many(['a', 'b']) == {'a': segmento}
+
+
+def test_conteudo_invalido_conta_como_ausente(tmp_path):
+    cache = CacheSegmentos(str(tmp_path / "c.sqlite"))
+    cache.put_many({'bom': [['q']]})
+    _gravar_bruto(cache.caminho, 'corrompido', b'\x80\x04 lixo')
+    _gravar_bruto(cache.caminho, 'pickle', pickle.dumps(_Explosivo()))
+    _gravar_bruto(cache.caminho, 'formato', '{"nao": "lista"}')
+
+    assert cache.get_many(['bom', 'corrompido', 'pickle', 'formato']) == {'bom': [['q']]}
+
+
+def test_diretorio_padrao_privado(monkeypatch):
+    monkeypatch.delenv('HUB_CACHE_SEGMENTOS', raising=False)
+    cache = CacheSegmentos()
+    cache.get_many(['x'])
+
+    diretorio = os.path.dirname(cache.caminho)
+    assert diretorio == diretorio_privado()
+    assert stat.S_IMODE(os.stat(diretorio).st_mode) & 0o077 == 0
+
+
+def test_diretorio_aberto_a_outros_nao_e_usado(tmp_path, monkeypatch):
+    monkeypatch.setattr('tempfile.tempdir', str(tmp_path))
+    aberto = diretorio_privado()
+    os.chmod(aberto, 0o777)
+
+    assert diretorio_privado() != aberto
@@ -0,0 +1,64 @@
+"""
+Testes da execução em lote pela linha de comando
+"""
+
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import cli
+
+
+class _ExecutorQuebrado:
+    """Executor cujo processo morre no arquivo 'morre.csv'; os outros dão certo"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def submit(self, func, fluxo, caminho, saida, opcoes):
+        future = Future()
+        if caminho.endswith("morre.csv"):
+            future.set_exception(BrokenProcessPool("processo encerrado"))
+        else:
+            future.set_result({'arquivo': caminho, 'erro': None, 'saidas': [], 'etiquetas': 0, 'segundos': 0.1})
+        return future
+
+
+def test_nomes_repetidos_sao_recusados(tmp_path, capsys):
+    entrada = tmp_path / "entradas"
+    entrada.mkdir()
+    for nome in ("x.csv", "X.xlsx", "y.csv"):
+        (entrada / nome).write_bytes(b"")
+
+    with pytest.raises(SystemExit) as saida:
+        cli.main(['adaptadas', str(entrada), str(tmp_path / "saidas")])
+
+    assert saida.value.code == 2
+    erro = capsys.readouterr().err
+    assert "X.xlsx" in erro and "x.csv" in erro and "y.csv" not in erro
+    assert not (tmp_path / "saidas").exists()
+
+
+def test_nomes_distintos():
+    assert cli.nomes_repetidos(["a/x.csv", "a/y.xlsx", "a/xy.csv"]) == []
+
+
+def test_processo_morto_conta_como_falha(tmp_path, monkeypatch, capsys):
+    entrada = tmp_path / "entradas"
+    entrada.mkdir()
+    for nome in ("a.csv", "morre.csv", "z.csv"):
+        (entrada / nome).write_bytes(b"")
+    monkeypatch.setattr(cli, 'ProcessPoolExecutor', _ExecutorQuebrado)
+
+    assert cli.main(['nao-adaptadas', str(entrada), str(tmp_path / "saidas")]) == 1
+
+    saida = capsys.readouterr().out
+    assert "ERRO  morre.csv: BrokenProcessPool: processo encerrado" in saida
+    assert "2 ok, 1 com erro" in saida
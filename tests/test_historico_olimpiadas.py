@@ -0,0 +1,50 @@
+"""
+Testes do histórico de campanhas das olimpíadas
+"""
+
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from utils.historico_olimpiadas import HistoricoOlimpiadas
+
+
+@pytest.fixture
+def historico(tmp_path, monkeypatch):
+    historico = HistoricoOlimpiadas(str(tmp_path / 'historico.sqlite'))
+    conectar = historico._conectar
+    historico.conexoes = []
+
+    def conectar_registrando():
+        conexao = conectar()
+        historico.conexoes.append(conexao)
+        return conexao
+
+    monkeypatch.setattr(historico, '_conectar', conectar_registrando)
+    return historico
+
+
+def _fechada(conexao: sqlite3.Connection) -> bool:
+    try:
+        conexao.execute("SELECT 1")
+    except sqlite3.ProgrammingError:
+        return True
+    return False
+
+
+def test_conexoes_fechadas_depois_de_cada_operacao(historico):
+    olimpiadas = pd.DataFrame({'Escola': ['EMEF A', 'EMEF B'], '1º ANO': [3, 0], '2º ANO': [1, 4]})
+    paralimpiadas = pd.DataFrame({'Escola': ['EMEF A'], 'Categoria': ['TEA'], 'Ano': ['1º ANO'], 'Quantidade': [2]})
+
+    campanha_id, gravada = historico.salvar('2026', 'hash', olimpiadas, paralimpiadas, ['1º ANO', '2º ANO'])
+    assert gravada
+    assert historico.salvar('2026', 'hash', olimpiadas, paralimpiadas, ['1º ANO', '2º ANO']) == (campanha_id, False)
+    assert len(historico.campanhas()) == 1
+    historico.totais_por_escola()
+    historico.tabelas_da_campanha(campanha_id)
+    historico.excluir(campanha_id)
+    assert historico.campanhas().empty
+
+    assert len(historico.conexoes) == 7
+    assert all(_fechada(conexao) for conexao in historico.conexoes)
@@ -0,0 +1,160 @@
+"""
+Testes diferenciais da limpeza dos nomes de escola
+
+A implementação com trie e cache é comparada com uma cópia congelada da
+função original, que era aplicada linha a linha nas duas páginas de
+etiquetas (a das provas adaptadas, cuja lista tinha a sigla a mais
+"Escola M.E.I.F ", nunca encontrada num nome em maiúsculas).
+"""
+
+import random
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.normalizacao import SIGLAS_PARA_REMOVER, limpar_nome_escola_simples, limpar_nomes_escolas
+
+
+def limpar_nome_escola_original(nome):
+    """Cópia congelada de limpar_nome_escola_simples antes da trie"""
+    if pd.isna(nome):
+        return nome
+
+    nome = str(nome).upper().strip()
+
+    # Remove códigos INEP se existirem
+    nome = re.sub(r"\(INEP:\s*\d+\)", "", nome).strip()
+
+    # Lista completa de siglas para remover - apenas remove do início
+    siglas_para_remover = [
+        "E.M.E.F. ",
+        "E.M.E.I.F. ",
+        "M.E.I.F ",
+        "E M E I F ",
+        "E M E F I ",
+        "E M E F ",
+        "E M E I ",
+        "C M E I ",
+        "ESC EST ",
+        "ESC ",
+        "EMEF ",
+        "EMEI ",
+        "EMEIF ",
+        "CMEI ",
+        "CMEF ",
+        "CMEIF ",
+        "ESCOLA MUNICIPAL DE ENSINO FUNDAMENTAL E INFANTIL ",
+        "ESCOLA MUNICIPAL DE ENSINO FUNDAMENTAL ",
+        "ESCOLA MUNICIPAL DE ENSINO INFANTIL ",
+        "ESCOLA MUNICIPAL ",
+        "CENTRO MUNICIPAL DE EDUCACAO INFANTIL ",
+        "CENTRO MUNICIPAL ",
+        "ESCOLA ",
+        "ESC MUNICIPAL ",
+        "Escola M.E.I.F ",
+        "ESC MUN ",
+        "E I F ",
+        "E F "
+    ]
+
+    # Remover apenas se começar com a sigla E sobrar nome decente
+    nome_original = nome
+    for sigla in siglas_para_remover:
+        if nome.startswith(sigla):
+            nome_sem_sigla = nome[len(sigla):].strip()
+            if len(nome_sem_sigla) > 3:  # Só aceita se sobrar um nome
+                nome = nome_sem_sigla
+                break
+
+    # Se deu algo errado, volta pro original
+    if len(nome) < 3:
+        nome = nome_original
+
+    return nome
+
+
+CASOS = [
+    np.nan,
+    None,
+    pd.NA,
+    123,
+    4.5,
+    True,
+    "",
+    "   ",
+    "emef josé de alencar",
+    "Escola M.E.I.F SÃO PEDRO",
+    "  escola municipal   maria  ",
+    "EMEF JOSÉ (INEP: 12345678)",
+    "(INEP:9) E M E F I ANTONIO",
+    "EMEF (INEP: 1) ABC",
+    "E F ABCD",
+    "E F ABC",
+    "ESC AB",
+    "ESC MUNICIPAL JOAO",
+    "ESC MUN JOAO",
+    "ESCOLA ",
+    "ESCOLA",
+    "E.M.E.F. X",
+    "E.M.E.F. XYZW",
+    "EMEIF MARIA",
+    "CMEIF ",
+    "AB",
+    "X",
+]
+
+# Pedaços combinados ao acaso: siglas, variações em minúsculas, códigos INEP e sobras curtas
+PEDACOS = SIGLAS_PARA_REMOVER + [
+    "Escola M.E.I.F ", "escola ", "esc ", "emef ", "  ", "E ", "(INEP: 123) ", "(INEP:9)", "(INEP: x)",
+    "ABC", "AB", "X", "JOSÉ DE ALENCAR", "SÃO PEDRO", " ", "ESCOLA", "MUNICIPAL ", "1", "E.M.E.F."
+]
+
+
+def _nomes_aleatorios(quantidade: int):
+    aleatorio = random.Random(31)
+    return [
+        "".join(aleatorio.choice(PEDACOS) for _ in range(aleatorio.randint(0, 4)))
+        for _ in range(quantidade)
+    ]
+
+
+def _iguais(esperado, obtido) -> bool:
+    if pd.isna(esperado):
+        return pd.isna(obtido)
+    return esperado == obtido
+
+
+@pytest.mark.parametrize('nome', CASOS, ids=repr)
+def test_casos_conhecidos(nome):
+    assert _iguais(limpar_nome_escola_original(nome), limpar_nome_escola_simples(nome))
+
+
+def test_nomes_aleatorios():
+    for nome in _nomes_aleatorios(20000):
+        assert limpar_nome_escola_simples(nome) == limpar_nome_escola_original(nome), repr(nome)
+
+
+def test_coluna_igual_ao_apply():
+    valores = CASOS + _nomes_aleatorios(5000) + CASOS
+    serie = pd.Series(valores, index=range(10, 10 + len(valores)), name='NOME ESCOLA', dtype=object)
+
+    esperado = serie.apply(limpar_nome_escola_original)
+    obtido = limpar_nomes_escolas(serie)
+
+    pd.testing.assert_index_equal(obtido.index, esperado.index)
+    assert obtido.name == esperado.name
+    assert all(_iguais(a, b) for a, b in zip(esperado, obtido))
+
+
+@pytest.mark.parametrize('serie', [
+    pd.Series([], dtype=object),
+    pd.Series([np.nan, None], dtype=object),
+    pd.Series(["emef abcd", "emef abcd", np.nan, "EMEF ABCD"]),
+], ids=['vazia', 'so-nulos', 'repetidos'])
+def test_colunas_especiais(serie):
+    esperado = serie.apply(limpar_nome_escola_original)
+    obtido = limpar_nomes_escolas(serie)
+    assert len(obtido) == len(esperado)
+    assert all(_iguais(a, b) for a, b in zip(esperado, obtido))
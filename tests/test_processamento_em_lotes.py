@@ -0,0 +1,92 @@
+"""
+Testes da tabela processada em lotes: CSV, páginas e tempo de vida dos arquivos
+"""
+
+import gc
+import io
+import os
+
+import pandas as pd
+import pytest
+
+from modules import processamento_em_lotes
+from modules.processamento_em_lotes import TabelaOrdenada, processar_csv_em_lotes
+from utils.worker_pool import WorkerPool
+
+MAPEAMENTO = {
+    'Qual é o nome da sua escola?': 'NOME ESCOLA',
+    'Total de alunos do 1º ano da MANHÃ': '1º ANO',
+    'Total de alunos do 2º ano da TARDE': '2º ANO'
+}
+
+
+def _tabela(linhas: int) -> TabelaOrdenada:
+    planilha = pd.DataFrame({
+        'Qual é o nome da sua escola?': [f"Escola {i % 37}" for i in range(linhas)],
+        'Total de alunos do 1º ano da MANHÃ': [str(i % 5) for i in range(linhas)],
+        'Total de alunos do 2º ano da TARDE': [str(i % 3) for i in range(linhas)]
+    })
+    return processar_csv_em_lotes(io.BytesIO(planilha.to_csv(index=False).encode('utf-8')), MAPEAMENTO, 40)
+
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool(max_workers=1, max_queue=4)
+    yield pool
+    pool.encerrar()
+
+
+def test_csv_gravado_igual_ao_do_dataframe(monkeypatch):
+    monkeypatch.setattr(processamento_em_lotes, 'LINHAS_POR_LOTE', 7)
+    tabela = _tabela(200)
+    esperado = pd.DataFrame(list(tabela), columns=tabela.columns).to_csv(index=False).encode('utf-8')
+
+    caminho = tabela.gravar_csv()
+    assert os.path.dirname(caminho) == tabela.diretorio
+    with tabela.abrir_csv() as arquivo:
+        assert arquivo.read() == esperado
+    assert tabela.gravar_csv() == caminho
+    assert tabela.to_csv_bytes() == esperado
+    assert not [nome for nome in os.listdir(tabela.diretorio) if nome.endswith('.parcial')]
+
+
+def test_botao_de_download_mantem_os_arquivos():
+    tabela = _tabela(100)
+    diretorio = tabela.diretorio
+    abrir_csv = tabela.abrir_csv
+    del tabela
+    gc.collect()
+
+    with abrir_csv() as arquivo:
+        assert arquivo.read().startswith(b'NOME ESCOLA,ANO ESCOLAR,TOTAL')
+    del abrir_csv
+    gc.collect()
+    assert not os.path.exists(diretorio)
+
+
+def test_tarefa_do_pool_mantem_os_arquivos(pool):
+    tabela = _tabela(100)
+    esperado = tabela.to_csv_bytes()
+    ticket = pool.submit(TabelaOrdenada.to_csv_bytes, tabela)
+    diretorio = tabela.diretorio
+    del tabela
+    gc.collect()
+
+    assert ticket.result(timeout=60) == esperado
+    del ticket
+    gc.collect()
+    assert not os.path.exists(diretorio)
+
+
+@pytest.mark.parametrize('somar_repetidas', [False, True])
+def test_paginas_pelo_indice_iguais_a_passada_completa(monkeypatch, somar_repetidas):
+    monkeypatch.setattr(processamento_em_lotes, 'REGISTROS_POR_BLOCO', 5)
+    monkeypatch.setattr(processamento_em_lotes, 'LINHAS_POR_MARCA', 7)
+    lida = _tabela(300)
+    tabela = TabelaOrdenada(lida.diretorio, lida.arquivos, lida.total_linhas, lida.resumo, somar_repetidas)
+    todas = pd.DataFrame(list(tabela), columns=tabela.columns)
+
+    for inicio in [0, 1, 6, 7, 8, 50, 99, len(todas) - 3, len(todas), len(todas) + 10]:
+        pagina = tabela.pagina(inicio, 10)
+        pd.testing.assert_frame_equal(pagina, todas.iloc[inicio:inicio + 10].reset_index(drop=True), check_dtype=False)
+    assert len(tabela._indice[0]) > 2
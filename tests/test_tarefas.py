@@ -0,0 +1,113 @@
+"""
+Testes das tarefas executadas no pool
+"""
+
+from concurrent.futures import Future
+from io import BytesIO
+
+import pandas as pd
+import pytest
+
+from benchmarks.dados_sinteticos import csv_nao_adaptadas, logo_jpeg
+from modules.criacao_nao_adaptadas import campos_etiqueta, gerar_etiquetas
+from utils.tarefas import gerar_arquivos_etiquetas, gerar_pdf_no_pool, processar_abas_no_pool
+from utils.worker_pool import QueueFullError, TaskTooLargeError, WorkerPool
+
+ABAS = [(f"Escola {i}", {}) for i in range(4)]
+
+
+class _Ticket:
+    def __init__(self, aba):
+        self.aba = aba
+        self.future = Future()
+
+
+class _PoolFalso:
+    """
+    Pool com max_workers=2 que recusa os envios indicados
+
+    `recusas` associa o nome da aba às exceções levantadas nos seus
+    primeiros envios; um envio aceito já sai concluído.
+    """
+
+    max_workers = 2
+
+    def __init__(self, recusas=None, falhar_em=None):
+        self.recusas = {aba: list(erros) for aba, erros in (recusas or {}).items()}
+        self.falhar_em = falhar_em
+        self.enviadas = []
+        self.canceladas = []
+
+    def submit(self, func, conteudo, aba, mapeamento, tamanho_bytes=0):
+        if aba == self.falhar_em:
+            raise RuntimeError("falha inesperada")
+        if self.recusas.get(aba):
+            raise self.recusas[aba].pop(0)
+        ticket = _Ticket(aba)
+        ticket.future.set_result((aba, 1, 0.0))
+        self.enviadas.append(aba)
+        return ticket
+
+    def cancel(self, ticket):
+        self.canceladas.append(ticket.aba)
+
+
+def test_fila_cheia_tenta_de_novo_quando_uma_aba_termina():
+    pool = _PoolFalso(recusas={"Escola 1": [QueueFullError("cheia")]})
+    resultados = processar_abas_no_pool(pool, b"", ABAS)
+
+    assert [resultado for resultado, _ in resultados] == [(aba, 1, 0.0) for aba, _ in ABAS]
+    assert all(erro is None for _, erro in resultados)
+    assert pool.enviadas.count("Escola 1") == 1
+
+
+def test_recusa_sem_aba_em_andamento_vira_erro_da_aba():
+    pool = _PoolFalso(recusas={
+        "Escola 0": [QueueFullError("cheia")],
+        "Escola 2": [TaskTooLargeError("grande")]
+    })
+    resultados = processar_abas_no_pool(pool, b"", ABAS)
+
+    assert isinstance(resultados[0][1], QueueFullError)
+    assert isinstance(resultados[2][1], TaskTooLargeError)
+    assert resultados[1] == (("Escola 1", 1, 0.0), None)
+    assert resultados[3] == (("Escola 3", 1, 0.0), None)
+
+
+def test_interrupcao_cancela_as_abas_pendentes():
+    pool = _PoolFalso(falhar_em="Escola 1")
+    with pytest.raises(RuntimeError):
+        processar_abas_no_pool(pool, b"", ABAS)
+    assert pool.canceladas == ["Escola 0"]
+
+
+def test_limite_de_etiquetas_conferido_depois_da_leitura():
+    conteudo = csv_nao_adaptadas(escolas=5, respostas_por_escola=1)
+    artefatos, etiquetas = gerar_arquivos_etiquetas('nao-adaptadas', conteudo, 'a.csv', max_etiquetas=1)
+    assert list(artefatos) == ['etiquetas.csv'] and etiquetas > 1
+
+    with pytest.raises(TaskTooLargeError, match=f"{etiquetas} etiquetas"):
+        gerar_arquivos_etiquetas(
+            'nao-adaptadas', conteudo, 'a.csv', logo=logo_jpeg(), championship="C", stage="E",
+            max_etiquetas=etiquetas - 1
+        )
+
+
+def test_etiquetas_distintas_contadas_na_tarefa():
+    tabela = pd.DataFrame({
+        'NOME ESCOLA': ['ESCOLA A', 'ESCOLA A', 'ESCOLA A', 'ESCOLA B'],
+        'ANO ESCOLAR': ['1º ANO', '1º ANO', '2º ANO', '1º ANO'],
+        'TOTAL': [3, 3, 3, 3]
+    })
+    pool = WorkerPool(max_workers=1, max_queue=2)
+    try:
+        detalhes = {'compacto': True}
+        pdf = gerar_pdf_no_pool(
+            pool, gerar_etiquetas, tabela, BytesIO(logo_jpeg()), "C", "E",
+            compacto=True, campos=campos_etiqueta, resumo=detalhes
+        )
+    finally:
+        pool.encerrar()
+
+    assert pdf.startswith(b'%PDF')
+    assert detalhes == {'compacto': True, 'etiquetas_distintas': 3}
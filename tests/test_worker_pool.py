@@ -0,0 +1,57 @@
+"""
+Testes do pool de processos compartilhado
+"""
+
+import os
+from concurrent.futures import CancelledError, Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from utils.worker_pool import Ticket, WorkerPool
+
+
+@pytest.fixture
+def pool():
+    pool = WorkerPool(max_workers=1, max_queue=4)
+    yield pool
+    pool.encerrar()
+
+
+def test_processo_morto_nao_trava_o_pool(pool):
+    # os._exit derruba o processo filho e quebra o ProcessPoolExecutor
+    morto = pool.submit(os._exit, 1)
+    with pytest.raises(BrokenProcessPool):
+        morto.result(timeout=60)
+
+    # As próximas tarefas rodam num executor novo em vez de ficarem na fila para sempre
+    tickets = [pool.submit(os.getpid) for _ in range(3)]
+    pids = [ticket.result(timeout=60) for ticket in tickets]
+
+    assert all(isinstance(pid, int) for pid in pids)
+    assert pool.stats()['ativos'] == 0
+    assert pool.stats()['fila'] == 0
+
+
+def test_run_blocking_depois_de_processo_morto(pool):
+    with pytest.raises(BrokenProcessPool):
+        pool.run_blocking(os._exit, 1, intervalo=0.05)
+
+    assert pool.run_blocking(os.getpid, intervalo=0.05) != os.getpid()
+
+
+def test_future_cancelado_pelo_executor_libera_o_processo(pool):
+    # Simula o future de um executor quebrado, descartado com shutdown(cancel_futures=True)
+    ticket = Ticket(os.getpid, (), {}, None)
+    assert ticket.future.set_running_or_notify_cancel()
+    cancelado = Future()
+    cancelado.cancel()
+    with pool._lock:
+        pool._ativos += 1
+
+    pool._finalizar(ticket, cancelado)
+
+    with pytest.raises(CancelledError):
+        ticket.result(timeout=1)
+    assert pool.stats()['ativos'] == 0
+    assert pool.run_blocking(os.getpid, intervalo=0.05) != os.getpid()
@@ -0,0 +1,128 @@
+# utils/aquecimento.py
+"""
+Aquecimento dos processos do servidor
+
+Na primeira geração de etiquetas de cada processo são carregados o
+ReportLab (fontes, métricas e parser de parágrafos), o pandas com os
+leitores de Excel e CSV, as regras de limpeza e o cadastro de escolas.
+aquecer_processo faz esse trabalho uma vez por processo, antes do primeiro
+usuário: roda no processo do Streamlit e como inicializador dos processos
+do WorkerPool.
+
+As importações pesadas ficam dentro das funções para que este módulo possa
+ser importado pela tela inicial sem custo.
+"""
+
+import os
+import time
+from io import BytesIO
+from typing import Dict
+
+from streamlit.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Tempos do aquecimento deste processo; vazio enquanto não foi feito
+_tempos: Dict[str, float] = {}
+
+
+def aquecimento_ativo() -> bool:
+    """O aquecimento pode ser desligado com HUB_AQUECIMENTO=0"""
+    return os.environ.get('HUB_AQUECIMENTO', '1') != '0'
+
+
+def _logo_minimo() -> BytesIO:
+    """Imagem PNG de 1x1 pixel usada como logo da etiqueta de teste"""
+    from PIL import Image
+
+    logo = BytesIO()
+    Image.new('RGB', (1, 1), 'white').save(logo, format='PNG')
+    return logo
+
+
+def aquecer_processo(renderizar: bool = True) -> Dict[str, float]:
+    """
+    Carrega uma vez por processo os recursos usados pelas etiquetas
+
+    Args:
+        renderizar: Se True, gera um PDF com uma etiqueta de cada tipo
+            (sem passar pelo cache de segmentos)
+
+    Returns:
+        Dicionário com os segundos gastos em cada etapa
+    """
+    if _tempos:
+        return dict(_tempos)
+
+    inicio = time.perf_counter()
+    etapa = inicio
+
+    def medir(nome: str):
+        nonlocal etapa
+        agora = time.perf_counter()
+        _tempos[nome] = agora - etapa
+        etapa = agora
+
+    import pandas as pd
+    import openpyxl  # noqa: F401
+    from modules import criacao_adaptadas, criacao_nao_adaptadas
+    from modules.layout_etiquetas import cache_segmentos, gerar_pdf
+    from modules.normalizacao import limpar_nomes_escolas, normalizar_ano_escolar
+    from utils.file_handler import FileHandler
+    from utils.registro_escolas import get_registro
+    medir('bibliotecas')
+
+    # Regras de limpeza e cadastro de escolas (lido do disco uma vez por processo)
+    nomes = pd.Series(['E.M.E.F. ESCOLA TESTE (INEP: 1)', 'ESCOLA MUNICIPAL TESTE'])
+    limpar_nomes_escolas(get_registro().resolver_serie(nomes))
+    anos = pd.Series(['5', '5º ANO', 'EJAI 1', 'EJA'])
+    normalizar_ano_escolar(anos, acrescentar_ano=True)
+    normalizar_ano_escolar(anos)
+    medir('regras')
+
+    # Leitores de Excel (openpyxl) e CSV (pyarrow, quando instalado)
+    tabela = pd.DataFrame({
+        'NOME ESCOLA': ['ESCOLA TESTE'],
+        'CATEGORIA': ['TEA'],
+        'ANO ESCOLAR': ['5º ANO'],
+        'TOTAL': [1]
+    })
+    pd.read_excel(BytesIO(FileHandler.to_excel(tabela)))
+    FileHandler.read_csv_columns(BytesIO(tabela.to_csv(index=False).encode('utf-8')), list(tabela.columns))
+    medir('planilhas')
+
+    if renderizar:
+        # Fontes, métricas e parser de parágrafos do ReportLab, e o arquivo do cache de segmentos
+        cache_segmentos.get_many(['aquecimento'])
+        for modulo in (criacao_adaptadas, criacao_nao_adaptadas):
+            gerar_pdf(
+                tabela, _logo_minimo(), 'AQUECIMENTO', 'ETAPA',
+                modulo.texto_etiqueta, modulo.campos_etiqueta, incremental=False
+            )
+        medir('etiqueta')
+
+    _tempos['total'] = time.perf_counter() - inicio
+    logger.info(
+        "Aquecimento do processo %d em %.2f s (%s)",
+        os.getpid(),
+        _tempos['total'],
+        ", ".join(f"{nome} {segundos:.2f}s" for nome, segundos in _tempos.items() if nome != 'total')
+    )
+    return dict(_tempos)
+
+
+def inicializar_processo_do_pool():
+    """
+    Inicializador dos processos do WorkerPool: aquece antes da primeira tarefa
+
+    Uma exceção no inicializador quebra o ProcessPoolExecutor antes da
+    primeira tarefa, então qualquer erro do aquecimento (um cadastro de
+    escolas inválido, por exemplo) só é registrado no log: a tarefa que
+    depende do recurso com problema mostra o erro ao usuário.
+    """
+    if not aquecimento_ativo():
+        return
+    try:
+        aquecer_processo()
+    except Exception:
+        logger.exception("Falha no aquecimento do processo %d do pool; seguindo sem aquecer", os.getpid())
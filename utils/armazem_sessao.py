@@ -0,0 +1,357 @@
+# utils/armazem_sessao.py
+"""
+Módulo responsável pelos artefatos grandes de cada sessão
+
+Tabelas e PDFs guardados pelas páginas ficam aqui em vez do session_state.
+O armazém mede o tamanho de cada artefato e, quando uma sessão ou o
+servidor passa do orçamento de memória, grava em disco os artefatos usados
+há mais tempo; eles são lidos de volta no próximo acesso. Sessões sem
+acesso há mais tempo que o limite de ociosidade são descartadas.
+
+A gravação e a leitura em disco acontecem fora do lock do armazém: o
+artefato fica marcado como em trânsito, e só quem pede esse artefato
+enquanto ele é lido espera a leitura terminar.
+
+O módulo é importado pela tela inicial (via utils/servidor.py) e não
+importa o pandas: só há tabelas a guardar depois que uma página o carregou.
+"""
+
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+# Compressão rápida para as tabelas gravadas em disco (os PDFs já são comprimidos)
+COMPRESSAO_TABELAS = {'method': 'gzip', 'compresslevel': 1}
+
+
+def _e_tabela(valor: Any) -> bool:
+    """True se o valor é um DataFrame, sem importar o pandas"""
+    pandas = sys.modules.get('pandas')
+    return pandas is not None and isinstance(valor, getattr(pandas, 'DataFrame', ()))
+
+
+def _diretorio_privado(diretorio: Optional[str]) -> str:
+    """
+    Diretório dos artefatos gravados em disco, acessível só pelo usuário atual
+
+    As tabelas são lidas de volta com pickle: um diretório informado que já
+    existe com outro dono ou aberto a outros usuários não é usado, e um
+    diretório novo e aleatório do temporário fica no lugar.
+    """
+    if not diretorio:
+        return tempfile.mkdtemp(prefix='hub_sessoes_')
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(diretorio)), exist_ok=True)
+        os.mkdir(diretorio, 0o700)
+    except FileExistsError:
+        pass
+    except OSError:
+        return tempfile.mkdtemp(prefix='hub_sessoes_')
+
+    info = os.lstat(diretorio)
+    dono_diferente = hasattr(os, 'getuid') and info.st_uid != os.getuid()
+    if not stat.S_ISDIR(info.st_mode) or dono_diferente or info.st_mode & 0o077:
+        return tempfile.mkdtemp(prefix='hub_sessoes_')
+    return diretorio
+
+
+def tamanho_em_bytes(valor: Any) -> int:
+    """Tamanho aproximado do valor em memória"""
+    if _e_tabela(valor):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, (bytes, bytearray)):
+        return len(valor)
+    if isinstance(valor, (list, tuple)):
+        return sys.getsizeof(valor) + sum(tamanho_em_bytes(item) for item in valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(tamanho_em_bytes(item) for item in valor.values())
+    return sys.getsizeof(valor)
+
+
+class Artefato:
+    """Valor guardado no armazém, em memória ou em disco"""
+
+    def __init__(self, valor: Any):
+        self.valor = valor
+        self.tamanho = tamanho_em_bytes(valor)
+        self.tabela = _e_tabela(valor)
+        self.caminho: Optional[str] = None
+        self.usado_em = time.monotonic()
+        # Gravação ou leitura em disco em andamento (sinalizado ao terminar)
+        self.em_transito: Optional[threading.Event] = None
+        # Removido do armazém; uma gravação em andamento apaga o próprio arquivo
+        self.descartado = False
+
+    @property
+    def em_disco(self) -> bool:
+        return self.caminho is not None
+
+    @property
+    def em_memoria(self) -> bool:
+        """Conta no orçamento de memória: não está em disco nem sendo gravado"""
+        return not self.em_disco and self.em_transito is None
+
+    @property
+    def pode_ir_para_disco(self) -> bool:
+        return self.em_memoria and (self.tabela or isinstance(self.valor, (bytes, bytearray)))
+
+
+class ArmazemSessoes:
+    """Artefatos por sessão com orçamento de memória, gravação em disco e expiração"""
+
+    def __init__(
+        self,
+        limite_sessao_bytes: int = 200 * 1024 * 1024,
+        limite_total_bytes: int = 1024 * 1024 * 1024,
+        ociosidade_segundos: int = 3600,
+        diretorio: Optional[str] = None
+    ):
+        """
+        Args:
+            limite_sessao_bytes: Memória máxima dos artefatos de uma sessão
+            limite_total_bytes: Memória máxima dos artefatos de todas as sessões
+            ociosidade_segundos: Tempo sem acesso após o qual a sessão é descartada
+            diretorio: Diretório dos artefatos gravados em disco (criado só para o usuário atual)
+        """
+        self.limite_sessao_bytes = limite_sessao_bytes
+        self.limite_total_bytes = limite_total_bytes
+        self.ociosidade_segundos = ociosidade_segundos
+        self.diretorio = _diretorio_privado(diretorio)
+
+        self._sessoes: Dict[str, Dict[str, Artefato]] = {}
+        self._acessos: Dict[str, float] = {}
+        self._lock = threading.RLock()
+        self._gravados = 0
+        self._lidos = 0
+        self._expiradas = 0
+
+    @classmethod
+    def from_env(cls) -> "ArmazemSessoes":
+        """
+        Cria o armazém com limites definidos por variáveis de ambiente
+
+        HUB_SESSAO_MB, HUB_SESSOES_MB, HUB_SESSAO_OCIOSA_MIN e HUB_SESSOES_DIR
+        """
+        return cls(
+            limite_sessao_bytes=int(float(os.environ.get('HUB_SESSAO_MB', 200)) * 1024 * 1024),
+            limite_total_bytes=int(float(os.environ.get('HUB_SESSOES_MB', 1024)) * 1024 * 1024),
+            ociosidade_segundos=int(float(os.environ.get('HUB_SESSAO_OCIOSA_MIN', 60)) * 60),
+            diretorio=os.environ.get('HUB_SESSOES_DIR')
+        )
+
+    def guardar(self, session_id: str, nome: str, valor: Any):
+        """Guarda o artefato da sessão, substituindo o anterior com o mesmo nome"""
+        with self._lock:
+            self.expirar_ociosas()
+            artefatos = self._sessoes.setdefault(session_id, {})
+            anterior = artefatos.pop(nome, None)
+            if anterior is not None:
+                self._descartar(anterior)
+            artefatos[nome] = Artefato(valor)
+            self._acessos[session_id] = time.monotonic()
+            para_disco = self._respeitar_limites(session_id, protegido=artefatos[nome])
+        self._gravar(para_disco)
+
+    def obter(self, session_id: str, nome: str, padrao: Any = None) -> Any:
+        """Retorna o artefato, lendo do disco se necessário; `padrao` se não existe ou expirou"""
+        while True:
+            with self._lock:
+                self.expirar_ociosas()
+                artefato = self._sessoes.get(session_id, {}).get(nome)
+                if artefato is None:
+                    return padrao
+
+                agora = time.monotonic()
+                artefato.usado_em = agora
+                self._acessos[session_id] = agora
+                # Sendo gravado, o valor ainda está em memória
+                if not artefato.em_disco:
+                    return artefato.valor
+                leitura = artefato.em_transito
+                if leitura is None:
+                    artefato.em_transito = threading.Event()
+                    caminho = artefato.caminho
+                    break
+            # Outra thread já está lendo este artefato
+            leitura.wait()
+
+        try:
+            valor = self._ler(caminho, artefato.tabela)
+        except Exception:
+            with self._lock:
+                leitura, artefato.em_transito = artefato.em_transito, None
+            leitura.set()
+            if artefato.descartado:
+                return padrao
+            raise
+
+        para_disco = []
+        with self._lock:
+            leitura, artefato.em_transito = artefato.em_transito, None
+            if not artefato.descartado:
+                artefato.valor = valor
+                self._apagar_arquivo(artefato)
+                self._lidos += 1
+                para_disco = self._respeitar_limites(session_id, protegido=artefato)
+        leitura.set()
+        self._gravar(para_disco)
+        return valor
+
+    def remover(self, session_id: str, nome: str):
+        """Remove um artefato da sessão"""
+        with self._lock:
+            artefato = self._sessoes.get(session_id, {}).pop(nome, None)
+            if artefato is not None:
+                self._descartar(artefato)
+
+    def remover_sessao(self, session_id: str):
+        """Remove todos os artefatos da sessão"""
+        with self._lock:
+            for artefato in self._sessoes.pop(session_id, {}).values():
+                self._descartar(artefato)
+            self._acessos.pop(session_id, None)
+
+    def expirar_ociosas(self):
+        """Descarta as sessões sem acesso há mais tempo que o limite de ociosidade"""
+        limite = time.monotonic() - self.ociosidade_segundos
+        with self._lock:
+            ociosas = [session_id for session_id, acesso in self._acessos.items() if acesso < limite]
+            for session_id in ociosas:
+                self.remover_sessao(session_id)
+            self._expiradas += len(ociosas)
+
+    def memoria_sessao(self, session_id: str) -> int:
+        """Bytes em memória dos artefatos da sessão"""
+        with self._lock:
+            return sum(a.tamanho for a in self._sessoes.get(session_id, {}).values() if a.em_memoria)
+
+    def memoria_total(self) -> int:
+        """Bytes em memória dos artefatos de todas as sessões"""
+        with self._lock:
+            return sum(self.memoria_sessao(session_id) for session_id in self._sessoes)
+
+    def stats(self) -> Dict[str, float]:
+        """Ocupação de memória e disco e contadores de gravação, leitura e expiração"""
+        with self._lock:
+            artefatos = [a for artefatos in self._sessoes.values() for a in artefatos.values()]
+            return {
+                'sessoes': len(self._sessoes),
+                'artefatos': len(artefatos),
+                'memoria_bytes': sum(a.tamanho for a in artefatos if a.em_memoria),
+                'disco_bytes': sum(os.path.getsize(a.caminho) for a in artefatos if a.em_disco),
+                'limite_sessao_bytes': self.limite_sessao_bytes,
+                'limite_total_bytes': self.limite_total_bytes,
+                'gravados': self._gravados,
+                'lidos': self._lidos,
+                'expiradas': self._expiradas
+            }
+
+    def _respeitar_limites(self, session_id: str, protegido: Artefato) -> List[Artefato]:
+        """
+        Escolhe os artefatos usados há mais tempo até voltar aos limites
+
+        Chamado com o lock. Os escolhidos ficam marcados em trânsito (já fora
+        da conta da memória) e devem ser passados a _gravar depois do lock.
+        """
+        para_disco = []
+
+        # Primeiro o limite da sessão, só com os artefatos dela
+        candidatos = self._candidatos({session_id: self._sessoes.get(session_id, {})}, protegido)
+        excesso = self.memoria_sessao(session_id) - self.limite_sessao_bytes
+        while excesso > 0 and candidatos:
+            artefato = candidatos.pop(0)
+            excesso -= artefato.tamanho
+            artefato.em_transito = threading.Event()
+            para_disco.append(artefato)
+
+        # Depois o limite do servidor, com os artefatos de todas as sessões
+        candidatos = self._candidatos(self._sessoes, protegido)
+        excesso = self.memoria_total() - self.limite_total_bytes
+        while excesso > 0 and candidatos:
+            artefato = candidatos.pop(0)
+            excesso -= artefato.tamanho
+            artefato.em_transito = threading.Event()
+            para_disco.append(artefato)
+
+        return para_disco
+
+    @staticmethod
+    def _candidatos(sessoes: Dict[str, Dict[str, Artefato]], protegido: Artefato) -> List[Artefato]:
+        """Artefatos que podem ir para o disco, do usado há mais tempo para o mais recente"""
+        candidatos = [
+            artefato
+            for artefatos in sessoes.values()
+            for artefato in artefatos.values()
+            if artefato.pode_ir_para_disco and artefato is not protegido
+        ]
+        return sorted(candidatos, key=lambda artefato: artefato.usado_em)
+
+    def _gravar(self, artefatos: List[Artefato]):
+        """
+        Grava em disco os artefatos escolhidos por _respeitar_limites, sem o lock
+
+        Se a gravação falha, o artefato continua em memória.
+        """
+        for artefato in artefatos:
+            caminho = os.path.join(self.diretorio, uuid.uuid4().hex)
+            try:
+                if artefato.tabela:
+                    artefato.valor.to_pickle(caminho, compression=COMPRESSAO_TABELAS)
+                else:
+                    with open(caminho, 'wb') as arquivo:
+                        arquivo.write(artefato.valor)
+                gravado = True
+            except Exception:
+                gravado = False
+
+            with self._lock:
+                gravacao, artefato.em_transito = artefato.em_transito, None
+                if gravado and not artefato.descartado:
+                    artefato.caminho = caminho
+                    artefato.valor = None
+                    self._gravados += 1
+                    caminho = None
+            if caminho is not None:
+                try:
+                    os.remove(caminho)
+                except OSError:
+                    pass
+            gravacao.set()
+
+    @staticmethod
+    def _ler(caminho: str, tabela: bool) -> Any:
+        if tabela:
+            import pandas as pd
+            return pd.read_pickle(caminho, compression=COMPRESSAO_TABELAS)
+        with open(caminho, 'rb') as arquivo:
+            return arquivo.read()
+
+    def _descartar(self, artefato: Artefato):
+        """Marca o artefato como removido do armazém e apaga o arquivo"""
+        artefato.descartado = True
+        self._apagar_arquivo(artefato)
+
+    @staticmethod
+    def _apagar_arquivo(artefato: Artefato):
+        if artefato.caminho is not None:
+            try:
+                os.remove(artefato.caminho)
+            except OSError:
+                pass
+            artefato.caminho = None
+
+    def fechar(self):
+        """Apaga o diretório dos artefatos gravados em disco"""
+        with self._lock:
+            for artefatos in self._sessoes.values():
+                for artefato in artefatos.values():
+                    artefato.descartado = True
+            self._sessoes.clear()
+            self._acessos.clear()
+        shutil.rmtree(self.diretorio, ignore_errors=True)
@@ -4,9 +4,12 @@ Módulo responsável pelo processamento e transformação dos dados
 """
 
 import pandas as pd
-from typing import Tuple, List, Dict
+from typing import Tuple, List, Dict, Optional
 import re
 
+from utils.diagnostico import etapa
+from utils.registro_escolas import RegistroEscolas, get_registro
+
 
 class OlimpiadasProcessor:
     """Processador de dados para separação entre Olimpíadas e Paralimpíadas"""
@@ -14,7 +17,13 @@ class OlimpiadasProcessor:
     DEFICIENCIA_OLIMPIADAS = "Não possui deficiência/transtorno"
     ABA_IGNORADA = "DIVISÃO"
     
-    def __init__(self):
+    def __init__(self, registro: Optional[RegistroEscolas] = None):
+        """
+        Args:
+            registro: Cadastro usado para unificar os nomes das escolas
+                (padrão: o cadastro de HUB_REGISTRO_ESCOLAS)
+        """
+        self.registro = registro if registro is not None else get_registro()
         self.olimpiadas_data = {}
         self.paralimpiadas_data = []
         self.anos_set = set()
@@ -32,16 +41,25 @@ class OlimpiadasProcessor:
         Returns:
             Tuple com (olimpiadas_pivot, paralimpiadas_long, anos_ordenados)
         """
-        for sheet_name, df in workbook_data.items():
-            if sheet_name.upper() == self.ABA_IGNORADA:
-                continue
+        with etapa('process_workbook', abas=len(workbook_data)):
+            with etapa('processar abas') as medida:
+                linhas = 0
+                for sheet_name, df in workbook_data.items():
+                    if sheet_name.upper() == self.ABA_IGNORADA:
+                        continue
+                    
+                    self._process_sheet(sheet_name, df)
+                    linhas += len(df)
+                medida.registrar(linhas=linhas, escolas=len(self.olimpiadas_data))
             
-            self._process_sheet(sheet_name, df)
-        
-        # Criar DataFrames finais
-        olimpiadas_df = self._create_olimpiadas_pivot()
-        paralimpiadas_df = self._create_paralimpiadas_long()
-        anos_ordenados = self._get_anos_ordenados()
+            # Criar DataFrames finais
+            with etapa('tabela olimpíadas') as medida:
+                olimpiadas_df = self._create_olimpiadas_pivot()
+                medida.registrar(linhas=len(olimpiadas_df))
+            with etapa('tabela paralimpíadas') as medida:
+                paralimpiadas_df = self._create_paralimpiadas_long()
+                medida.registrar(linhas=len(paralimpiadas_df))
+            anos_ordenados = self._get_anos_ordenados()
         
         return olimpiadas_df, paralimpiadas_df, anos_ordenados
     
@@ -53,6 +71,9 @@ class OlimpiadasProcessor:
         # Nome da escola (primeira linha, primeira coluna)
         nome_escola = df.iloc[0, 0] if not pd.isna(df.iloc[0, 0]) else sheet_name
         
+        # Grafias diferentes da mesma escola viram o nome oficial do cadastro
+        nome_escola = self.registro.resolver(nome_escola)
+        
         # Headers estão na segunda linha (índice 1)
         headers = df.iloc[1].tolist()
         
@@ -0,0 +1,409 @@
+# utils/diagnostico.py
+"""
+Medição do tempo (e, opcionalmente, da memória) de cada etapa do processamento
+
+As etapas só são registradas quando há uma medição em andamento no
+contexto atual (o painel de diagnóstico abre uma por execução da página).
+Sem medição, `etapa` devolve um contexto vazio compartilhado e o custo é
+uma consulta a uma ContextVar, então as chamadas podem ficar no código.
+
+    with etapa('read_excel') as e:
+        ...
+        e.registrar(linhas=1234)
+
+As tarefas enviadas ao pool com `run_blocking` medem as etapas no processo
+filho e as devolvem junto com o resultado, dentro da etapa que as enviou.
+
+Com `Medicao(..., memoria=True)`, o tracemalloc fica ligado durante a
+medição e cada etapa registra o pico de memória alocada, a memória que
+continuou alocada no fim e os locais do código responsáveis por ela. O
+tracemalloc deixa o processo várias vezes mais lento e é do processo
+inteiro: medições de memória simultâneas (várias sessões) se misturam.
+Este módulo não depende do Streamlit, para rodar também nos processos do
+pool e na linha de comando.
+"""
+
+import os
+import sysconfig
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Quadros da pilha guardados por alocação. Com 1, o local é a linha que alocou
+# (geralmente dentro do pandas ou do ReportLab); com mais quadros, aparece também
+# a linha do hub que a chamou, mas cada alocação fica bem mais cara.
+QUADROS_MEMORIA = int(os.environ.get('HUB_DIAGNOSTICO_QUADROS', 1))
+
+# Locais que mais alocaram guardados por etapa
+LOCAIS_POR_ETAPA = 5
+
+_RAIZ_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_BIBLIOTECA_PADRAO = sysconfig.get_paths()['stdlib']
+
+# Alocações da própria medição (instantâneos e etapas), fora dos locais mostrados
+_ARQUIVOS_DA_MEDICAO = (tracemalloc.__file__, __file__)
+
+
+class Etapa:
+    """Trecho medido, com as contagens registradas e as etapas internas"""
+
+    __slots__ = ('nome', 'inicio', 'segundos', 'contagens', 'etapas', 'memoria', '_memoria_inicial', '_pico', '_instantaneo')
+
+    def __init__(self, nome: str, contagens: Optional[Dict[str, int]] = None):
+        self.nome = nome
+        self.inicio = time.perf_counter()
+        self.segundos: Optional[float] = None
+        self.contagens: Dict[str, int] = dict(contagens or {})
+        self.etapas: List['Etapa'] = []
+        # {'pico_bytes', 'retida_bytes', 'locais'}, só no modo memória
+        self.memoria: Optional[Dict[str, Any]] = None
+        self._memoria_inicial = 0
+        self._pico = 0
+        self._instantaneo: Optional[tracemalloc.Snapshot] = None
+
+    def registrar(self, **contagens: int):
+        """Guarda contagens da etapa (linhas, etiquetas, abas...)"""
+        self.contagens.update({nome: int(valor) for nome, valor in contagens.items()})
+
+    def como_dict(self) -> Dict[str, Any]:
+        return {
+            'nome': self.nome,
+            'segundos': self.segundos,
+            'contagens': dict(self.contagens),
+            'memoria': self.memoria,
+            'etapas': [etapa.como_dict() for etapa in self.etapas]
+        }
+
+    @classmethod
+    def de_dict(cls, dados: Dict[str, Any]) -> 'Etapa':
+        etapa = cls(dados['nome'], dados['contagens'])
+        etapa.segundos = dados['segundos']
+        etapa.memoria = dados.get('memoria')
+        etapa.etapas = [cls.de_dict(interna) for interna in dados['etapas']]
+        return etapa
+
+
+class _EtapaNula:
+    """Etapa usada sem medição em andamento: não mede nem guarda nada"""
+
+    __slots__ = ()
+
+    def registrar(self, **contagens: int):
+        pass
+
+    def __enter__(self) -> '_EtapaNula':
+        return self
+
+    def __exit__(self, *erro) -> bool:
+        return False
+
+
+_NULA = _EtapaNula()
+
+
+_lock_tracemalloc = threading.Lock()
+_usos_tracemalloc = 0
+_tracemalloc_iniciado_aqui = False
+
+
+def _iniciar_tracemalloc():
+    """Liga o tracemalloc na primeira medição de memória em andamento"""
+    global _usos_tracemalloc, _tracemalloc_iniciado_aqui
+    with _lock_tracemalloc:
+        if _usos_tracemalloc == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(QUADROS_MEMORIA)
+            _tracemalloc_iniciado_aqui = True
+        _usos_tracemalloc += 1
+
+
+def _parar_tracemalloc():
+    """Desliga o tracemalloc quando a última medição de memória termina (se foi ligado aqui)"""
+    global _usos_tracemalloc, _tracemalloc_iniciado_aqui
+    with _lock_tracemalloc:
+        _usos_tracemalloc -= 1
+        if _usos_tracemalloc == 0 and _tracemalloc_iniciado_aqui:
+            tracemalloc.stop()
+            _tracemalloc_iniciado_aqui = False
+
+
+def _descrever_quadro(quadro: tracemalloc.Frame) -> str:
+    """arquivo:linha, relativo ao projeto, ao site-packages ou à biblioteca padrão"""
+    arquivo = quadro.filename
+    if arquivo.startswith(_RAIZ_PROJETO):
+        arquivo = os.path.relpath(arquivo, _RAIZ_PROJETO)
+    elif 'site-packages' in arquivo:
+        arquivo = arquivo.split('site-packages', 1)[1].lstrip(os.sep)
+    elif arquivo.startswith(_BIBLIOTECA_PADRAO):
+        arquivo = os.path.relpath(arquivo, _BIBLIOTECA_PADRAO)
+    return f"{arquivo}:{quadro.lineno}"
+
+
+def _memoria_por_local(instantaneo: tracemalloc.Snapshot) -> Dict[Tuple[str, Optional[str]], List[int]]:
+    """
+    Bytes e blocos alocados agrupados por local
+
+    O local é a linha que alocou; a origem é a linha mais recente do projeto
+    na pilha (None se ela não foi guardada ou se a alocação já é do projeto).
+    """
+    por_local: Dict[Tuple[str, Optional[str]], List[int]] = defaultdict(lambda: [0, 0])
+    # statistics('traceback') já agrupa as alocações com a mesma pilha: só as distintas são descritas
+    for estatistica in instantaneo.statistics('traceback'):
+        quadros = estatistica.traceback
+        if quadros[-1].filename in _ARQUIVOS_DA_MEDICAO:
+            continue
+        local = _descrever_quadro(quadros[-1])
+        origem = None
+        if not quadros[-1].filename.startswith(_RAIZ_PROJETO):
+            for quadro in reversed(quadros):
+                if quadro.filename.startswith(_RAIZ_PROJETO) and quadro.filename not in _ARQUIVOS_DA_MEDICAO:
+                    origem = _descrever_quadro(quadro)
+                    break
+        total = por_local[(local, origem)]
+        total[0] += estatistica.size
+        total[1] += estatistica.count
+    return por_local
+
+
+def _locais_que_mais_alocaram(antes: tracemalloc.Snapshot, depois: tracemalloc.Snapshot) -> List[Dict[str, Any]]:
+    """Locais com maior crescimento da memória alocada entre os dois instantâneos"""
+    inicial = _memoria_por_local(antes)
+    crescimento = []
+    for chave, (tamanho, blocos) in _memoria_por_local(depois).items():
+        tamanho_antes, blocos_antes = inicial.get(chave, (0, 0))
+        if tamanho > tamanho_antes:
+            crescimento.append((tamanho - tamanho_antes, blocos - blocos_antes, chave))
+    crescimento.sort(key=lambda item: item[0], reverse=True)
+    return [
+        {'local': local, 'origem': origem, 'bytes': tamanho, 'blocos': blocos}
+        for tamanho, blocos, (local, origem) in crescimento[:LOCAIS_POR_ETAPA]
+    ]
+
+
+class Medicao:
+    """
+    Etapas medidas numa execução (da página, de um PDF ou de uma tarefa do pool)
+
+    Args:
+        titulo: Descrição da execução, mostrada no painel
+        memoria: Se True, mede também a memória alocada em cada etapa (tracemalloc)
+    """
+
+    def __init__(self, titulo: str, memoria: bool = False):
+        self.titulo = titulo
+        self.memoria = memoria
+        self.iniciada_em = datetime.now()
+        self.segundos: Optional[float] = None
+        self.erro: Optional[str] = None
+        self.etapas: List[Etapa] = []
+        self._pilha: List[Etapa] = []
+        self._inicio = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @property
+    def concluida(self) -> bool:
+        return self.segundos is not None
+
+    def _abrir(self, etapa: Etapa):
+        with self._lock:
+            (self._pilha[-1].etapas if self._pilha else self.etapas).append(etapa)
+        if self.memoria and tracemalloc.is_tracing():
+            self._abrir_memoria(etapa)
+        self._pilha.append(etapa)
+
+    def _fechar(self, etapa: Etapa):
+        etapa.segundos = time.perf_counter() - etapa.inicio
+        self._pilha.pop()
+        if etapa._instantaneo is not None:
+            self._fechar_memoria(etapa)
+
+    def _abrir_memoria(self, etapa: Etapa):
+        # O pico do tracemalloc é um só: antes de zerá-lo para a etapa nova, o pico
+        # até aqui fica guardado na etapa aberta, que o combina com o das internas
+        atual, pico = tracemalloc.get_traced_memory()
+        if self._pilha:
+            self._pilha[-1]._pico = max(self._pilha[-1]._pico, pico)
+        etapa._instantaneo = tracemalloc.take_snapshot()
+        etapa._memoria_inicial = atual
+        etapa._pico = atual
+        tracemalloc.reset_peak()
+
+    def _fechar_memoria(self, etapa: Etapa):
+        atual, pico = tracemalloc.get_traced_memory()
+        pico = max(etapa._pico, pico)
+        antes, etapa._instantaneo = etapa._instantaneo, None
+        etapa.memoria = {
+            'pico_bytes': pico - etapa._memoria_inicial,
+            'retida_bytes': atual - etapa._memoria_inicial,
+            'locais': _locais_que_mais_alocaram(antes, tracemalloc.take_snapshot())
+        }
+        if self._pilha:
+            self._pilha[-1]._pico = max(self._pilha[-1]._pico, pico)
+        # Zera o pico de novo para não contar a comparação dos instantâneos na etapa de fora
+        tracemalloc.reset_peak()
+
+    def anexar(self, etapas: List[Dict[str, Any]]):
+        """Acrescenta etapas medidas em outro processo dentro da etapa aberta"""
+        with self._lock:
+            destino = self._pilha[-1].etapas if self._pilha else self.etapas
+            destino.extend(Etapa.de_dict(dados) for dados in etapas)
+
+    def encerrar(self, erro: Optional[BaseException] = None):
+        self.segundos = time.perf_counter() - self._inicio
+        if erro is not None:
+            self.erro = f"{type(erro).__name__}: {erro}"
+
+    def como_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            etapas = [etapa.como_dict() for etapa in self.etapas]
+        return {
+            'titulo': self.titulo,
+            'iniciada_em': self.iniciada_em.isoformat(timespec='seconds'),
+            'segundos': self.segundos,
+            'erro': self.erro,
+            'memoria': self.memoria,
+            'etapas': etapas
+        }
+
+    def linhas(self) -> List[Dict[str, Any]]:
+        """Etapas em ordem, com o nível de cada uma, para exibir como tabela"""
+        resultado = []
+
+        def percorrer(etapas: List[Dict[str, Any]], nivel: int):
+            for etapa in etapas:
+                resultado.append({'nivel': nivel, **{k: v for k, v in etapa.items() if k != 'etapas'}})
+                percorrer(etapa['etapas'], nivel + 1)
+
+        percorrer(self.como_dict()['etapas'], 0)
+        return resultado
+
+    def relatorio_memoria(self) -> str:
+        """Relatório em texto com pico, memória retida e locais que mais alocaram por etapa"""
+        linhas = [
+            f"{self.titulo} ({self.iniciada_em:%d/%m/%Y %H:%M:%S})",
+            "Pico: maior memória alocada durante a etapa, além da que já estava alocada no início",
+            "Retida: memória que continuou alocada no fim da etapa",
+            ""
+        ]
+        for linha in self.linhas():
+            recuo = "  " * linha['nivel']
+            memoria = linha['memoria']
+            if memoria is None:
+                linhas.append(f"{recuo}{linha['nome']}: sem medição de memória")
+                continue
+            segundos = f"{linha['segundos']:.3f}s" if linha['segundos'] is not None else "em andamento"
+            linhas.append(
+                f"{recuo}{linha['nome']}: {segundos} · pico {memoria['pico_bytes'] / 1024 ** 2:,.2f} MB"
+                f" · retida {memoria['retida_bytes'] / 1024 ** 2:,.2f} MB"
+            )
+            for local in memoria['locais']:
+                origem = f" (chamado em {local['origem']})" if local['origem'] else ""
+                linhas.append(
+                    f"{recuo}    {local['bytes'] / 1024 ** 2:>9,.2f} MB em {local['blocos']:,} blocos: {local['local']}{origem}"
+                )
+        return "\n".join(linhas) + "\n"
+
+
+_medicao_atual: ContextVar[Optional[Medicao]] = ContextVar('medicao_atual', default=None)
+
+
+class _ContextoEtapa:
+    __slots__ = ('medicao', 'etapa')
+
+    def __init__(self, medicao: Medicao, etapa: Etapa):
+        self.medicao = medicao
+        self.etapa = etapa
+
+    def __enter__(self) -> Etapa:
+        self.etapa.inicio = time.perf_counter()
+        self.medicao._abrir(self.etapa)
+        return self.etapa
+
+    def __exit__(self, *erro) -> bool:
+        self.medicao._fechar(self.etapa)
+        return False
+
+
+def etapa(nome: str, **contagens: int):
+    """
+    Mede um trecho como etapa da medição em andamento
+
+    Args:
+        nome: Nome da etapa
+        **contagens: Contagens já conhecidas no início (linhas, etiquetas...)
+
+    Returns:
+        Context manager que devolve a etapa, para registrar mais contagens
+    """
+    medicao = _medicao_atual.get()
+    if medicao is None:
+        return _NULA
+    return _ContextoEtapa(medicao, Etapa(nome, contagens))
+
+
+def medicao_atual() -> Optional[Medicao]:
+    return _medicao_atual.get()
+
+
+@contextmanager
+def medindo(medicao: Optional[Medicao]) -> Iterator[Optional[Medicao]]:
+    """
+    Usa `medicao` como medição em andamento no bloco e a encerra no fim
+
+    Com None, o bloco roda sem medição (e sem custo).
+    """
+    if medicao is None:
+        yield None
+        return
+    if medicao.memoria:
+        _iniciar_tracemalloc()
+    token = _medicao_atual.set(medicao)
+    try:
+        yield medicao
+    except BaseException as e:
+        medicao.encerrar(e)
+        raise
+    else:
+        medicao.encerrar()
+    finally:
+        _medicao_atual.reset(token)
+        if medicao.memoria:
+            _parar_tracemalloc()
+
+
+def executar_medindo(func: Callable, memoria: bool, *args, **kwargs):
+    """
+    Executa `func` com uma medição própria (no processo do pool)
+
+    Args:
+        memoria: Se True, mede também a memória de cada etapa
+
+    Returns:
+        Tuple com (resultado de func, etapas medidas como dicionários)
+    """
+    medicao = Medicao(getattr(func, '__name__', 'tarefa'), memoria=memoria)
+    with medindo(medicao):
+        resultado = func(*args, **kwargs)
+    return resultado, medicao.como_dict()['etapas']
+
+
+def run_blocking(pool, func: Callable, *args, **kwargs):
+    """
+    WorkerPool.run_blocking que traz as etapas medidas no processo filho
+
+    Sem medição em andamento, é só pool.run_blocking. Com medição, a tarefa
+    vira uma etapa "pool: <função>" com as etapas do processo filho dentro;
+    a diferença entre as duas é a espera na fila e a transferência dos dados.
+    """
+    medicao = _medicao_atual.get()
+    if medicao is None:
+        return pool.run_blocking(func, *args, **kwargs)
+
+    with etapa(f"pool: {getattr(func, '__name__', 'tarefa')}"):
+        resultado, etapas = pool.run_blocking(executar_medindo, func, medicao.memoria, *args, **kwargs)
+        medicao.anexar(etapas)
+    return resultado
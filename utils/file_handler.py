@@ -4,10 +4,12 @@ Módulo responsável pela leitura e escrita de arquivos
 """
 
 import pandas as pd
-from typing import Dict, BinaryIO
+from typing import Dict, BinaryIO, List, Optional
 from io import BytesIO
 import openpyxl
 
+from utils.diagnostico import etapa
+
 
 class FileHandler:
     """Manipulador de arquivos Excel e CSV"""
@@ -23,20 +25,94 @@ class FileHandler:
         Returns:
             Dicionário com {nome_aba: DataFrame}
         """
-        excel_file = pd.ExcelFile(file)
-        workbook_data = {}
-        
-        for sheet_name in excel_file.sheet_names:
-            # Ler sem usar a primeira linha como header
-            df = pd.read_excel(
-                excel_file,
-                sheet_name=sheet_name,
-                header=None
-            )
-            workbook_data[sheet_name] = df
-        
+        with etapa('read_excel') as medida:
+            excel_file = pd.ExcelFile(file)
+            workbook_data = {}
+            
+            for sheet_name in excel_file.sheet_names:
+                # Ler sem usar a primeira linha como header
+                df = pd.read_excel(
+                    excel_file,
+                    sheet_name=sheet_name,
+                    header=None
+                )
+                workbook_data[sheet_name] = df
+            
+            medida.registrar(abas=len(workbook_data), linhas=sum(len(df) for df in workbook_data.values()))
         return workbook_data
     
+    @staticmethod
+    def read_csv_header(file: BinaryIO) -> List[str]:
+        """
+        Lê apenas o cabeçalho do CSV
+
+        Args:
+            file: Arquivo binário do CSV
+
+        Returns:
+            Lista com os nomes das colunas
+        """
+        file.seek(0)
+        colunas = pd.read_csv(file, nrows=0).columns.tolist()
+        file.seek(0)
+        return colunas
+
+    @staticmethod
+    def read_excel_headers(file: BinaryIO) -> Dict[str, List]:
+        """
+        Lê apenas o cabeçalho de cada aba do Excel
+
+        Args:
+            file: Arquivo binário do Excel
+
+        Returns:
+            Dicionário com {nome_aba: lista com os nomes das colunas}
+        """
+        excel_file = pd.ExcelFile(file)
+        return {
+            sheet_name: pd.read_excel(excel_file, sheet_name=sheet_name, nrows=0).columns.tolist()
+            for sheet_name in excel_file.sheet_names
+        }
+
+    @staticmethod
+    def read_csv_columns(
+        file: BinaryIO,
+        usecols: List[str],
+        dtype: Optional[Dict[str, type]] = None
+    ) -> pd.DataFrame:
+        """
+        Lê somente as colunas informadas do CSV, com tipos explícitos
+
+        Usa o leitor do pyarrow quando disponível e volta para o leitor C
+        padrão do pandas se ele não estiver instalado ou não conseguir
+        interpretar o arquivo (por exemplo, quebras de linha dentro de aspas).
+
+        Args:
+            file: Arquivo binário do CSV
+            usecols: Colunas que serão lidas
+            dtype: Tipo de cada coluna
+
+        Returns:
+            DataFrame apenas com as colunas pedidas
+        """
+        try:
+            import pyarrow  # noqa: F401
+            engines = ['pyarrow', 'c']
+        except ImportError:
+            engines = ['c']
+
+        with etapa('read_csv') as medida:
+            for engine in engines:
+                file.seek(0)
+                try:
+                    df = pd.read_csv(file, usecols=usecols, dtype=dtype, engine=engine)
+                except ValueError:
+                    if engine == engines[-1]:
+                        raise
+                    continue
+                medida.registrar(linhas=len(df), colunas=len(df.columns))
+                return df
+
     @staticmethod
     def to_excel(df: pd.DataFrame, filename: str = "output.xlsx") -> bytes:
         """
@@ -80,13 +156,16 @@ class FileHandler:
         Returns:
             Tuple com (data, mime_type, extension)
         """
-        if format.lower() == 'excel':
-            data = FileHandler.to_excel(df)
-            mime = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            ext = 'xlsx'
-        else:  # csv
-            data = FileHandler.to_csv(df)
-            mime = 'text/csv'
-            ext = 'csv'
+        with etapa(f'get_download_button_data ({format.lower()})', linhas=len(df)) as medida:
+            if format.lower() == 'excel':
+                data = FileHandler.to_excel(df)
+                mime = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+                ext = 'xlsx'
+                medida.registrar(bytes=len(data))
+            else:  # csv
+                data = FileHandler.to_csv(df)
+                mime = 'text/csv'
+                ext = 'csv'
+                medida.registrar(caracteres=len(data))
         
         return data, mime, ext
\ No newline at end of file
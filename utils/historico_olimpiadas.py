@@ -0,0 +1,314 @@
+# utils/historico_olimpiadas.py
+"""
+Módulo responsável pelo histórico das planilhas de olimpíadas processadas
+
+As tabelas geradas pelo OlimpiadasProcessor (escola × ano e escola ×
+categoria × ano) ficam num arquivo SQLite, identificadas pela campanha e pelo
+hash do arquivo enviado. As escolas são guardadas uma vez e referenciadas por
+id; os totais de cada escola por campanha são calculados ao salvar, para que
+as consultas entre campanhas leiam uma linha por escola e não as contagens.
+"""
+
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS campanhas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    nome TEXT NOT NULL,
+    hash_arquivo TEXT NOT NULL,
+    arquivo TEXT NOT NULL,
+    anos TEXT NOT NULL,
+    salva_em REAL NOT NULL,
+    UNIQUE (nome, hash_arquivo)
+);
+CREATE INDEX IF NOT EXISTS idx_campanhas_salva_em ON campanhas (salva_em);
+
+CREATE TABLE IF NOT EXISTS escolas (
+    id INTEGER PRIMARY KEY,
+    nome TEXT NOT NULL UNIQUE
+);
+
+-- Uma linha por escola da planilha, com os totais já somados
+CREATE TABLE IF NOT EXISTS totais_escolas (
+    campanha_id INTEGER NOT NULL REFERENCES campanhas (id) ON DELETE CASCADE,
+    escola_id INTEGER NOT NULL REFERENCES escolas (id),
+    olimpiadas INTEGER NOT NULL,
+    paralimpiadas INTEGER NOT NULL,
+    PRIMARY KEY (campanha_id, escola_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_totais_escolas_escola ON totais_escolas (escola_id, campanha_id);
+
+-- Só as contagens diferentes de zero (a tabela pivotada é quase toda zeros)
+CREATE TABLE IF NOT EXISTS olimpiadas (
+    campanha_id INTEGER NOT NULL REFERENCES campanhas (id) ON DELETE CASCADE,
+    escola_id INTEGER NOT NULL REFERENCES escolas (id),
+    ano TEXT NOT NULL,
+    quantidade INTEGER NOT NULL,
+    PRIMARY KEY (campanha_id, escola_id, ano)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_olimpiadas_escola ON olimpiadas (escola_id, campanha_id);
+
+CREATE TABLE IF NOT EXISTS paralimpiadas (
+    campanha_id INTEGER NOT NULL REFERENCES campanhas (id) ON DELETE CASCADE,
+    ordem INTEGER NOT NULL,
+    escola_id INTEGER NOT NULL REFERENCES escolas (id),
+    categoria TEXT NOT NULL,
+    ano TEXT NOT NULL,
+    quantidade INTEGER NOT NULL,
+    PRIMARY KEY (campanha_id, ordem)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_paralimpiadas_escola ON paralimpiadas (escola_id, campanha_id);
+"""
+
+
+class HistoricoOlimpiadas:
+    """Histórico SQLite das tabelas de Olimpíadas e Paralimpíadas por campanha"""
+
+    def __init__(self, caminho: Optional[str] = None):
+        """
+        Args:
+            caminho: Arquivo SQLite (padrão: HUB_HISTORICO ou ~/.hub_automatizacoes/historico_olimpiadas.sqlite)
+        """
+        self.caminho = caminho or os.environ.get(
+            'HUB_HISTORICO',
+            os.path.join(os.path.expanduser('~'), '.hub_automatizacoes', 'historico_olimpiadas.sqlite')
+        )
+        self._esquema_criado = False
+
+    def _conectar(self) -> sqlite3.Connection:
+        if not self._esquema_criado:
+            os.makedirs(os.path.dirname(os.path.abspath(self.caminho)), exist_ok=True)
+        conexao = sqlite3.connect(self.caminho, timeout=30)
+        conexao.execute("PRAGMA foreign_keys = ON")
+        # Em WAL as consultas não esperam uma gravação em andamento, e basta
+        # sincronizar o disco nos checkpoints
+        conexao.execute("PRAGMA synchronous = NORMAL")
+        if not self._esquema_criado:
+            conexao.execute("PRAGMA journal_mode = WAL")
+            conexao.executescript(ESQUEMA)
+            self._esquema_criado = True
+        return conexao
+
+    @staticmethod
+    def _ids_escolas(conexao: sqlite3.Connection, nomes: Iterable[str]) -> Dict[str, int]:
+        """Cadastra as escolas novas e retorna {nome: id} das escolas informadas"""
+        nomes = list(dict.fromkeys(nomes))
+        conexao.executemany("INSERT OR IGNORE INTO escolas (nome) VALUES (?)", [(nome,) for nome in nomes])
+        ids = {}
+        # O SQLite limita a quantidade de parâmetros por consulta
+        for inicio in range(0, len(nomes), 500):
+            lote = nomes[inicio:inicio + 500]
+            marcadores = ",".join("?" * len(lote))
+            ids.update(
+                (nome, escola_id) for escola_id, nome in
+                conexao.execute(f"SELECT id, nome FROM escolas WHERE nome IN ({marcadores})", lote)
+            )
+        return ids
+
+    def salvar(
+        self,
+        nome: str,
+        hash_arquivo: str,
+        olimpiadas_df: pd.DataFrame,
+        paralimpiadas_df: pd.DataFrame,
+        anos_ordenados: List[str],
+        arquivo: str = ""
+    ) -> Tuple[int, bool]:
+        """
+        Guarda as tabelas de uma planilha processada, numa única transação
+
+        A mesma planilha (hash) salva de novo com o mesmo nome de campanha não
+        é duplicada.
+
+        Args:
+            nome: Nome da campanha
+            hash_arquivo: Hash do arquivo enviado
+            olimpiadas_df: Tabela pivotada (Escola + uma coluna por ano)
+            paralimpiadas_df: Tabela normalizada (Escola, Categoria, Ano, Quantidade)
+            anos_ordenados: Ordem das colunas de anos
+            arquivo: Nome do arquivo enviado
+
+        Returns:
+            Tuple com (id da campanha, True se foi gravada agora)
+        """
+        if olimpiadas_df.empty:
+            olimpiadas_df = pd.DataFrame(columns=['Escola'])
+        if paralimpiadas_df.empty:
+            paralimpiadas_df = pd.DataFrame(columns=['Escola', 'Categoria', 'Ano', 'Quantidade'])
+        olimpiadas = olimpiadas_df.melt(id_vars='Escola', var_name='Ano', value_name='Quantidade')
+        olimpiadas = olimpiadas[olimpiadas['Quantidade'] != 0]
+
+        totais = pd.concat([
+            olimpiadas_df.set_index('Escola').sum(axis=1).rename('olimpiadas'),
+            paralimpiadas_df.groupby('Escola')['Quantidade'].sum().rename('paralimpiadas')
+        ], axis=1).fillna(0).astype(int)
+        totais.index = totais.index.astype(str)
+
+        with closing(self._conectar()) as conexao, conexao:
+            existente = conexao.execute(
+                "SELECT id FROM campanhas WHERE nome = ? AND hash_arquivo = ?", (nome, hash_arquivo)
+            ).fetchone()
+            if existente is not None:
+                return existente[0], False
+
+            campanha_id = conexao.execute(
+                "INSERT INTO campanhas (nome, hash_arquivo, arquivo, anos, salva_em) VALUES (?, ?, ?, ?, ?)",
+                (nome, hash_arquivo, arquivo, json.dumps(list(anos_ordenados), ensure_ascii=False), time.time())
+            ).lastrowid
+            escolas = self._ids_escolas(conexao, totais.index)
+
+            conexao.executemany(
+                "INSERT INTO totais_escolas (campanha_id, escola_id, olimpiadas, paralimpiadas) VALUES (?, ?, ?, ?)",
+                zip(
+                    [campanha_id] * len(totais),
+                    totais.index.map(escolas).tolist(),
+                    totais['olimpiadas'].tolist(),
+                    totais['paralimpiadas'].tolist()
+                )
+            )
+            conexao.executemany(
+                "INSERT INTO olimpiadas (campanha_id, escola_id, ano, quantidade) VALUES (?, ?, ?, ?)",
+                zip(
+                    [campanha_id] * len(olimpiadas),
+                    olimpiadas['Escola'].astype(str).map(escolas).tolist(),
+                    olimpiadas['Ano'].astype(str).tolist(),
+                    olimpiadas['Quantidade'].astype(int).tolist()
+                )
+            )
+            conexao.executemany(
+                "INSERT INTO paralimpiadas (campanha_id, ordem, escola_id, categoria, ano, quantidade) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                zip(
+                    [campanha_id] * len(paralimpiadas_df),
+                    range(len(paralimpiadas_df)),
+                    paralimpiadas_df['Escola'].astype(str).map(escolas).tolist(),
+                    paralimpiadas_df['Categoria'].astype(str).tolist(),
+                    paralimpiadas_df['Ano'].astype(str).tolist(),
+                    paralimpiadas_df['Quantidade'].astype(int).tolist()
+                )
+            )
+        return campanha_id, True
+
+    def campanhas(self) -> pd.DataFrame:
+        """Campanhas salvas, das mais recentes para as mais antigas, com seus totais"""
+        with closing(self._conectar()) as conexao, conexao:
+            return pd.read_sql_query(
+                """
+                SELECT
+                    c.id AS id,
+                    c.nome AS Campanha,
+                    c.arquivo AS Arquivo,
+                    datetime(c.salva_em, 'unixepoch', 'localtime') AS "Salva em",
+                    COUNT(t.escola_id) AS Escolas,
+                    COALESCE(SUM(t.olimpiadas), 0) AS "Olimpíadas",
+                    COALESCE(SUM(t.paralimpiadas), 0) AS "Paralimpíadas"
+                FROM campanhas c LEFT JOIN totais_escolas t ON t.campanha_id = c.id
+                GROUP BY c.id
+                ORDER BY c.salva_em DESC, c.id DESC
+                """,
+                conexao
+            )
+
+    def totais_por_escola(
+        self,
+        ultimas: int = 5,
+        campanhas: Optional[List[int]] = None
+    ) -> pd.DataFrame:
+        """
+        Total de participantes (olimpíadas e paralimpíadas) de cada escola nas campanhas, lado a lado
+
+        Args:
+            ultimas: Quantidade de campanhas mais recentes consultadas
+            campanhas: Ids das campanhas consultadas (em vez das últimas)
+
+        Returns:
+            DataFrame com Escola, uma coluna por campanha (da mais antiga para
+            a mais recente) e o Total; escolas ausentes numa campanha ficam com 0
+        """
+        if campanhas is not None:
+            marcadores = ",".join("?" * len(campanhas)) or "NULL"
+            selecao = f"SELECT id, nome, salva_em FROM campanhas WHERE id IN ({marcadores})"
+            parametros = list(campanhas)
+        else:
+            selecao = "SELECT id, nome, salva_em FROM campanhas ORDER BY salva_em DESC, id DESC LIMIT ?"
+            parametros = [ultimas]
+
+        with closing(self._conectar()) as conexao, conexao:
+            escolhidas = conexao.execute(f"SELECT id, nome FROM ({selecao}) ORDER BY salva_em, id", parametros).fetchall()
+            ids = [campanha_id for campanha_id, _ in escolhidas]
+            # Uma coluna por campanha já no SQLite: volta uma linha por escola
+            somas = "".join(
+                ", SUM(CASE t.campanha_id WHEN ? THEN t.olimpiadas + t.paralimpiadas ELSE 0 END)" for _ in ids
+            )
+            linhas = conexao.execute(
+                f"SELECT escolas.nome{somas} FROM totais_escolas t JOIN escolas ON escolas.id = t.escola_id "
+                f"WHERE t.campanha_id IN ({','.join('?' * len(ids)) or 'NULL'}) GROUP BY t.escola_id",
+                ids + ids
+            ).fetchall()
+
+        # Campanhas com o mesmo nome (planilhas diferentes) ganham um sufixo
+        colunas = []
+        for _, nome in escolhidas:
+            rotulo, repeticao = nome, 2
+            while rotulo in colunas:
+                rotulo, repeticao = f"{nome} ({repeticao})", repeticao + 1
+            colunas.append(rotulo)
+
+        tabela = pd.DataFrame(linhas, columns=['Escola'] + colunas)
+        tabela['Total'] = tabela[colunas].sum(axis=1)
+        return tabela.sort_values('Escola', ignore_index=True)
+
+    def tabelas_da_campanha(self, campanha_id: int) -> Tuple[pd.DataFrame, pd.DataFrame, List[str]]:
+        """
+        Tabelas de uma campanha salva, no mesmo formato do OlimpiadasProcessor
+
+        Returns:
+            Tuple com (olimpiadas_pivot, paralimpiadas_long, anos_ordenados)
+
+        Raises:
+            KeyError: Se a campanha não existe
+        """
+        with closing(self._conectar()) as conexao, conexao:
+            anos = conexao.execute("SELECT anos FROM campanhas WHERE id = ?", (campanha_id,)).fetchone()
+            if anos is None:
+                raise KeyError(campanha_id)
+            anos_ordenados = json.loads(anos[0])
+            escolas = [nome for nome, in conexao.execute(
+                "SELECT escolas.nome FROM totais_escolas t JOIN escolas ON escolas.id = t.escola_id "
+                "WHERE t.campanha_id = ?", (campanha_id,)
+            )]
+            olimpiadas = pd.read_sql_query(
+                "SELECT escolas.nome AS Escola, ano AS Ano, quantidade AS Quantidade "
+                "FROM olimpiadas JOIN escolas ON escolas.id = olimpiadas.escola_id WHERE campanha_id = ?",
+                conexao, params=(campanha_id,)
+            )
+            paralimpiadas = pd.read_sql_query(
+                "SELECT escolas.nome AS Escola, categoria AS Categoria, ano AS Ano, quantidade AS Quantidade "
+                "FROM paralimpiadas JOIN escolas ON escolas.id = paralimpiadas.escola_id "
+                "WHERE campanha_id = ? ORDER BY ordem",
+                conexao, params=(campanha_id,)
+            )
+
+        olimpiadas_df = pd.DataFrame()
+        if escolas:
+            # Os zeros não são guardados: voltam ao completar a tabela pivotada
+            olimpiadas_df = olimpiadas.pivot(index='Escola', columns='Ano', values='Quantidade') \
+                .reindex(index=sorted(escolas), columns=anos_ordenados).fillna(0).astype(int)
+            olimpiadas_df.index.name = 'Escola'
+            olimpiadas_df.columns.name = None
+            olimpiadas_df = olimpiadas_df.reset_index()
+        if paralimpiadas.empty:
+            paralimpiadas = pd.DataFrame()
+        return olimpiadas_df, paralimpiadas, anos_ordenados
+
+    def excluir(self, campanha_id: int):
+        """Remove uma campanha e suas contagens"""
+        with closing(self._conectar()) as conexao, conexao:
+            conexao.execute("DELETE FROM campanhas WHERE id = ?", (campanha_id,))
@@ -0,0 +1,211 @@
+# utils/job_manager.py
+"""
+Módulo responsável pela execução de tarefas em segundo plano
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.armazem_sessao import ArmazemSessoes
+
+
+class JobCancelledError(Exception):
+    """Sinaliza que a tarefa foi cancelada pelo usuário"""
+
+
+class Job:
+    """Estado e resultado de uma tarefa executada em segundo plano"""
+
+    PENDENTE = "pendente"
+    EXECUTANDO = "executando"
+    CONCLUIDO = "concluido"
+    CANCELADO = "cancelado"
+    ERRO = "erro"
+
+    ETIQUETAS_POR_PAGINA = 10
+
+    def __init__(
+        self,
+        session_id: Optional[str],
+        descricao: str,
+        total_etiquetas: int = 0,
+        detalhes: Optional[Dict] = None
+    ):
+        self.id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.descricao = descricao
+        self.detalhes = detalhes or {}
+        self.status = self.PENDENTE
+        self.total_etiquetas = total_etiquetas
+        self.total_paginas = -(-total_etiquetas // self.ETIQUETAS_POR_PAGINA)
+        self.etiquetas_feitas = 0
+        self.paginas_feitas = 0
+        self.posicao_fila = 0
+        self.armazem: Optional[ArmazemSessoes] = None
+        self._resultado = None
+        self.erro = None
+        self.criado_em = time.time()
+        self.finalizado_em = None
+        self._cancelar = threading.Event()
+
+    @property
+    def resultado(self) -> Any:
+        """Resultado da tarefa; None se ainda não terminou ou se a sessão expirou no armazém"""
+        if self.armazem is not None:
+            return self.armazem.obter(self.session_id, f"job_{self.id}")
+        return self._resultado
+
+    @resultado.setter
+    def resultado(self, valor: Any):
+        if self.armazem is not None:
+            self.armazem.guardar(self.session_id, f"job_{self.id}", valor)
+        else:
+            self._resultado = valor
+
+    @property
+    def finalizado(self) -> bool:
+        """Indica se a tarefa já terminou (com ou sem sucesso)"""
+        return self.status in (self.CONCLUIDO, self.CANCELADO, self.ERRO)
+
+    @property
+    def cancelamento_solicitado(self) -> bool:
+        return self._cancelar.is_set()
+
+    @property
+    def progresso(self) -> float:
+        """Fração concluída, entre 0 e 1"""
+        if self.status == self.CONCLUIDO:
+            return 1.0
+        if not self.total_etiquetas:
+            return 0.0
+        return min(self.etiquetas_feitas / self.total_etiquetas, 1.0)
+
+    def update_progress(self, etiquetas: int, paginas: int, posicao_fila: int = 0):
+        """
+        Callback de progresso repassado para a função executada
+
+        Args:
+            etiquetas: Quantidade de etiquetas já desenhadas
+            paginas: Quantidade de páginas já finalizadas
+            posicao_fila: Posição na fila do pool de processos (0 = executando)
+
+        Raises:
+            JobCancelledError: Se o cancelamento foi solicitado
+        """
+        self.etiquetas_feitas = etiquetas
+        self.paginas_feitas = paginas
+        self.posicao_fila = posicao_fila
+        if self._cancelar.is_set():
+            raise JobCancelledError()
+
+
+class JobManager:
+    """Fila de tarefas executadas por threads em segundo plano"""
+
+    def __init__(self, max_workers: int = 2, ttl_seconds: int = 3600, armazem: Optional[ArmazemSessoes] = None):
+        """
+        Args:
+            max_workers: Quantidade máxima de tarefas executando ao mesmo tempo
+            ttl_seconds: Tempo que o resultado de uma tarefa finalizada fica disponível
+            armazem: Armazém onde ficam os resultados das tarefas com sessão
+                (contam no orçamento de memória da sessão e podem ir para o disco)
+        """
+        self.ttl_seconds = ttl_seconds
+        self.armazem = armazem
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="hub-job"
+        )
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        func: Callable,
+        *args,
+        session_id: Optional[str] = None,
+        descricao: str = "",
+        total_etiquetas: int = 0,
+        detalhes: Optional[Dict] = None,
+        **kwargs
+    ) -> str:
+        """
+        Enfileira uma função para execução em segundo plano
+
+        A função recebe o argumento nomeado `progresso`, que deve ser chamado
+        com (etiquetas_feitas, paginas_feitas) e interrompe a execução quando
+        a tarefa é cancelada. `detalhes` guarda informações livres para exibição.
+
+        Returns:
+            Identificador da tarefa
+        """
+        self.cleanup_expired()
+
+        job = Job(session_id, descricao, total_etiquetas, detalhes)
+        if session_id is not None:
+            job.armazem = self.armazem
+        with self._lock:
+            self._jobs[job.id] = job
+
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job.id
+
+    def _run(self, job: Job, func: Callable, args: tuple, kwargs: dict):
+        """Executa a tarefa registrando status, resultado e erro"""
+        if job.cancelamento_solicitado:
+            job.status = Job.CANCELADO
+            job.finalizado_em = time.time()
+            return
+
+        job.status = Job.EXECUTANDO
+        try:
+            job.resultado = func(*args, progresso=job.update_progress, **kwargs)
+            job.status = Job.CONCLUIDO
+        except JobCancelledError:
+            job.status = Job.CANCELADO
+        except Exception as e:
+            job.erro = str(e)
+            job.status = Job.ERRO
+        finally:
+            job.finalizado_em = time.time()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Retorna a tarefa, ou None se não existe ou já expirou"""
+        self.cleanup_expired()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str):
+        """Solicita o cancelamento de uma tarefa"""
+        job = self.get(job_id)
+        if job is not None and not job.finalizado:
+            job._cancelar.set()
+
+    def remove(self, job_id: str):
+        """Descarta a tarefa e o resultado, como se tivesse expirado"""
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+        if job is not None and job.armazem is not None:
+            job.armazem.remover(job.session_id, f"job_{job_id}")
+
+    def list_session_jobs(self, session_id: str) -> List[Job]:
+        """Lista as tarefas de uma sessão, das mais recentes para as mais antigas"""
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.session_id == session_id]
+        return sorted(jobs, key=lambda job: job.criado_em, reverse=True)
+
+    def cleanup_expired(self):
+        """Remove tarefas finalizadas há mais tempo que o TTL"""
+        limite = time.time() - self.ttl_seconds
+        with self._lock:
+            expirados = [
+                job_id for job_id, job in self._jobs.items()
+                if job.finalizado_em is not None and job.finalizado_em < limite
+            ]
+            for job_id in expirados:
+                job = self._jobs.pop(job_id)
+                if job.armazem is not None:
+                    job.armazem.remover(job.session_id, f"job_{job_id}")
@@ -0,0 +1,208 @@
+# utils/painel_diagnostico.py
+"""
+Painel de diagnóstico: tempo de cada etapa do processamento, por execução
+
+Ligado pelo botão da barra lateral (ou já ligado com HUB_DIAGNOSTICO=1).
+Cada execução da página e cada geração de PDF vira uma medição, guardada
+no session_state; o painel mostra as etapas da execução escolhida e
+exporta todas em JSON. Desligado, nenhuma etapa é medida.
+
+Com a medição de memória (HUB_DIAGNOSTICO_MEMORIA=1 ou o segundo botão),
+cada etapa mostra também o pico e a memória retida, e o painel lista os
+locais que mais alocaram, com um relatório em texto para baixar.
+"""
+
+import json
+import os
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Iterator, Optional
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import RerunException, StopException
+
+from utils import diagnostico
+
+CHAVE_ATIVO = 'diagnostico_ativo'
+CHAVE_MEMORIA = 'diagnostico_memoria'
+CHAVE_EXECUCOES = 'diagnostico_execucoes'
+
+# Execuções mantidas por sessão (as mais antigas saem primeiro)
+MAX_EXECUCOES = 20
+
+
+def diagnostico_ativo() -> bool:
+    """Se o painel de diagnóstico está ligado na sessão"""
+    if CHAVE_ATIVO not in st.session_state:
+        return os.environ.get('HUB_DIAGNOSTICO', '0') == '1'
+    return bool(st.session_state[CHAVE_ATIVO])
+
+
+def memoria_ativa() -> bool:
+    """Se o diagnóstico mede também a memória de cada etapa"""
+    if not diagnostico_ativo():
+        return False
+    if CHAVE_MEMORIA not in st.session_state:
+        return os.environ.get('HUB_DIAGNOSTICO_MEMORIA', '0') == '1'
+    return bool(st.session_state[CHAVE_MEMORIA])
+
+
+def render_botao_diagnostico():
+    """Botões da barra lateral que ligam e desligam a medição das etapas e da memória"""
+    st.toggle(
+        "🩺 Diagnóstico de desempenho",
+        value=diagnostico_ativo(),
+        key=CHAVE_ATIVO,
+        help="Mede o tempo de cada etapa do processamento e mostra no fim da página"
+    )
+    if diagnostico_ativo():
+        st.toggle(
+            "🧠 Medir memória",
+            value=memoria_ativa(),
+            key=CHAVE_MEMORIA,
+            help=(
+                "Mede o pico e a memória retida de cada etapa com o tracemalloc. "
+                "O processamento fica várias vezes mais lento, para todo o servidor enquanto durar."
+            )
+        )
+
+
+def _execucoes() -> Deque[diagnostico.Medicao]:
+    if CHAVE_EXECUCOES not in st.session_state:
+        st.session_state[CHAVE_EXECUCOES] = deque(maxlen=MAX_EXECUCOES)
+    return st.session_state[CHAVE_EXECUCOES]
+
+
+def nova_medicao(titulo: str) -> Optional[diagnostico.Medicao]:
+    """
+    Medição para uma tarefa em segundo plano (geração de PDF)
+
+    A medição entra no painel já na criação e aparece como em andamento
+    até a tarefa terminar.
+
+    Returns:
+        Medição, ou None com o diagnóstico desligado
+    """
+    if not diagnostico_ativo():
+        return None
+    medicao = diagnostico.Medicao(titulo, memoria=memoria_ativa())
+    _execucoes().append(medicao)
+    return medicao
+
+
+@contextmanager
+def medir_execucao(titulo: str) -> Iterator[Optional[diagnostico.Medicao]]:
+    """
+    Mede as etapas executadas no bloco como uma execução da página
+
+    Execuções sem nenhuma etapa medida (tudo veio do cache) não entram no painel.
+    """
+    if not diagnostico_ativo():
+        yield None
+        return
+
+    medicao = diagnostico.Medicao(titulo, memoria=memoria_ativa())
+    try:
+        with diagnostico.medindo(medicao):
+            yield medicao
+    except (RerunException, StopException):
+        # st.rerun e st.stop interrompem a página sem erro
+        medicao.erro = None
+        raise
+    finally:
+        if medicao.etapas:
+            _execucoes().append(medicao)
+
+
+def _rotulo(medicao: diagnostico.Medicao) -> str:
+    # Sem a duração: o rótulo identifica a opção escolhida e não pode mudar quando o PDF termina
+    return f"{medicao.iniciada_em:%H:%M:%S} · {medicao.titulo}" + (" · memória" if medicao.memoria else "")
+
+
+def _megabytes(memoria: Optional[dict], campo: str) -> Optional[float]:
+    return round(memoria[campo] / 1024 ** 2, 2) if memoria is not None else None
+
+
+def _render_memoria(medicao: diagnostico.Medicao, linhas_etapas: list):
+    """Locais que mais alocaram em cada etapa e relatório de memória para baixar"""
+    locais = []
+    for linha in linhas_etapas:
+        for local in (linha['memoria'] or {}).get('locais', []):
+            locais.append({
+                'Etapa': linha['nome'],
+                'MB': round(local['bytes'] / 1024 ** 2, 3),
+                'Blocos': local['blocos'],
+                'Local': local['local'],
+                'Chamado em': local['origem']
+            })
+    # Com um quadro por alocação (o padrão) a linha do hub que chamou não é conhecida
+    if not any(local['Chamado em'] for local in locais):
+        for local in locais:
+            del local['Chamado em']
+
+    st.markdown("**Locais que mais alocaram memória ainda em uso no fim de cada etapa**")
+    if locais:
+        st.dataframe(locais, use_container_width=True, hide_index=True)
+    else:
+        st.caption("Nenhuma etapa concluída com medição de memória.")
+    st.download_button(
+        "📥 Baixar relatório de memória",
+        data=medicao.relatorio_memoria(),
+        file_name="relatorio_memoria.txt",
+        mime="text/plain",
+        key='diagnostico_relatorio_memoria'
+    )
+
+
+def render_painel_diagnostico():
+    """Tabela com as etapas da execução escolhida e exportação em JSON"""
+    if not diagnostico_ativo():
+        return
+
+    execucoes = list(_execucoes())[::-1]
+    with st.expander("🩺 Diagnóstico de desempenho", expanded=bool(execucoes)):
+        if not execucoes:
+            st.caption("Nenhuma etapa medida ainda: envie uma planilha ou gere um PDF.")
+            return
+
+        # Opções por posição (a mais recente primeiro): o selectbox copia as opções
+        indice = st.selectbox(
+            "Execução",
+            range(len(execucoes)),
+            format_func=lambda i: _rotulo(execucoes[i])
+        )
+        medicao = execucoes[indice]
+        if medicao.concluida:
+            st.caption(f"Duração total: {medicao.segundos:.2f}s")
+        if medicao.erro:
+            st.error(f"A execução terminou com erro: {medicao.erro}")
+
+        total = medicao.segundos
+        linhas_etapas = medicao.linhas()
+        linhas = []
+        for linha in linhas_etapas:
+            segundos = linha['segundos']
+            tabela = {
+                'Etapa': "\u2003\u2003" * linha['nivel'] + linha['nome'],
+                'Tempo (s)': round(segundos, 4) if segundos is not None else None,
+                '% da execução': round(100 * segundos / total, 1) if segundos is not None and total else None
+            }
+            if medicao.memoria:
+                tabela['Pico (MB)'] = _megabytes(linha['memoria'], 'pico_bytes')
+                tabela['Retida (MB)'] = _megabytes(linha['memoria'], 'retida_bytes')
+            tabela['Contagens'] = " · ".join(f"{nome}: {valor:,}" for nome, valor in linha['contagens'].items())
+            linhas.append(tabela)
+        st.dataframe(linhas, use_container_width=True, hide_index=True)
+        if not medicao.concluida:
+            st.caption("⏳ Execução em andamento: as etapas abertas ainda não têm tempo.")
+
+        if medicao.memoria:
+            _render_memoria(medicao, linhas_etapas)
+
+        st.download_button(
+            "📥 Exportar execuções (JSON)",
+            data=json.dumps([execucao.como_dict() for execucao in execucoes], ensure_ascii=False, indent=2),
+            file_name="diagnostico.json",
+            mime="application/json",
+            key='diagnostico_exportar'
+        )
@@ -0,0 +1,87 @@
+# utils/previa_tabelas.py
+"""
+Módulo responsável pela pré-visualização paginada das tabelas
+
+Em vez de enviar a tabela inteira ao navegador, a pré-visualização calcula
+no servidor as posições das linhas (ordenadas e filtradas) e monta apenas a
+página exibida. As posições são arrays de inteiros: a tabela filtrada ou
+ordenada nunca é copiada.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def posicoes_ordenadas(df: pd.DataFrame, coluna: Optional[str] = None, crescente: bool = True) -> np.ndarray:
+    """
+    Posições das linhas na ordem pedida
+
+    Args:
+        df: Tabela completa
+        coluna: Coluna de ordenação; None mantém a ordem original
+        crescente: Direção da ordenação (vazios ficam sempre no fim)
+
+    Returns:
+        Array com as posições (iloc) das linhas
+    """
+    if coluna is None:
+        return np.arange(len(df))
+    valores = pd.Series(df[coluna].to_numpy())
+    return valores.sort_values(ascending=crescente, kind='stable', na_position='last').index.to_numpy()
+
+
+def linhas_com_texto(df: pd.DataFrame, texto: str) -> np.ndarray:
+    """Máscara das linhas em que alguma coluna contém o texto (sem diferenciar maiúsculas)"""
+    mascara = np.zeros(len(df), dtype=bool)
+    for coluna in df.columns:
+        # Um teste por valor distinto da coluna, não por linha
+        codigos, distintos = pd.factorize(df[coluna])
+        encontrados = pd.Series(distintos, dtype=object).astype(str).str.contains(texto, case=False, regex=False)
+        encontrados = encontrados.to_numpy(dtype=bool)
+        if encontrados.any():
+            mascara |= (codigos >= 0) & encontrados[np.maximum(codigos, 0)]
+    return mascara
+
+
+def filtrar_posicoes(posicoes: np.ndarray, mascara: Optional[np.ndarray]) -> np.ndarray:
+    """Mantém, na ordem recebida, só as posições marcadas na máscara"""
+    if mascara is None:
+        return posicoes
+    return posicoes[mascara[posicoes]]
+
+
+def pagina_da_tabela(df: pd.DataFrame, posicoes: np.ndarray, pagina: int, linhas_por_pagina: int) -> pd.DataFrame:
+    """Linhas da página (começando em 1), com o índice original da tabela"""
+    inicio = (pagina - 1) * linhas_por_pagina
+    return df.iloc[posicoes[inicio:inicio + linhas_por_pagina]]
+
+
+def pagina_das_linhas(
+    linhas: Iterable[Dict],
+    colunas: List[str],
+    pagina: int,
+    linhas_por_pagina: int,
+    texto: str = ""
+) -> Tuple[pd.DataFrame, int]:
+    """
+    Página de uma tabela percorrida linha a linha (TabelaOrdenada)
+
+    Só as linhas da página ficam em memória; as demais são apenas contadas.
+
+    Returns:
+        Tupla (página, total de linhas que passam no filtro)
+    """
+    texto = texto.casefold()
+    inicio = (pagina - 1) * linhas_por_pagina
+    fim = inicio + linhas_por_pagina
+    selecionadas = []
+    total = 0
+    for linha in linhas:
+        if texto and not any(texto in str(valor).casefold() for valor in linha.values()):
+            continue
+        if inicio <= total < fim:
+            selecionadas.append(linha)
+        total += 1
+    return pd.DataFrame(selecionadas, columns=colunas), total
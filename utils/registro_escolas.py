@@ -0,0 +1,185 @@
+# utils/registro_escolas.py
+"""
+Módulo responsável pelo cadastro de escolas usado para unificar os nomes
+
+O cadastro é lido de um arquivo CSV local (variável HUB_REGISTRO_ESCOLAS)
+com o código INEP e o nome oficial de cada escola. Os nomes recebidos nas
+planilhas são resolvidos para o nome oficial pelo código INEP, pelo nome
+normalizado ou por semelhança de trigramas de caracteres.
+"""
+
+import os
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from modules.normalizacao import PADRAO_INEP, limpar_nome_escola_simples
+
+CODIGO_INEP = re.compile(r"\(INEP:\s*(\d+)\)")
+NAO_ALFANUMERICO = re.compile(r"[^0-9A-Z]+")
+
+
+def normalizar_para_busca(nome: str) -> str:
+    """
+    Chave de comparação do nome: sem código INEP, sem sigla inicial,
+    sem acentos, em maiúsculas e só com letras, números e espaços
+    """
+    nome = PADRAO_INEP.sub("", str(nome))
+    nome = limpar_nome_escola_simples(nome)
+    nome = unicodedata.normalize('NFKD', nome).encode('ascii', 'ignore').decode('ascii')
+    return NAO_ALFANUMERICO.sub(' ', nome.upper()).strip()
+
+
+def trigramas(chave: str) -> List[str]:
+    """Trigramas distintos da chave, com espaços nas bordas"""
+    texto = f"  {chave} "
+    return list({texto[i:i + 3] for i in range(len(texto) - 2)})
+
+
+class RegistroEscolas:
+    """Cadastro de escolas indexado por código INEP e por trigramas do nome"""
+
+    # Semelhança mínima (coeficiente de Dice dos trigramas) para aceitar um nome parecido
+    SEMELHANCA_MINIMA = 0.85
+
+    # Nomes já resolvidos guardados em memória
+    MAX_MEMO = 100000
+
+    def __init__(self, escolas: Optional[List[Dict[str, str]]] = None):
+        """
+        Args:
+            escolas: Lista de {'inep': código, 'nome': nome oficial}
+        """
+        self.nomes: List[str] = []
+        self.por_inep: Dict[str, int] = {}
+        self.por_chave: Dict[str, int] = {}
+        self._trigramas: List[int] = []
+        self._indice: Dict[str, List[int]] = {}
+        self._vetores: Optional[Tuple[Dict[str, np.ndarray], np.ndarray]] = None
+        self._memo: Dict[str, str] = {}
+
+        for escola in escolas or []:
+            self._adicionar(escola.get('inep'), escola['nome'])
+
+    @classmethod
+    def from_csv(cls, caminho: str) -> "RegistroEscolas":
+        """
+        Carrega o cadastro de um CSV
+
+        A coluna do código é a que contém "INEP" ou "CODIGO" no nome e a do
+        nome oficial é a que contém "ESCOLA" ou "NOME".
+        """
+        df = pd.read_csv(caminho, dtype=str, sep=None, engine='python')
+        colunas = {normalizar_para_busca(coluna): coluna for coluna in df.columns}
+        coluna_inep = next((original for chave, original in colunas.items() if 'INEP' in chave or 'CODIGO' in chave), None)
+        coluna_nome = next((original for chave, original in colunas.items() if 'ESCOLA' in chave or 'NOME' in chave), None)
+        if coluna_nome is None:
+            raise ValueError(f"Coluna com o nome da escola não encontrada em {caminho}")
+
+        inep = df[coluna_inep] if coluna_inep is not None else pd.Series([None] * len(df))
+        escolas = [
+            {'inep': codigo, 'nome': nome}
+            for codigo, nome in zip(inep, df[coluna_nome])
+            if isinstance(nome, str) and nome.strip()
+        ]
+        return cls(escolas)
+
+    def __len__(self) -> int:
+        return len(self.nomes)
+
+    def _adicionar(self, inep: Optional[str], nome: str):
+        indice = len(self.nomes)
+        nome = nome.strip()
+        self.nomes.append(nome)
+        if isinstance(inep, str) and inep.strip():
+            self.por_inep.setdefault(inep.strip(), indice)
+
+        chave = normalizar_para_busca(nome)
+        self.por_chave.setdefault(chave, indice)
+        grams = trigramas(chave)
+        self._trigramas.append(len(grams))
+        for gram in grams:
+            self._indice.setdefault(gram, []).append(indice)
+        self._vetores = None
+
+    def _indice_vetorizado(self) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """Listas do índice como arrays e quantidade de trigramas por escola, montados na primeira busca"""
+        if self._vetores is None:
+            listas = {gram: np.array(lista, dtype=np.int32) for gram, lista in self._indice.items()}
+            self._vetores = (listas, np.array(self._trigramas, dtype=np.float64))
+        return self._vetores
+
+    def _mais_parecida(self, chave: str) -> Optional[int]:
+        """Escola com maior semelhança de trigramas, se passar do limite e não houver empate"""
+        listas, tamanhos = self._indice_vetorizado()
+        grams = trigramas(chave)
+        encontradas = [listas[gram] for gram in grams if gram in listas]
+        if not encontradas:
+            return None
+
+        # Trigramas em comum com cada escola do cadastro, contados de uma vez sobre o índice invertido
+        comuns = np.bincount(np.concatenate(encontradas), minlength=len(self.nomes))
+        semelhanca = 2 * comuns / (len(grams) + tamanhos)
+        melhor = int(np.argmax(semelhanca))
+        if semelhanca[melhor] < self.SEMELHANCA_MINIMA or np.count_nonzero(semelhanca == semelhanca[melhor]) > 1:
+            return None
+        return melhor
+
+    def resolver(self, nome):
+        """
+        Nome oficial da escola, ou o próprio nome se não houver correspondência
+
+        Args:
+            nome: Nome como veio na planilha (pode conter o código INEP)
+
+        Returns:
+            Nome oficial do cadastro ou o nome recebido
+        """
+        if not self.nomes or not isinstance(nome, str):
+            return nome
+        if nome in self._memo:
+            return self._memo[nome]
+
+        indice = None
+        codigo = CODIGO_INEP.search(nome)
+        if codigo is not None:
+            indice = self.por_inep.get(codigo.group(1))
+        if indice is None:
+            chave = normalizar_para_busca(nome)
+            indice = self.por_chave.get(chave)
+            if indice is None and chave:
+                indice = self._mais_parecida(chave)
+
+        resolvido = self.nomes[indice] if indice is not None else nome
+        if len(self._memo) >= self.MAX_MEMO:
+            self._memo.clear()
+        self._memo[nome] = resolvido
+        return resolvido
+
+    def resolver_serie(self, serie: pd.Series) -> pd.Series:
+        """Aplica resolver à coluna, uma vez por valor distinto"""
+        if not self.nomes:
+            return serie
+        codigos, distintos = pd.factorize(serie)
+        if len(distintos) == 0:
+            return serie.copy()
+        resolvidos = np.array([self.resolver(nome) for nome in distintos], dtype=object)
+        valores = np.where(codigos >= 0, resolvidos[codigos], serie.to_numpy(dtype=object))
+        return pd.Series(valores, index=serie.index, name=serie.name)
+
+
+@lru_cache(maxsize=1)
+def get_registro() -> RegistroEscolas:
+    """
+    Cadastro definido em HUB_REGISTRO_ESCOLAS, carregado uma vez por processo
+
+    Sem o arquivo, o cadastro fica vazio e os nomes não são alterados.
+    """
+    caminho = os.environ.get('HUB_REGISTRO_ESCOLAS')
+    if not caminho or not os.path.exists(caminho):
+        return RegistroEscolas()
+    return RegistroEscolas.from_csv(caminho)
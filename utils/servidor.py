@@ -0,0 +1,125 @@
+# utils/servidor.py
+"""
+Recursos do servidor compartilhados por todas as sessões
+
+Este módulo é importado pela tela inicial, então só depende de bibliotecas
+leves: pandas, ReportLab e openpyxl são carregados pelas páginas quando
+abertas pela primeira vez.
+"""
+
+import importlib
+import threading
+import time
+from concurrent.futures import wait
+from typing import Dict, Optional, Tuple
+
+import streamlit as st
+from streamlit.logger import get_logger
+
+from utils.aquecimento import aquecer_processo, aquecimento_ativo, inicializar_processo_do_pool
+from utils.armazem_sessao import ArmazemSessoes
+from utils.job_manager import JobManager
+from utils.worker_pool import WorkerPool
+
+logger = get_logger(__name__)
+
+# Segundos gastos em cada etapa de inicialização deste processo (app.py e importação das páginas)
+_tempos_inicializacao: Dict[str, float] = {}
+_lock_tempos = threading.Lock()
+
+
+@st.cache_resource
+def get_worker_pool() -> WorkerPool:
+    """Pool de processos compartilhado por todas as sessões do servidor"""
+    return WorkerPool.from_env(inicializador=inicializar_processo_do_pool)
+
+
+@st.cache_resource
+def get_armazem() -> ArmazemSessoes:
+    """Tabelas e PDFs das sessões, com orçamento de memória compartilhado pelo servidor"""
+    return ArmazemSessoes.from_env()
+
+
+@st.cache_resource
+def get_job_manager() -> JobManager:
+    """Fila de tarefas compartilhada por todas as sessões do servidor"""
+    pool = get_worker_pool()
+    # As threads apenas aguardam o pool, então há uma para cada vaga admitida
+    # Os PDFs prontos vão para o armazém das sessões
+    return JobManager(max_workers=pool.max_workers + pool.max_queue, armazem=get_armazem())
+
+
+def registrar_tempo_inicializacao(etapa: str, segundos: float):
+    """
+    Guarda e registra no log o tempo de uma etapa de inicialização
+
+    Só a primeira medição de cada etapa é mantida, já que as seguintes
+    encontram os módulos já carregados.
+    """
+    with _lock_tempos:
+        if etapa in _tempos_inicializacao:
+            return
+        _tempos_inicializacao[etapa] = segundos
+    logger.info("Inicialização: %s em %.3f s", etapa, segundos)
+
+
+def tempos_inicializacao() -> Dict[str, float]:
+    """Tempos de inicialização medidos neste processo"""
+    with _lock_tempos:
+        return dict(_tempos_inicializacao)
+
+
+def _aquecer(pool: WorkerPool, paginas: Tuple[str, ...]):
+    inicio = time.perf_counter()
+    processos = pool.iniciar_processos()
+    try:
+        aquecer_processo()
+    except Exception:
+        logger.exception("Falha no aquecimento do processo do servidor; seguindo sem aquecer")
+    for pagina in paginas:
+        importlib.import_module(pagina)
+    wait(processos)
+    registrar_tempo_inicializacao("aquecimento", time.perf_counter() - inicio)
+
+
+@st.cache_resource
+def aquecer_servidor(paginas: Tuple[str, ...]) -> Optional[threading.Thread]:
+    """
+    Aquece o servidor uma vez por processo, em segundo plano
+
+    Cria e aquece os processos do pool, aquece este processo (ReportLab,
+    leitores de planilha, regras de limpeza) e importa as páginas, para que
+    o primeiro usuário já encontre tudo carregado. A tela inicial não espera.
+
+    Args:
+        paginas: Módulos das páginas a importar
+    """
+    if not aquecimento_ativo():
+        return None
+    thread = threading.Thread(target=_aquecer, args=(get_worker_pool(), paginas), name='aquecimento', daemon=True)
+    thread.start()
+    return thread
+
+
+def render_server_status():
+    """Renderiza a ocupação do pool de processos compartilhado e da memória das sessões"""
+    stats = get_worker_pool().stats()
+    armazem = get_armazem().stats()
+    with st.expander("⚙️ Status do servidor"):
+        st.caption(
+            f"Processando: **{stats['ativos']}/{stats['max_workers']}** · "
+            f"Na fila: **{stats['fila']}/{stats['max_fila']}**"
+        )
+        st.caption(
+            f"Espera média: {stats['espera_media_s']:.1f}s · "
+            f"máxima: {stats['espera_max_s']:.1f}s · "
+            f"recusadas: {stats['recusadas']}"
+        )
+        st.caption(
+            f"Sessões: **{armazem['sessoes']}** · "
+            f"memória: {armazem['memoria_bytes'] / 1024 ** 2:,.1f}/{armazem['limite_total_bytes'] / 1024 ** 2:,.0f} MB · "
+            f"em disco: {armazem['disco_bytes'] / 1024 ** 2:,.1f} MB"
+        )
+        tempos = tempos_inicializacao()
+        if tempos:
+            st.caption("Inicialização: " + " · ".join(f"{etapa} {segundos:.2f}s" for etapa, segundos in tempos.items()))
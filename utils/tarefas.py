@@ -0,0 +1,311 @@
+# utils/tarefas.py
+"""
+Tarefas pesadas executadas no pool de processos
+
+As funções deste módulo são de nível de módulo para poderem ser
+serializadas e enviadas aos processos do WorkerPool.
+"""
+
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from io import BytesIO
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from modules.processamento_em_lotes import LIMITE_EM_LOTES_BYTES, processar_csv_em_lotes
+from modules.transformacoes import (
+    completar_colunas_adaptadas,
+    detectar_colunas_nao_adaptadas,
+    juntar_tabelas_adaptadas,
+    montar_tabela_adaptadas,
+    montar_tabela_nao_adaptadas,
+    transformar_tabela_adaptadas
+)
+from utils import diagnostico
+from utils.data_processor import OlimpiadasProcessor
+from utils.file_handler import FileHandler
+from utils.worker_pool import QueueFullError, TaskTooLargeError, Ticket, WorkerPool, verificar_total_etiquetas
+
+# Extensões aceitas por operação (as mesmas dos uploads das páginas)
+EXTENSOES = {
+    'unir-abas': ('.xlsx', '.xls'),
+    'adaptadas': ('.csv', '.xlsx'),
+    'nao-adaptadas': ('.csv',)
+}
+
+
+def processar_olimpiadas(conteudo: bytes) -> Tuple[pd.DataFrame, pd.DataFrame, List[str]]:
+    """
+    Lê e processa uma planilha de olimpíadas
+
+    Args:
+        conteudo: Bytes do arquivo Excel
+
+    Returns:
+        Tuple com (olimpiadas_pivot, paralimpiadas_long, anos_ordenados)
+    """
+    workbook_data = FileHandler.read_excel(BytesIO(conteudo))
+    return OlimpiadasProcessor().process_workbook(workbook_data)
+
+
+def processar_aba_adaptadas(
+    conteudo: bytes,
+    aba: str,
+    mapeamento: Dict[str, str]
+) -> Tuple[pd.DataFrame, int, float]:
+    """
+    Lê uma aba da planilha das provas adaptadas e monta a tabela das etiquetas
+
+    Args:
+        conteudo: Bytes do arquivo Excel
+        aba: Nome da aba
+        mapeamento: Colunas (em maiúsculas) e seus nomes padronizados,
+            detectados uma vez para cada cabeçalho distinto
+
+    Returns:
+        Tuple com (tabela transformada, linhas lidas, segundos gastos)
+    """
+    inicio = time.perf_counter()
+    df = pd.read_excel(BytesIO(conteudo), sheet_name=aba)
+    df.columns = [str(coluna).upper().strip() for coluna in df.columns]
+    tabela = transformar_tabela_adaptadas(completar_colunas_adaptadas(df.rename(columns=mapeamento)))
+    return tabela, len(df), time.perf_counter() - inicio
+
+
+def processar_abas_no_pool(
+    pool: WorkerPool,
+    conteudo: bytes,
+    abas: List[Tuple[str, Dict[str, str]]]
+) -> List[Tuple[Optional[Tuple[pd.DataFrame, int, float]], Optional[Exception]]]:
+    """
+    Processa as abas em paralelo no pool de processos, uma tarefa por aba
+
+    No máximo pool.max_workers abas ficam em andamento por vez, para que uma
+    planilha com muitas abas não ocupe a fila do servidor inteira. Se a fila
+    do servidor está cheia, a aba espera uma das suas terminar; sem nenhuma
+    em andamento, a recusa vira o erro da aba, como um arquivo grande demais.
+
+    Args:
+        pool: Pool de processos
+        conteudo: Bytes do arquivo Excel
+        abas: Lista de (nome da aba, mapeamento das colunas)
+
+    Returns:
+        Lista, na ordem das abas, com (resultado de processar_aba_adaptadas, None)
+        ou (None, exceção) para as abas que falharam
+    """
+    resultados: List = [None] * len(abas)
+    pendentes: Dict[Future, Tuple[int, Ticket]] = {}
+    proximas = deque(range(len(abas)))
+
+    def enviar_proximas():
+        """Envia abas até ter pool.max_workers em andamento"""
+        while proximas and len(pendentes) < pool.max_workers:
+            indice = proximas[0]
+            aba, mapeamento = abas[indice]
+            try:
+                ticket = pool.submit(processar_aba_adaptadas, conteudo, aba, mapeamento, tamanho_bytes=len(conteudo))
+            except QueueFullError as e:
+                if pendentes:
+                    # Fila cheia com outras abas em andamento: tenta de novo quando uma terminar
+                    return
+                resultados[indice] = (None, e)
+            except TaskTooLargeError as e:
+                resultados[indice] = (None, e)
+            else:
+                pendentes[ticket.future] = (indice, ticket)
+            proximas.popleft()
+
+    try:
+        enviar_proximas()
+        while pendentes:
+            concluidas, _ = wait(list(pendentes), return_when=FIRST_COMPLETED)
+            for future in concluidas:
+                indice, _ = pendentes.pop(future)
+                erro = future.exception()
+                resultados[indice] = (None, erro) if erro is not None else (future.result(), None)
+            enviar_proximas()
+    finally:
+        # Execução interrompida (erro, st.stop, rerun): as abas que faltam não ocupam o pool
+        for _, ticket in pendentes.values():
+            pool.cancel(ticket)
+
+    return resultados
+
+
+def gerar_pdf_no_pool(
+    pool: WorkerPool,
+    gerar: Callable,
+    tabela: pd.DataFrame,
+    logo: BytesIO,
+    championship: str,
+    stage: str,
+    compacto: bool = False,
+    progresso: Optional[Callable] = None,
+    medicao: Optional[diagnostico.Medicao] = None,
+    campos: Optional[List[str]] = None,
+    resumo: Optional[Dict] = None
+) -> bytes:
+    """
+    Executa gerar_etiquetas no pool de processos e aguarda o PDF
+
+    Feita para rodar numa thread do JobManager: o progresso do processo filho
+    e a posição na fila são repassados para o callback `progresso`. Com
+    `medicao`, as etapas da geração são medidas nela (painel de diagnóstico).
+
+    Com `campos` e `resumo` (os detalhes da tarefa), as etiquetas distintas
+    são contadas depois do PDF e guardadas em resumo['etiquetas_distintas']:
+    numa TabelaOrdenada a contagem é uma passada pelos arquivos em disco, que
+    aqui não atrasa o script da página.
+    """
+    # Importado aqui: a leitura de planilhas não precisa do ReportLab
+    from modules.layout_etiquetas import contar_etiquetas_distintas
+
+    def ao_aguardar(posicao: int):
+        if progresso is not None:
+            progresso(0, 0, posicao)
+
+    with diagnostico.medindo(medicao):
+        pdf = diagnostico.run_blocking(
+            pool,
+            gerar,
+            tabela,
+            logo,
+            championship,
+            stage,
+            progresso=progresso,
+            ao_aguardar=ao_aguardar,
+            total_etiquetas=len(tabela),
+            compacto=compacto
+        )
+        if campos is not None and resumo is not None:
+            with diagnostico.etapa('contar etiquetas distintas', etiquetas=len(tabela)):
+                resumo['etiquetas_distintas'] = contar_etiquetas_distintas(tabela, campos)
+    return pdf
+
+
+def ler_tabela_adaptadas(
+    arquivo: BinaryIO,
+    nome: str,
+    todas_abas: bool = False
+) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+    """
+    Tabela das etiquetas adaptadas de um arquivo CSV ou Excel (uma aba ou todas)
+
+    Returns:
+        Tuple com (DataFrame transformado, mensagem de erro ou None)
+    """
+    if nome.lower().endswith('.csv'):
+        return montar_tabela_adaptadas(pd.read_csv(arquivo))
+    if not todas_abas:
+        return montar_tabela_adaptadas(pd.read_excel(arquivo))
+
+    # Abas sem coluna de escola são ignoradas, como na página
+    tabelas = []
+    for df in pd.read_excel(arquivo, sheet_name=None).values():
+        tabela, erro = montar_tabela_adaptadas(df)
+        if erro is None:
+            tabelas.append(tabela)
+    if not tabelas:
+        return None, "Nenhuma aba com coluna de escola encontrada!"
+    return juntar_tabelas_adaptadas(tabelas), None
+
+
+def ler_tabela_nao_adaptadas(arquivo: BinaryIO):
+    """
+    Tabela das etiquetas não adaptadas de um CSV
+
+    Arquivos maiores que HUB_CSV_EM_LOTES_MB são processados em lotes, com
+    ordenação em disco, como na página.
+
+    Returns:
+        Tuple com (DataFrame ou TabelaOrdenada, mensagem de erro ou None)
+    """
+    mapeamento, erro = detectar_colunas_nao_adaptadas(pd.DataFrame(columns=FileHandler.read_csv_header(arquivo)))
+    if erro:
+        return None, erro
+    colunas_anos = [coluna for coluna in mapeamento.values() if coluna != 'NOME ESCOLA']
+    if not colunas_anos:
+        return None, "Nenhuma coluna de alunos foi detectada!"
+
+    if arquivo.seek(0, 2) > LIMITE_EM_LOTES_BYTES:
+        return processar_csv_em_lotes(arquivo, mapeamento), None
+
+    df = FileHandler.read_csv_columns(
+        arquivo,
+        usecols=list(mapeamento),
+        dtype={coluna: str for coluna in mapeamento}
+    )
+    df_final = df.rename(columns=mapeamento)[list(mapeamento.values())].copy()
+    return montar_tabela_nao_adaptadas(df_final, colunas_anos), None
+
+
+def gerar_arquivos_unir_abas(conteudo: bytes) -> Dict[str, bytes]:
+    """Planilhas de Olimpíadas e Paralimpíadas (Excel) de uma planilha com uma aba por escola"""
+    olimpiadas_df, paralimpiadas_df, _ = processar_olimpiadas(conteudo)
+    return {
+        'olimpiadas.xlsx': FileHandler.to_excel(olimpiadas_df),
+        'paralimpiadas.xlsx': FileHandler.to_excel(paralimpiadas_df)
+    }
+
+
+def gerar_arquivos_etiquetas(
+    operacao: str,
+    conteudo: bytes,
+    nome: str,
+    logo: Optional[bytes] = None,
+    championship: str = "",
+    stage: str = "",
+    compacto: bool = False,
+    todas_abas: bool = False,
+    max_etiquetas: Optional[int] = None,
+    progresso: Optional[Callable] = None
+) -> Tuple[Dict[str, bytes], int]:
+    """
+    Planilha tratada (CSV) e, com a logo, o PDF das etiquetas de um arquivo
+
+    Args:
+        operacao: 'adaptadas' ou 'nao-adaptadas'
+        conteudo: Bytes do arquivo enviado
+        nome: Nome do arquivo (a extensão define o leitor)
+        logo: Bytes da logo; sem ela o PDF não é gerado
+        championship: Nome do campeonato
+        stage: Etapa
+        compacto: Se True, gera o PDF no modo compacto
+        todas_abas: Provas adaptadas: junta todas as abas do Excel
+        max_etiquetas: Limite de etiquetas do PDF (HUB_MAX_ETIQUETAS), conferido
+            depois da leitura, já que o total só é conhecido com a tabela pronta
+        progresso: Callback (etiquetas, paginas) repassado à geração do PDF
+
+    Returns:
+        Tuple com ({nome do artefato: bytes}, quantidade de etiquetas)
+
+    Raises:
+        ValueError: Se a planilha não tem as colunas esperadas ou não tem dados
+        TaskTooLargeError: Se o PDF teria mais etiquetas que max_etiquetas
+    """
+    # Importados aqui: a leitura de planilhas não precisa do ReportLab
+    from modules import criacao_adaptadas, criacao_nao_adaptadas
+
+    if operacao == 'adaptadas':
+        tabela, erro = ler_tabela_adaptadas(BytesIO(conteudo), nome, todas_abas)
+        modulo = criacao_adaptadas
+    else:
+        tabela, erro = ler_tabela_nao_adaptadas(BytesIO(conteudo))
+        modulo = criacao_nao_adaptadas
+    if erro:
+        raise ValueError(erro)
+    if len(tabela) == 0:
+        raise ValueError("Não há dados válidos na planilha!")
+    if logo is not None and max_etiquetas is not None:
+        verificar_total_etiquetas(len(tabela), max_etiquetas)
+
+    csv = tabela.to_csv(index=False).encode('utf-8') if isinstance(tabela, pd.DataFrame) else tabela.to_csv_bytes()
+    artefatos = {'etiquetas.csv': csv}
+    if logo is not None:
+        artefatos['etiquetas.pdf'] = modulo.gerar_etiquetas(
+            tabela, BytesIO(logo), championship, stage, progresso=progresso, compacto=compacto
+        )
+    return artefatos, len(tabela)
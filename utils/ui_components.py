@@ -3,10 +3,160 @@
 Componentes de interface do usuário para Streamlit
 """
 
+import hashlib
+import numpy as np
 import streamlit as st
 import pandas as pd
-from typing import List
+from io import BytesIO
+from typing import Any, Callable, List, Optional, Tuple
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from utils.file_handler import FileHandler
+from utils.historico_olimpiadas import HistoricoOlimpiadas
+from utils.job_manager import Job
+from utils.painel_diagnostico import nova_medicao
+from utils.previa_tabelas import filtrar_posicoes, linhas_com_texto, pagina_da_tabela, pagina_das_linhas, posicoes_ordenadas
+from utils.servidor import get_armazem, get_job_manager, get_worker_pool
+from utils.tarefas import gerar_pdf_no_pool
+
+
+def get_session_id() -> Optional[str]:
+    """Identificador da sessão atual do Streamlit"""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+
+def guardar_na_sessao(nome: str, valor: Any):
+    """
+    Guarda uma tabela ou arquivo grande da sessão no armazém do servidor
+
+    Fora do session_state, o valor conta no orçamento de memória da sessão,
+    pode ir para o disco quando não é usado e é descartado com a sessão ociosa.
+    """
+    get_armazem().guardar(get_session_id() or "", nome, valor)
+
+
+def obter_da_sessao(nome: str, padrao: Any = None) -> Any:
+    """Valor guardado com guardar_na_sessao, ou `padrao` se não existe ou a sessão expirou"""
+    return get_armazem().obter(get_session_id() or "", nome, padrao)
+
+
+@st.cache_resource
+def get_historico() -> HistoricoOlimpiadas:
+    """Histórico das campanhas de olimpíadas, compartilhado por todas as sessões"""
+    return HistoricoOlimpiadas()
+
+
+def get_file_hash(uploaded_file) -> str:
+    """
+    Hash SHA-1 do conteúdo do arquivo enviado
+
+    Calculado uma vez por upload (file_id) e guardado na sessão, para servir
+    de chave dos caches de processamento nos reruns seguintes.
+    """
+    hashes = st.session_state.setdefault('hash_uploads', {})
+    if uploaded_file.file_id not in hashes:
+        hashes.clear()
+        hashes[uploaded_file.file_id] = hashlib.sha1(uploaded_file.getvalue()).hexdigest()
+    return hashes[uploaded_file.file_id]
+
+
+# Linhas enviadas ao navegador por página da pré-visualização
+LINHAS_POR_PAGINA = 100
+
+
+# A tabela não entra no hash do cache: a chave identifica o conteúdo
+@st.cache_data(max_entries=32)
+def _posicoes_previa(_df: pd.DataFrame, chave: str, coluna: Optional[str], crescente: bool, texto: str) -> np.ndarray:
+    posicoes = posicoes_ordenadas(_df, coluna, crescente)
+    return filtrar_posicoes(posicoes, linhas_com_texto(_df, texto) if texto else None)
+
+
+@st.cache_data(max_entries=32)
+def _pagina_tabela_em_disco(_tabela, chave: str, pagina: int, linhas_por_pagina: int, texto: str) -> Tuple[pd.DataFrame, int]:
+    if not texto:
+        # Sem filtro, o índice da tabela leva direto ao começo da página
+        return _tabela.pagina((pagina - 1) * linhas_por_pagina, linhas_por_pagina), len(_tabela)
+    return pagina_das_linhas(_tabela, _tabela.columns, pagina, linhas_por_pagina, texto)
+
+
+def render_previa_paginada(
+    tabela,
+    chave: str,
+    linhas_por_pagina: int = LINHAS_POR_PAGINA,
+    altura: int = 400,
+    hide_index: bool = True
+):
+    """
+    Pré-visualização paginada: só a página exibida é enviada ao navegador
+
+    Filtro, ordenação e paginação são feitos no servidor sobre a tabela em
+    cache, e só reexecutam este trecho da página.
+
+    Args:
+        tabela: DataFrame, ou TabelaOrdenada (filtro e paginação, sem ordenação)
+        chave: Identifica o conteúdo da tabela (caches e widgets)
+        linhas_por_pagina: Linhas por página
+        altura: Altura da tabela em pixels
+        hide_index: Se True, esconde o índice do DataFrame
+    """
+    st.fragment(_render_previa_paginada)(tabela, chave, linhas_por_pagina, altura, hide_index)
+
+
+def _render_previa_paginada(tabela, chave: str, linhas_por_pagina: int, altura: int, hide_index: bool):
+    em_memoria = isinstance(tabela, pd.DataFrame)
+    col1, col2, col3 = st.columns([3, 2, 1])
+    with col1:
+        texto = st.text_input(
+            "🔎 Filtrar",
+            key=f"previa_filtro_{chave}",
+            placeholder="Parte do nome da escola, ano, categoria..."
+        ).strip()
+    if em_memoria:
+        with col2:
+            coluna = st.selectbox(
+                "Ordenar por",
+                [None, *tabela.columns],
+                format_func=lambda coluna: "Ordem original" if coluna is None else str(coluna),
+                key=f"previa_ordem_{chave}"
+            )
+        with col3:
+            decrescente = st.checkbox("Decrescente", key=f"previa_decrescente_{chave}", disabled=coluna is None)
+        posicoes = _posicoes_previa(tabela, chave, coluna, not decrescente, texto)
+        total = len(posicoes)
+    else:
+        total = None
+
+    # A quantidade de páginas muda com o filtro: a página atual não pode passar da última
+    chave_pagina = f"previa_pagina_{chave}"
+    if total is not None:
+        paginas = max(1, -(-total // linhas_por_pagina))
+        if st.session_state.get(chave_pagina, 1) > paginas:
+            st.session_state[chave_pagina] = paginas
+    pagina = st.session_state.get(chave_pagina, 1)
+
+    if em_memoria:
+        df_pagina = pagina_da_tabela(tabela, posicoes, pagina, linhas_por_pagina)
+    else:
+        df_pagina, total = _pagina_tabela_em_disco(tabela, chave, pagina, linhas_por_pagina, texto)
+        paginas = max(1, -(-total // linhas_por_pagina))
+        if pagina > paginas:
+            st.session_state[chave_pagina] = pagina = paginas
+            df_pagina, total = _pagina_tabela_em_disco(tabela, chave, pagina, linhas_por_pagina, texto)
+
+    st.dataframe(df_pagina, use_container_width=True, height=altura, hide_index=hide_index)
+
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        inicio = (pagina - 1) * linhas_por_pagina
+        if total:
+            resumo = f"Linhas {inicio + 1}–{inicio + len(df_pagina)} de {total}"
+        else:
+            resumo = "Nenhuma linha encontrada"
+        if texto:
+            resumo += f" (filtradas de {len(tabela)})"
+        st.caption(resumo)
+    with col2:
+        st.number_input("Página", min_value=1, max_value=paginas, step=1, key=chave_pagina)
 
 
 def render_header():
@@ -40,7 +190,8 @@ def render_results_section(
     olimpiadas_df: pd.DataFrame,
     paralimpiadas_df: pd.DataFrame,
     anos_ordenados: List[str],
-    file_handler: FileHandler
+    file_handler: FileHandler,
+    chave: str = "resultados"
 ):
     """Renderiza a seção de resultados"""
     st.markdown("---")
@@ -78,11 +229,7 @@ def render_results_section(
     
     # Preview
     with st.expander("👁️ Visualizar dados", expanded=True):
-        st.dataframe(
-            olimpiadas_df,
-            use_container_width=True,
-            height=400
-        )
+        render_previa_paginada(olimpiadas_df, f"{chave}:olimpiadas", hide_index=False)
     
     # Botões de download
     col1, col2 = st.columns(2)
@@ -126,11 +273,7 @@ def render_results_section(
     
     # Preview
     with st.expander("👁️ Visualizar dados", expanded=True):
-        st.dataframe(
-            paralimpiadas_df,
-            use_container_width=True,
-            height=400
-        )
+        render_previa_paginada(paralimpiadas_df, f"{chave}:paralimpiadas", hide_index=False)
     
     # Botões de download
     col1, col2 = st.columns(2)
@@ -238,4 +381,135 @@ def render_instructions():
             'Ano': ['5°', '3°', '1°'],
             'Quantidade': [10, 5, 3]
         })
-        st.dataframe(exemplo_paralimpiadas, use_container_width=True, hide_index=True)
\ No newline at end of file
+        st.dataframe(exemplo_paralimpiadas, use_container_width=True, hide_index=True)
+
+
+def render_pdf_job(
+    chave: str,
+    gerar: Callable,
+    tabela: pd.DataFrame,
+    logo_file,
+    championship: str,
+    stage: str,
+    file_name: str,
+    campos: List[str],
+    compacto: bool = False
+):
+    """
+    Gera o PDF de etiquetas em segundo plano e acompanha o progresso
+
+    O identificador da tarefa fica no session_state, então a geração
+    continua mesmo após um rerun ou troca de página.
+
+    Args:
+        chave: Chave única da tarefa no session_state
+        gerar: Função gerar_etiquetas do tipo de prova
+        tabela: DataFrame (ou TabelaOrdenada) com os dados das etiquetas
+        logo_file: Arquivo da logo enviado pelo usuário
+        championship: Nome do campeonato
+        stage: Etapa
+        file_name: Nome do arquivo PDF para download
+        campos: Campos que definem o conteúdo de uma etiqueta
+        compacto: Se True, gera o PDF no modo compacto (arquivo menor)
+    """
+    manager = get_job_manager()
+    state_key = f"job_{chave}"
+
+    if st.button("🏷️ Gerar PDF de Etiquetas", key=f"gerar_{chave}"):
+        job_atual = manager.get(st.session_state.get(state_key, ""))
+        if job_atual is not None and not job_atual.finalizado:
+            manager.cancel(job_atual.id)
+
+        # As etiquetas distintas são contadas na tarefa e aparecem nestes detalhes ao concluir
+        detalhes = {'compacto': compacto}
+        st.session_state[state_key] = manager.submit(
+            gerar_pdf_no_pool,
+            get_worker_pool(),
+            gerar,
+            tabela.copy() if isinstance(tabela, pd.DataFrame) else tabela,
+            BytesIO(logo_file.getvalue()),
+            championship,
+            stage,
+            compacto=compacto,
+            medicao=nova_medicao(f"PDF {file_name}"),
+            campos=campos,
+            resumo=detalhes,
+            session_id=get_session_id(),
+            descricao=file_name,
+            total_etiquetas=len(tabela),
+            detalhes=detalhes
+        )
+
+    job_id = st.session_state.get(state_key)
+    if job_id is None:
+        return
+
+    job = manager.get(job_id)
+    if job is None:
+        st.info("⌛ O PDF gerado anteriormente expirou. Gere novamente se precisar.")
+        del st.session_state[state_key]
+        return
+
+    # Enquanto a tarefa roda, apenas este trecho é reexecutado periodicamente
+    run_every = None if job.finalizado else 1
+    st.fragment(_render_pdf_job_status, run_every=run_every)(job_id, file_name)
+
+
+def _render_pdf_job_status(job_id: str, file_name: str):
+    """Mostra progresso, cancelamento ou download de uma tarefa de PDF"""
+    manager = get_job_manager()
+    job = manager.get(job_id)
+    if job is None:
+        return
+
+    if not job.finalizado and job.posicao_fila:
+        st.info(f"⏳ Aguardando na fila do servidor: posição {job.posicao_fila}")
+        if not job.cancelamento_solicitado and st.button("✖️ Cancelar geração", key=f"cancelar_{job_id}"):
+            manager.cancel(job_id)
+        st.session_state[f"job_visto_{job_id}"] = True
+        return
+
+    if not job.finalizado:
+        st.progress(
+            job.progresso,
+            text=(
+                f"⏳ {job.etiquetas_feitas}/{job.total_etiquetas} etiquetas · "
+                f"{job.paginas_feitas}/{job.total_paginas} páginas"
+            )
+        )
+        if job.cancelamento_solicitado:
+            st.caption("Cancelando...")
+        elif st.button("✖️ Cancelar geração", key=f"cancelar_{job_id}"):
+            manager.cancel(job_id)
+
+        # Ao terminar, o rerun completo desliga a atualização periódica
+        st.session_state[f"job_visto_{job_id}"] = True
+        return
+
+    if st.session_state.pop(f"job_visto_{job_id}", False):
+        st.rerun()
+
+    # Cada leitura de job.resultado pode trazer o PDF do disco: lido uma vez só
+    pdf = job.resultado if job.status == Job.CONCLUIDO else None
+    if job.status == Job.CONCLUIDO and pdf is None:
+        st.info("⌛ O PDF gerado anteriormente expirou. Gere novamente se precisar.")
+    elif job.status == Job.CONCLUIDO:
+        st.download_button(
+            label="📥 Baixar PDF de Etiquetas",
+            data=pdf,
+            file_name=file_name,
+            mime='application/pdf',
+            key=f"baixar_{job_id}"
+        )
+        st.success(f"PDF gerado com sucesso! ({job.total_etiquetas} etiquetas)")
+        st.caption(
+            f"📄 {len(pdf) / 1024:,.0f} KB · "
+            f"{job.total_etiquetas} etiquetas · "
+            f"{job.detalhes.get('etiquetas_distintas', job.total_etiquetas)} distintas · "
+            f"{job.total_paginas} páginas"
+            + (" · modo compacto" if job.detalhes.get('compacto') else "")
+        )
+    elif job.status == Job.CANCELADO:
+        st.warning("⚠️ Geração do PDF cancelada.")
+    else:
+        st.error(f"❌ Erro ao gerar PDF: {job.erro}")
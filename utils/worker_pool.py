@@ -0,0 +1,371 @@
+# utils/worker_pool.py
+"""
+Módulo responsável pelo pool de processos compartilhado pelo servidor
+"""
+
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Deque, Dict, List, Optional
+
+from utils.job_manager import JobCancelledError
+
+
+class QueueFullError(Exception):
+    """A fila do servidor atingiu o limite de tarefas aguardando"""
+
+
+class TaskTooLargeError(Exception):
+    """A tarefa excede os limites de tamanho configurados"""
+
+
+def verificar_total_etiquetas(total_etiquetas: int, max_etiquetas: int):
+    """
+    Recusa um PDF com mais etiquetas que o limite
+
+    Raises:
+        TaskTooLargeError: Se total_etiquetas passa de max_etiquetas
+    """
+    if total_etiquetas > max_etiquetas:
+        raise TaskTooLargeError(f"{total_etiquetas} etiquetas excedem o limite de {max_etiquetas} por PDF.")
+
+
+class Ticket:
+    """Tarefa admitida no pool, aguardando ou em execução"""
+
+    def __init__(self, func: Callable, args: tuple, kwargs: dict, estado=None):
+        self.id = uuid.uuid4().hex
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.estado = estado
+        self.future: Future = Future()
+        self.criado_em = time.monotonic()
+        self.iniciado_em: Optional[float] = None
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self, timeout: Optional[float] = None):
+        return self.future.result(timeout)
+
+
+def _executar_com_progresso(func: Callable, estado, args: tuple, kwargs: dict):
+    """
+    Executa a função no processo filho repassando o progresso para o processo pai
+
+    O estado compartilhado é atualizado no máximo a cada 0,2 s, já que cada
+    acesso ao proxy do Manager é uma chamada entre processos.
+    """
+    ultimo_envio = [0.0]
+
+    def progresso(etiquetas: int, paginas: int):
+        agora = time.monotonic()
+        if agora - ultimo_envio[0] < 0.2:
+            return
+        ultimo_envio[0] = agora
+        estado.update(etiquetas=etiquetas, paginas=paginas)
+        if estado.get('cancelado'):
+            raise JobCancelledError()
+
+    return func(*args, progresso=progresso, **kwargs)
+
+
+class WorkerPool:
+    """
+    Pool limitado de processos para as operações pesadas (PDF e planilhas)
+
+    As tarefas que excedem a quantidade de processos aguardam numa fila FIFO
+    própria, o que permite informar a posição de cada usuário. Quando a fila
+    está cheia, novas tarefas são recusadas em vez de acumular.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_queue: int = 16,
+        max_upload_bytes: int = 50 * 1024 * 1024,
+        max_etiquetas: int = 50000,
+        inicializador: Optional[Callable] = None
+    ):
+        """
+        Args:
+            max_workers: Quantidade de processos executando ao mesmo tempo
+            max_queue: Quantidade máxima de tarefas aguardando na fila
+            max_upload_bytes: Tamanho máximo de arquivo aceito por tarefa
+            max_etiquetas: Quantidade máxima de etiquetas por PDF
+            inicializador: Função de nível de módulo executada uma vez em
+                cada processo, ao ser criado
+        """
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.max_upload_bytes = max_upload_bytes
+        self.max_etiquetas = max_etiquetas
+        self.inicializador = inicializador
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._fila: Deque[Ticket] = deque()
+        self._ativos = 0
+        self._lock = threading.RLock()
+
+        self._esperas: Deque[float] = deque(maxlen=200)
+        self._concluidas = 0
+        self._recusadas = 0
+
+    @classmethod
+    def from_env(cls, inicializador: Optional[Callable] = None) -> "WorkerPool":
+        """
+        Cria o pool com limites definidos por variáveis de ambiente
+
+        HUB_POOL_WORKERS, HUB_POOL_MAX_FILA, HUB_MAX_UPLOAD_MB e HUB_MAX_ETIQUETAS
+        """
+        cpus = os.cpu_count() or 2
+        return cls(
+            max_workers=int(os.environ.get('HUB_POOL_WORKERS', max(1, min(4, cpus - 1)))),
+            max_queue=int(os.environ.get('HUB_POOL_MAX_FILA', 16)),
+            max_upload_bytes=int(float(os.environ.get('HUB_MAX_UPLOAD_MB', 50)) * 1024 * 1024),
+            max_etiquetas=int(os.environ.get('HUB_MAX_ETIQUETAS', 50000)),
+            inicializador=inicializador
+        )
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=self.inicializador
+                )
+            return self._executor
+
+    def iniciar_processos(self) -> List[Future]:
+        """
+        Cria todos os processos do pool antes da primeira tarefa
+
+        Envia uma tarefa vazia por processo direto ao executor (sem passar
+        pela fila), o que dispara o inicializador em cada um.
+
+        Returns:
+            Futures das tarefas vazias, concluídas quando os processos estão prontos
+        """
+        executor = self._get_executor()
+        return [executor.submit(os.getpid) for _ in range(self.max_workers)]
+
+    def _novo_estado(self):
+        if self._manager is None:
+            self._manager = multiprocessing.get_context('spawn').Manager()
+        return self._manager.dict(etiquetas=0, paginas=0, cancelado=False)
+
+    def submit(
+        self,
+        func: Callable,
+        *args,
+        tamanho_bytes: int = 0,
+        total_etiquetas: int = 0,
+        com_progresso: bool = False,
+        **kwargs
+    ) -> Ticket:
+        """
+        Admite uma tarefa no pool
+
+        Args:
+            func: Função de nível de módulo (precisa ser serializável)
+            tamanho_bytes: Tamanho do arquivo processado pela tarefa
+            total_etiquetas: Quantidade de etiquetas geradas pela tarefa
+            com_progresso: Se True, a função recebe o argumento `progresso`
+                e o estado fica disponível em `ticket.estado`
+
+        Returns:
+            Ticket da tarefa
+
+        Raises:
+            TaskTooLargeError: Se a tarefa excede os limites de tamanho
+            QueueFullError: Se a fila de espera está cheia
+        """
+        if tamanho_bytes > self.max_upload_bytes:
+            limite_mb = self.max_upload_bytes / (1024 * 1024)
+            raise TaskTooLargeError(f"Arquivo maior que o limite de {limite_mb:.0f} MB.")
+        verificar_total_etiquetas(total_etiquetas, self.max_etiquetas)
+
+        with self._lock:
+            if self._ativos >= self.max_workers and len(self._fila) >= self.max_queue:
+                self._recusadas += 1
+                raise QueueFullError(
+                    "Servidor ocupado: muitas tarefas na fila. Tente novamente em alguns minutos."
+                )
+
+            estado = self._novo_estado() if com_progresso else None
+            ticket = Ticket(func, args, kwargs, estado)
+            self._fila.append(ticket)
+            self._despachar()
+
+        return ticket
+
+    def _enviar_ao_executor(self, ticket: Ticket) -> Future:
+        """
+        Envia o ticket ao executor, recriando-o se algum processo morreu
+
+        Um processo encerrado à força (falta de memória, os._exit) quebra o
+        ProcessPoolExecutor inteiro: o executor quebrado é descartado e a
+        tarefa é enviada a um novo. Se o novo também falhar, o erro sobe.
+        """
+        for tentativa in range(2):
+            executor = self._get_executor()
+            try:
+                if ticket.estado is not None:
+                    return executor.submit(
+                        _executar_com_progresso, ticket.func, ticket.estado, ticket.args, ticket.kwargs
+                    )
+                return executor.submit(ticket.func, *ticket.args, **ticket.kwargs)
+            except (BrokenProcessPool, RuntimeError):
+                if self._executor is executor:
+                    self._executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+                if tentativa == 1:
+                    raise
+
+    def _despachar(self):
+        """Envia tarefas da fila para o executor enquanto houver processos livres"""
+        while self._fila and self._ativos < self.max_workers:
+            ticket = self._fila.popleft()
+            if not ticket.future.set_running_or_notify_cancel():
+                continue
+
+            ticket.iniciado_em = time.monotonic()
+            self._esperas.append(ticket.iniciado_em - ticket.criado_em)
+
+            try:
+                future = self._enviar_ao_executor(ticket)
+            except Exception as e:
+                ticket.future.set_exception(e)
+                self._concluidas += 1
+                continue
+
+            self._ativos += 1
+            future.add_done_callback(lambda f, t=ticket: self._finalizar(t, f))
+
+    def _finalizar(self, ticket: Ticket, future: Future):
+        """
+        Repassa o resultado ao ticket e libera o processo para a próxima tarefa
+
+        O future do executor sai cancelado quando um executor quebrado é
+        descartado antes de começar a tarefa; o ticket, já em execução, recebe
+        CancelledError. O processo é liberado mesmo se o repasse falhar.
+        """
+        try:
+            if future.cancelled():
+                ticket.future.set_exception(CancelledError("Tarefa cancelada: o pool de processos foi reiniciado"))
+            elif future.exception() is not None:
+                ticket.future.set_exception(future.exception())
+            else:
+                ticket.future.set_result(future.result())
+        finally:
+            with self._lock:
+                self._ativos -= 1
+                self._concluidas += 1
+                self._despachar()
+
+    def position(self, ticket: Ticket) -> int:
+        """Posição do ticket na fila (1 = próximo); 0 se já está executando"""
+        with self._lock:
+            for posicao, item in enumerate(self._fila, start=1):
+                if item is ticket:
+                    return posicao
+        return 0
+
+    def cancel(self, ticket: Ticket):
+        """Retira o ticket da fila ou sinaliza o cancelamento para o processo"""
+        with self._lock:
+            if ticket in self._fila:
+                self._fila.remove(ticket)
+                ticket.future.cancel()
+                return
+        if ticket.estado is not None:
+            ticket.estado['cancelado'] = True
+
+    def encerrar(self):
+        """
+        Encerra os processos do pool e o gerenciador do progresso
+
+        As tarefas que aguardam na fila são canceladas; as em execução
+        terminam antes. Um novo submit recria os processos.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+            manager, self._manager = self._manager, None
+            while self._fila:
+                self._fila.popleft().future.cancel()
+        if executor is not None:
+            executor.shutdown(wait=True)
+        if manager is not None:
+            manager.shutdown()
+
+    def stats(self) -> Dict[str, float]:
+        """Profundidade da fila e tempos de espera recentes"""
+        with self._lock:
+            esperas = list(self._esperas)
+            agora = time.monotonic()
+            espera_atual = max((agora - t.criado_em for t in self._fila), default=0.0)
+            return {
+                'fila': len(self._fila),
+                'ativos': self._ativos,
+                'max_workers': self.max_workers,
+                'max_fila': self.max_queue,
+                'concluidas': self._concluidas,
+                'recusadas': self._recusadas,
+                'espera_media_s': sum(esperas) / len(esperas) if esperas else 0.0,
+                'espera_max_s': max(esperas, default=0.0),
+                'espera_atual_s': espera_atual
+            }
+
+    def run_blocking(
+        self,
+        func: Callable,
+        *args,
+        progresso: Optional[Callable] = None,
+        ao_aguardar: Optional[Callable[[int], None]] = None,
+        tamanho_bytes: int = 0,
+        total_etiquetas: int = 0,
+        intervalo: float = 0.25,
+        **kwargs
+    ):
+        """
+        Executa uma tarefa no pool e aguarda o resultado na thread atual
+
+        Args:
+            progresso: Callback (etiquetas, paginas) repassado à função. Se ele
+                levantar JobCancelledError, a tarefa é cancelada no pool.
+            ao_aguardar: Callback chamado com a posição na fila enquanto aguarda.
+                Também pode levantar JobCancelledError.
+
+        Returns:
+            Resultado da função
+        """
+        ticket = self.submit(
+            func,
+            *args,
+            tamanho_bytes=tamanho_bytes,
+            total_etiquetas=total_etiquetas,
+            com_progresso=progresso is not None,
+            **kwargs
+        )
+
+        try:
+            while not ticket.done():
+                posicao = self.position(ticket)
+                if posicao and ao_aguardar is not None:
+                    ao_aguardar(posicao)
+                elif not posicao and progresso is not None:
+                    progresso(ticket.estado['etiquetas'], ticket.estado['paginas'])
+                time.sleep(intervalo)
+        except JobCancelledError:
+            self.cancel(ticket)
+            raise
+
+        return ticket.result()